@@ -1,3 +1,207 @@
-from django.contrib import admin
+"""
+Trang quản trị cho các bảng lớn (hàng triệu giao dịch):
 
-# Register your models here.
+- Khóa ngoại hiển thị bằng list_select_related (không N+1) và sửa bằng
+  raw_id_fields (không dựng <select> chứa mọi ví/danh mục/user).
+- list_filter chỉ dùng cột có giá trị cố định hoặc có index; không lọc theo khóa ngoại.
+- Phân trang dùng số dòng ước lượng thay cho COUNT(*) trên cả bảng.
+- Chỉ xem: thêm/sửa/xóa qua admin bỏ qua số dư ví, Budget.spent, bộ đoán danh mục
+  và gợi ý mô tả, nên mọi thay đổi đi qua API.
+- Các action đối soát chỉ ĐỌC và báo cáo chênh lệch — muốn sửa thì dùng
+  lệnh reconcile_wallets hoặc lưu lại ngân sách qua API.
+"""
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import Budget, Category, Transaction, Wallet
+from .services.budgets import expected_spent
+from .services.ledger import to_money, with_expected_balance
+from .sharding import shard_aliases, sharding_enabled
+
+# Đếm tối đa bao nhiêu dòng khi changelist có điều kiện lọc (settings.ADMIN_COUNT_LIMIT)
+DEFAULT_COUNT_LIMIT = 10000
+# Số dòng lệch tối đa liệt kê trong thông báo của action đối soát
+MAX_REPORTED = 20
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator không COUNT(*) toàn bảng:
+    - không lọc + PostgreSQL: lấy pg_class.reltuples (thống kê của planner);
+    - còn lại: COUNT trên tối đa ADMIN_COUNT_LIMIT dòng — danh sách dài hơn chỉ
+      phân trang được tới giới hạn đó, phần còn lại thu hẹp bằng bộ lọc/tìm kiếm.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        estimate = self._table_estimate(queryset)
+        if estimate is not None:
+            return estimate
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', DEFAULT_COUNT_LIMIT)
+        return queryset.order_by()[:limit].count()
+
+    @staticmethod
+    def _table_estimate(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples = -1 khi bảng chưa từng được ANALYZE
+        return row[0] if row and row[0] >= 0 else None
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """Chọn shard để duyệt (chỉ hiện khi bật sharding; mặc định 'default')."""
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in shard_aliases()]
+
+    def queryset(self, request, queryset):
+        if self.value() in shard_aliases():
+            return queryset.using(self.value())
+        return queryset
+
+
+class YearListFilter(admin.SimpleListFilter):
+    """Lọc theo năm với danh sách cố định (không SELECT DISTINCT trên cả bảng)."""
+    title = 'year'
+    parameter_name = 'year'
+
+    def lookups(self, request, model_admin):
+        this_year = timezone.localdate().year
+        return [(year, year) for year in range(this_year + 1, this_year - 5, -1)]
+
+    def queryset(self, request, queryset):
+        return queryset.filter(year=self.value()) if self.value() else queryset
+
+
+class MonthListFilter(admin.SimpleListFilter):
+    title = 'month'
+    parameter_name = 'month'
+
+    def lookups(self, request, model_admin):
+        return [(month, month) for month in range(1, 13)]
+
+    def queryset(self, request, queryset):
+        return queryset.filter(month=self.value()) if self.value() else queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Cấu hình chung cho bảng lớn: chỉ xem, đếm ước lượng, khóa ngoại dạng id."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    raw_id_fields = ('user',)
+    list_select_related = ('user',)
+
+    # Không quyền xóa -> admin tự bỏ cả action delete_selected
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        return (ShardListFilter, *list_filter) if sharding_enabled() else list_filter
+
+    def report(self, request, checked, mismatches, label):
+        """Thông báo kết quả đối soát: mismatches là danh sách dòng mô tả chênh lệch."""
+        if not mismatches:
+            self.message_user(request, f"✅ {checked:,} {label} đều khớp.", messages.SUCCESS)
+            return
+        shown = "; ".join(mismatches[:MAX_REPORTED])
+        more = f" (và {len(mismatches) - MAX_REPORTED:,} dòng khác)" if len(mismatches) > MAX_REPORTED else ""
+        self.message_user(
+            request, f"❌ {len(mismatches):,}/{checked:,} {label} bị lệch: {shown}{more}.", messages.WARNING
+        )
+
+    def reconcile_wallet_ids(self, request, wallets):
+        """So số dư lưu với số dư kỳ vọng của các ví (một truy vấn gom nhóm) — không ghi gì."""
+        rows = (
+            with_expected_balance(wallets)
+            .order_by()
+            .values_list('id', 'name', 'balance', 'expected_balance')
+        )
+        checked = 0
+        mismatches = []
+        for wallet_id, name, balance, expected in rows:
+            checked += 1
+            expected = to_money(expected)
+            if balance != expected:
+                mismatches.append(f"ví #{wallet_id} '{name}' lưu {balance:,.2f} ≠ {expected:,.2f}")
+        self.report(request, checked, mismatches, 'ví')
+
+
+@admin.register(Wallet)
+class WalletAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'user', 'balance', 'opening_balance')
+    search_fields = ('=user__username', '^name')
+    ordering = ('-id',)
+    actions = ['reconcile_balances']
+
+    @admin.action(description="Đối soát số dư các ví đã chọn (chỉ đọc)")
+    def reconcile_balances(self, request, queryset):
+        self.reconcile_wallet_ids(request, Wallet.objects.using(queryset.db).filter(pk__in=queryset.values('pk')))
+
+
+@admin.register(Category)
+class CategoryAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'type', 'is_system', 'user')
+    list_filter = ('type', 'is_system')
+    search_fields = ('=user__username', '^name')
+    ordering = ('-id',)
+
+
+@admin.register(Transaction)
+class TransactionAdmin(LargeTableAdmin):
+    list_display = ('id', 'date', 'type', 'amount', 'category', 'wallet', 'user', 'description')
+    list_select_related = ('user', 'wallet', 'category')
+    raw_id_fields = ('user', 'wallet', 'category', 'transfer')
+    # 'type' có 2 giá trị cố định; index (date, id) phục vụ sắp xếp mặc định và
+    # date_hierarchy (MIN/MAX — xem templatetags/admin_dates.py)
+    list_filter = ('type',)
+    date_hierarchy = 'date'
+    search_fields = ('=id', '=user__username')
+    ordering = ('-date', '-id')
+    actions = ['reconcile_wallets']
+
+    @admin.action(description="Đối soát số dư ví của các giao dịch đã chọn (chỉ đọc)")
+    def reconcile_wallets(self, request, queryset):
+        wallet_ids = queryset.order_by().values('wallet_id').distinct()
+        self.reconcile_wallet_ids(request, Wallet.objects.using(queryset.db).filter(pk__in=wallet_ids))
+
+
+@admin.register(Budget)
+class BudgetAdmin(LargeTableAdmin):
+    list_display = ('id', 'category', 'year', 'month', 'amount', 'spent', 'user')
+    list_select_related = ('user', 'category')
+    raw_id_fields = ('user', 'category')
+    list_filter = (YearListFilter, MonthListFilter)
+    search_fields = ('=user__username',)
+    ordering = ('-year', '-month', '-id')
+    actions = ['reconcile_spent']
+
+    @admin.action(description="Đối soát mức chi (spent) của các ngân sách đã chọn (chỉ đọc)")
+    def reconcile_spent(self, request, queryset):
+        budgets = list(queryset.order_by())
+        expected = expected_spent(budgets)
+        mismatches = [
+            f"ngân sách #{budget.pk} ({budget.month}/{budget.year}) lưu {budget.spent:,.2f} ≠ {expected[budget.pk]:,.2f}"
+            for budget in budgets if budget.spent != expected[budget.pk]
+        ]
+        self.report(request, len(budgets), mismatches, 'ngân sách')
@@ -7,3 +7,9 @@ class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
     verbose_name = "Quản lý API Ứng dụng"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401 — đăng ký các receiver
+        from .sharding import configure_shard_sequences
+        post_migrate.connect(configure_shard_sequences, sender=self)
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from .sharding import (
+    SHARD_PREFIX, current_shard, is_sharded_model, shard_aliases, shard_for_user, sharding_enabled,
+)
+
+REPLICA_ALIAS = 'replica'
+
+# True khi các truy vấn đọc trong ngữ cảnh hiện tại được phép đi replica
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def pin_cache_key(user_id):
+    return f"db-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Sau khi user ghi dữ liệu: mọi lần đọc của họ đi primary trong REPLICA_PIN_SECONDS (read-your-writes)."""
+    cache.set(pin_cache_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(pin_cache_key(user_id), False)
+
+
+@contextmanager
+def replica_reads(user_id=None, enabled=True):
+    """Cho phép đọc từ replica trong khối lệnh (trừ khi user đang bị ghim vào primary)."""
+    token = _read_from_replica.set(enabled and replica_enabled() and not is_pinned(user_id))
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Đọc đi alias 'replica' khi ngữ cảnh cho phép (request GET/HEAD/OPTIONS hoặc
+    khối replica_reads()), mọi thao tác ghi và migrate chỉ trên 'default'.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica là bản sao của default nên quan hệ giữa hai bên luôn hợp lệ
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ShardRouter:
+    """
+    Model phân mảnh (xem api.sharding) đi tới shard của user: theo instance
+    (đã nạp từ shard nào / user_id của nó) hoặc theo shard của request hiện tại.
+    Đặt trước PrimaryReplicaRouter; dữ liệu ở 'default' vẫn đọc được từ replica.
+    """
+
+    def _shard(self, model, hints):
+        if not sharding_enabled() or not is_sharded_model(model):
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, User):
+            return shard_for_user(instance.pk)
+        if instance is not None and is_sharded_model(type(instance)):
+            if instance._state.db in shard_aliases():
+                return instance._state.db
+            return shard_for_user(instance.user_id)
+        return current_shard()
+
+    def db_for_read(self, model, **hints):
+        alias = self._shard(model, hints)
+        return None if alias == 'default' else alias
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # shard cần đủ bảng (kể cả auth_user) để khóa ngoại hoạt động
+        return True if db.startswith(SHARD_PREFIX) else None
@@ -0,0 +1 @@
+from .search_filter import TransactionSearchFilter
@@ -0,0 +1,16 @@
+from rest_framework import filters
+from ..services.search import filter_by_description
+
+
+class TransactionSearchFilter(filters.SearchFilter):
+    """
+    Thay SearchFilter mặc định (icontains, quét toàn bảng) bằng tìm kiếm
+    toàn văn có chỉ mục, không phân biệt dấu: "an trua" khớp "Ăn trưa".
+    Vẫn dùng tham số ?search= như cũ.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return filter_by_description(queryset, query)
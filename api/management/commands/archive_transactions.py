@@ -0,0 +1,51 @@
+import datetime
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from ...services.archive import archive_batch, record_checkpoint
+from ...sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    """
+    Chuyển giao dịch cũ sang bảng lưu trữ theo từng lô để bảng nóng luôn nhỏ.
+
+    Ví dụ:
+        python manage.py archive_transactions               # cũ hơn TRANSACTION_ARCHIVE_DAYS ngày
+        python manage.py archive_transactions --before 2024-01-01 --batch-size 10000
+    """
+    help = "Lưu trữ giao dịch cũ hơn mốc thời gian (theo lô)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Mốc YYYY-MM-DD: lưu trữ giao dịch có date < mốc.")
+        parser.add_argument('--days', type=int, default=getattr(settings, 'TRANSACTION_ARCHIVE_DAYS', 730),
+                            help="Nếu không có --before: lưu trữ giao dịch cũ hơn N ngày.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = datetime.datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--before phải có dạng YYYY-MM-DD.")
+        else:
+            cutoff = timezone.localdate() - datetime.timedelta(days=options['days'])
+
+        started = time.perf_counter()
+        total = 0
+        for alias in shard_aliases():
+            with use_shard(alias):
+                while True:
+                    moved = archive_batch(cutoff, options['batch_size'])
+                    if not moved:
+                        break
+                    total += moved
+                    self.stdout.write(f"  … [{alias}] đã lưu trữ thêm {moved:,} giao dịch (tổng {total:,})")
+
+        record_checkpoint(cutoff, total)
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Đã lưu trữ {total:,} giao dịch trước {cutoff} trong {elapsed:.2f}s ({rate:,.0f} giao dịch/s)."
+        ))
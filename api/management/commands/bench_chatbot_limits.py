@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import Counter
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ...services.fake_llm import FakeGenerativeModel
+from ...services.ratelimit import chatbot_metrics, bucket_cache_key
+from ...views import chatbot
+
+
+class Command(BaseCommand):
+    """
+    Load test giới hạn tần suất chatbot với LLM giả lập: vài user "spam" liên tục
+    cùng nhiều user bình thường (1 tin mỗi --think giây). Kết quả cho thấy user
+    bình thường vẫn được phục vụ đầy đủ còn user spam bị giữ ở mức refill.
+
+    Ví dụ:
+        python manage.py bench_chatbot_limits --heavy 3 --light 10 --seconds 30
+    """
+    help = "Load test token bucket + giới hạn in-flight của chatbot."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--heavy', type=int, default=3, help="Số user gửi liên tục.")
+        parser.add_argument('--light', type=int, default=10, help="Số user gửi đều đặn.")
+        parser.add_argument('--think', type=float, default=6.0, help="Giây giữa 2 tin của user bình thường.")
+        parser.add_argument('--seconds', type=float, default=30)
+        parser.add_argument('--latency', type=float, default=0.5, help="Độ trễ của LLM giả lập (giây).")
+
+    def handle(self, *args, **options):
+        stamp = int(time.time() * 1000)
+        users = [
+            (kind, User.objects.create(username=f"bench_chatbot_{stamp}_{kind}_{i}"))
+            for kind, count in (('heavy', options['heavy']), ('light', options['light']))
+            for i in range(count)
+        ]
+        real_model, chatbot.model = chatbot.model, FakeGenerativeModel(options['latency'])
+        before = chatbot_metrics()
+        try:
+            results = self.run(users, options)
+        finally:
+            chatbot.model = real_model
+            cache.delete_many([bucket_cache_key(user.pk) for _, user in users])
+            User.objects.filter(pk__in=[user.pk for _, user in users]).delete()
+
+        seconds = options['seconds']
+        self.stdout.write(f"{'Nhóm':<8}{'User':>6}{'Gửi':>8}{'200':>8}{'429':>8}{'OK/user/phút':>15}")
+        for kind in ('heavy', 'light'):
+            rows = [counts for k, counts in results if k == kind]
+            if not rows:
+                continue
+            total = sum(rows, Counter())
+            per_minute = [counts[200] * 60 / seconds for counts in rows]
+            self.stdout.write(
+                f"{kind:<8}{len(rows):>6}{sum(total.values()):>8,}{total[200]:>8,}{total[429]:>8,}"
+                f"{min(per_minute):>7.1f}–{max(per_minute):<7.1f}"
+            )
+        after = chatbot_metrics()
+        self.stdout.write("Metrics: " + ", ".join(
+            f"{name} +{after[name] - before[name]:,}" for name in ('allowed', 'throttled_user', 'throttled_busy')
+        ))
+
+    def run(self, users, options):
+        deadline = time.monotonic() + options['seconds']
+        results = []
+
+        def client_loop(kind, user):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+            counts = Counter()
+            while time.monotonic() < deadline:
+                response = client.post('/api/chatbot/', {'message': "Tháng này tôi chi bao nhiêu?"}, format='json')
+                counts[response.status_code] += 1
+                if kind == 'light':
+                    time.sleep(options['think'])
+                elif response.status_code == 429:
+                    time.sleep(min(float(response.get('Retry-After', 1)), 1))
+            results.append((kind, counts))
+
+        threads = [threading.Thread(target=client_loop, args=user) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
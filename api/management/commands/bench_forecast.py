@@ -0,0 +1,114 @@
+import calendar
+import datetime
+import math
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from ...services.forecast import forecast_matrix, anomaly_matrix
+
+
+def synthetic_matrix(rng, n_categories, n_days, start_date):
+    """Chi theo ngày giả lập: mỗi danh mục có tần suất, mức chi và mùa vụ theo thứ riêng."""
+    weekdays = (np.arange(n_days) + start_date.weekday()) % 7
+    frequency = rng.uniform(0.05, 0.9, size=(n_categories, 1))
+    scale = rng.lognormal(11, 1, size=(n_categories, 1))
+    seasonal = rng.uniform(0.5, 1.5, size=(n_categories, 7))[:, weekdays]
+    spend = rng.random((n_categories, n_days)) < frequency * np.minimum(seasonal, 1)
+    return np.round(spend * scale * seasonal * rng.lognormal(0, 0.4, size=(n_categories, n_days)), -3)
+
+
+def python_reference(matrix, start_date, today, halflife, recent_days, threshold):
+    """Cùng phép tính với forecast_matrix/anomaly_matrix nhưng lặp Python theo danh mục và ngày."""
+    rows = matrix.tolist()
+    n_days = len(rows[0]) if rows else 0
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    remaining = [0] * 7
+    for offset in range(1, days_in_month - today.day + 1):
+        remaining[(today.weekday() + offset) % 7] += 1
+
+    weights = [0.5 ** ((n_days - 1 - d) / halflife) for d in range(n_days)]
+    projected, flagged = [], []
+    for i, series in enumerate(rows):
+        pace = sum(w * x for w, x in zip(weights, series)) / sum(weights)
+        overall = sum(series) / n_days
+        sums, counts = [0.0] * 7, [0] * 7
+        for d, x in enumerate(series):
+            weekday = (start_date.weekday() + d) % 7
+            sums[weekday] += x
+            counts[weekday] += 1
+        factors = [
+            (sums[k] / max(counts[k], 1)) / overall if overall > 0 else 1.0 for k in range(7)
+        ]
+        spent = sum(series[n_days - today.day:])
+        projected.append(spent + pace * sum(f * r for f, r in zip(factors, remaining)))
+
+        history = series[:-recent_days]
+        mean = sum(history) / len(history)
+        std = math.sqrt(sum((x - mean) ** 2 for x in history) / len(history))
+        for d in range(n_days - recent_days, n_days):
+            z = (series[d] - mean) / std if std > 0 else 0.0
+            if z > threshold and series[d] > 0:
+                flagged.append((i, d))
+    return projected, flagged
+
+
+class Command(BaseCommand):
+    """
+    So sánh dự báo + phát hiện bất thường vectorized (NumPy) với bản lặp Python
+    trên lịch sử chi nhiều năm của nhiều user giả lập, đồng thời kiểm tra hai bản
+    cho cùng kết quả. Không đụng tới CSDL (chỉ đo phần tính toán).
+
+    Ví dụ:
+        python manage.py bench_forecast
+        python manage.py bench_forecast --users 200 --years 5 --categories 40
+    """
+    help = "Đo thời gian dự báo chi tiêu: NumPy vs vòng lặp Python."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--categories', type=int, default=25)
+        parser.add_argument('--halflife', type=float, default=14)
+        parser.add_argument('--recent', type=int, default=7)
+        parser.add_argument('--z', type=float, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['years'] < 1 or options['categories'] < 1:
+            raise CommandError("--users, --years và --categories phải >= 1.")
+        rng = np.random.default_rng(options['seed'])
+        today = datetime.date.today()
+        n_days = options['years'] * 365
+        start_date = today - datetime.timedelta(days=n_days - 1)
+        halflife, recent, threshold = options['halflife'], options['recent'], options['z']
+
+        matrices = [
+            synthetic_matrix(rng, options['categories'], n_days, start_date) for _ in range(options['users'])
+        ]
+
+        vector_time = python_time = 0.0
+        flagged_total = 0
+        for matrix in matrices:
+            started = time.perf_counter()
+            forecast = forecast_matrix(matrix, start_date, today, halflife=halflife)
+            rows, cols, *_ = anomaly_matrix(matrix, recent_days=recent, threshold=threshold)
+            vector_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            projected, flagged = python_reference(matrix, start_date, today, halflife, recent, threshold)
+            python_time += time.perf_counter() - started
+
+            if not np.allclose(forecast['projected'], projected, rtol=1e-9):
+                raise CommandError("Dự báo NumPy và Python không khớp.")
+            if list(zip(rows.tolist(), cols.tolist())) != flagged:
+                raise CommandError("Danh sách bất thường NumPy và Python không khớp.")
+            flagged_total += len(flagged)
+
+        users = len(matrices)
+        self.stdout.write(
+            f"{users} user × {options['categories']} danh mục × {n_days} ngày "
+            f"({matrices[0].size:,} ô/user), {flagged_total} ngày bất thường — kết quả khớp"
+        )
+        self.stdout.write(f"NumPy  : {vector_time / users * 1000:8.2f} ms/user")
+        self.stdout.write(f"Python : {python_time / users * 1000:8.2f} ms/user")
+        self.stdout.write(f"Nhanh hơn {python_time / vector_time:.0f}×")
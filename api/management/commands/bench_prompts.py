@@ -0,0 +1,108 @@
+import datetime
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ...services.prompting import SYSTEM_INSTRUCTION, build_chat_prompt, estimate_tokens
+
+WALLETS = ["Tiền mặt", "Techcombank", "Vietcombank", "MoMo", "ZaloPay", "Thẻ tín dụng", "Tiết kiệm"]
+CATEGORIES = [
+    ("Ăn uống", "expense"), ("Cà phê", "expense"), ("Đi chợ", "expense"), ("Xăng xe", "expense"),
+    ("Grab", "expense"), ("Tiền nhà", "expense"), ("Điện nước", "expense"), ("Internet", "expense"),
+    ("Điện thoại", "expense"), ("Mua sắm", "expense"), ("Quần áo", "expense"), ("Mỹ phẩm", "expense"),
+    ("Sức khỏe", "expense"), ("Thuốc men", "expense"), ("Giáo dục", "expense"), ("Sách", "expense"),
+    ("Giải trí", "expense"), ("Xem phim", "expense"), ("Du lịch", "expense"), ("Quà tặng", "expense"),
+    ("Hiếu hỉ", "expense"), ("Con cái", "expense"), ("Thú cưng", "expense"), ("Bảo hiểm", "expense"),
+    ("Trả nợ", "expense"), ("Sửa xe", "expense"), ("Gửi xe", "expense"), ("Thể thao", "expense"),
+    ("Lương", "income"), ("Thưởng", "income"), ("Freelance", "income"), ("Lãi tiết kiệm", "income"),
+    ("Bán đồ cũ", "income"), ("Được cho", "income"), ("Hoàn tiền", "income"),
+]
+CORPUS = [
+    "ăn trưa 50k bằng tiền mặt", "cafe sáng 35k momo", "đổ xăng 80 nghìn", "grab đi làm 42k",
+    "tiền nhà tháng này 5 triệu chuyển khoản techcombank", "mua thuốc cảm 120k", "nhận lương 15tr vào vietcombank",
+    "tổng chi tháng này?", "số dư ví momo còn bao nhiêu", "tháng 9 tiêu bao nhiêu", "xem phim cuối tuần 180k zalopay",
+    "đi chợ 250k", "đóng học phí tiếng anh 3 triệu", "mừng đám cưới bạn 500k", "sửa xe máy 350k tiền mặt",
+    "hoàn tiền shopee 45k vào momo", "mua áo khoác 420k thẻ tín dụng", "tiền điện 780k", "thưởng dự án 2 triệu",
+    "gửi xe tháng 120k",
+]
+
+
+class Command(BaseCommand):
+    """
+    So sánh prompt cũ (toàn bộ ví/danh mục dạng JSON + hướng dẫn trong mỗi request)
+    với prompt có ngân sách token (top-k + system instruction) trên một bộ tin nhắn mẫu.
+    Phần hướng dẫn của prompt cũ được tính bằng bản đã rút gọn nên mức giảm thực tế còn lớn hơn.
+    --live gửi cả hai loại prompt tới Gemini để đo độ trễ (tốn quota).
+
+    Ví dụ:
+        python manage.py bench_prompts
+        python manage.py bench_prompts --live --repeat 3
+    """
+    help = "Đo số token và độ trễ của prompt chatbot: toàn bộ ngữ cảnh vs top-k."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--live', action='store_true', help="Gọi Gemini thật để đo độ trễ.")
+        parser.add_argument('--repeat', type=int, default=1)
+
+    def handle(self, *args, **options):
+        today = datetime.date.today()
+        wallets = [{'id': i, 'name': name} for i, name in enumerate(WALLETS, start=1)]
+        categories = [
+            {'id': i, 'name': name, 'type': kind} for i, (name, kind) in enumerate(CATEGORIES, start=101)
+        ]
+
+        legacy, compact, build_ms = [], [], []
+        for message in CORPUS:
+            legacy.append(
+                f"{SYSTEM_INSTRUCTION}\nNgày hôm nay là: {today:%Y-%m-%d}.\n"
+                f"Danh sách Ví: {json.dumps(wallets)}\nDanh sách Danh mục: {json.dumps(categories)}\n"
+                f"Tin nhắn: \"{message}\""
+            )
+            started = time.perf_counter()
+            compact.append(build_chat_prompt(message, wallets, categories, today).text)
+            build_ms.append((time.perf_counter() - started) * 1000)
+
+        legacy_tokens = [estimate_tokens(text) for text in legacy]
+        compact_tokens = [estimate_tokens(text) for text in compact]
+        system_tokens = estimate_tokens(SYSTEM_INSTRUCTION)
+        legacy_mean = statistics.mean(legacy_tokens)
+        compact_mean = statistics.mean(compact_tokens)
+        self.stdout.write(f"Bộ mẫu: {len(CORPUS)} tin nhắn, {len(wallets)} ví, {len(categories)} danh mục")
+        self.stdout.write(f"Prompt cũ      : {legacy_mean:,.0f} token/request")
+        self.stdout.write(
+            f"Prompt top-k   : {compact_mean:,.0f} token/request + system instruction {system_tokens:,} token "
+            f"= {compact_mean + system_tokens:,.0f} token gửi đi"
+        )
+        self.stdout.write(
+            f"Giảm           : {1 - (compact_mean + system_tokens) / legacy_mean:.0%} tổng token mỗi request "
+            f"(phần thay đổi theo user: {legacy_mean - system_tokens:,.0f} -> {compact_mean:,.0f}); "
+            f"dựng prompt mất {statistics.median(build_ms):.2f} ms (trung vị)"
+        )
+
+        if options['live']:
+            self.measure_live(legacy, compact, options['repeat'])
+
+    def measure_live(self, legacy, compact, repeat):
+        import google.generativeai as genai
+        from django.conf import settings
+        try:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            plain = genai.GenerativeModel('models/gemini-2.5-flash')
+            instructed = genai.GenerativeModel('models/gemini-2.5-flash', system_instruction=SYSTEM_INSTRUCTION)
+        except Exception as e:
+            raise CommandError(f"Không kết nối được Gemini: {e}")
+        config = genai.types.GenerationConfig(response_mime_type="application/json")
+
+        def timed(model, prompts):
+            timings = []
+            for _ in range(repeat):
+                for prompt in prompts:
+                    started = time.perf_counter()
+                    model.generate_content(prompt, generation_config=config)
+                    timings.append((time.perf_counter() - started) * 1000)
+            return statistics.median(timings), sorted(timings)[int(len(timings) * 0.95) - 1]
+
+        old_p50, old_p95 = timed(plain, legacy)
+        new_p50, new_p95 = timed(instructed, compact)
+        self.stdout.write(f"Độ trễ Gemini  : cũ p50 {old_p50:,.0f} ms / p95 {old_p95:,.0f} ms — "
+                          f"top-k p50 {new_p50:,.0f} ms / p95 {new_p95:,.0f} ms")
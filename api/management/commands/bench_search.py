@@ -0,0 +1,84 @@
+import datetime
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...models import Wallet, Category, Transaction
+from ...services.search import filter_by_description, fts_available
+
+DESCRIPTIONS = [
+    "Ăn trưa", "Ăn sáng bánh mì", "Cà phê sáng", "Grab đi làm", "Tiền điện tháng",
+    "Tiền nước", "Đổ xăng", "Mua sắm siêu thị", "Trà sữa", "Lương tháng",
+    "Thưởng dự án", "Đi chợ", "Tiền nhà", "Học phí", "Xem phim cuối tuần",
+]
+QUERIES = ["an trua", "Ăn trưa", "tien dien", "grab", "ca phe", "do xang"]
+
+
+class Command(BaseCommand):
+    """
+    So sánh tìm kiếm icontains với chỉ mục toàn văn trên N giao dịch giả lập.
+    Dữ liệu được tạo trong một transaction và ROLLBACK khi xong — vẫn nên
+    chạy trên bản sao CSDL.
+
+    Ví dụ:
+        python manage.py bench_search --rows 1000000
+    """
+    help = "Benchmark tìm kiếm mô tả giao dịch: icontains vs FTS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING("Chưa có chỉ mục FTS (chạy migrate) — nhánh FTS sẽ dùng icontains."))
+
+        with transaction.atomic():
+            user = User.objects.create(username=f"bench_search_{int(time.time())}")
+            self.seed(user, options['rows'], options['batch_size'])
+            base = Transaction.objects.filter(user=user)
+
+            self.stdout.write(
+                f"{'Truy vấn':<12}{'icontains (ms)':>16}{'khớp':>10}{'FTS (ms)':>12}{'khớp':>10}"
+            )
+            for query in QUERIES:
+                icontains_qs = base
+                for term in query.split():
+                    icontains_qs = icontains_qs.filter(description__icontains=term)
+                slow = self.time_count(icontains_qs, options['repeat'])
+                fast = self.time_count(filter_by_description(base, query), options['repeat'])
+                self.stdout.write(f"{query:<12}{slow[0]:>16.1f}{slow[1]:>10,}{fast[0]:>12.1f}{fast[1]:>10,}")
+
+            transaction.set_rollback(True)
+
+    def seed(self, user, rows, batch_size):
+        wallet = Wallet.objects.create(user=user, name="Bench")
+        category = Category.objects.create(user=user, name="Bench", type=Category.TYPE_EXPENSE)
+        rng = random.Random(42)
+        start = datetime.date(2020, 1, 1)
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=user, wallet=wallet, category=category, type=category.type,
+                    amount=Decimal(rng.randint(10, 500) * 1000),
+                    description=rng.choice(DESCRIPTIONS),
+                    date=start + datetime.timedelta(days=rng.randint(0, 2000)),
+                )
+                for _ in range(min(batch_size, rows - offset))
+            ])
+        self.stdout.write(f"Đã tạo {rows:,} giao dịch trong {time.perf_counter() - started:.1f}s.")
+
+    @staticmethod
+    def time_count(queryset, repeat):
+        """Trả về (median ms, số kết quả)."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = queryset.count()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), count
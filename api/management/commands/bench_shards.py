@@ -0,0 +1,105 @@
+import datetime
+import threading
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction, OperationalError
+from django.db.models import F
+from ...models import Wallet, Category, Transaction
+from ...sharding import (
+    shard_aliases, sharded_models, move_user, use_shard, assignment_cache_key,
+)
+
+
+class Command(BaseCommand):
+    """
+    Đo thông lượng ghi (giao dịch/s) khi dữ liệu được chia cho 1, 2, ... shard.
+    Mỗi luồng ghi liên tục cho một user riêng (1 INSERT + 1 UPDATE số dư mỗi lần,
+    giống TransactionViewSet.perform_create). Dữ liệu benchmark bị xóa khi xong.
+
+    Ví dụ:
+        DB_SHARDS=4 python manage.py bench_shards --writers 8 --seconds 10 --shards 1,2,4
+    """
+    help = "Benchmark thông lượng ghi theo số shard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Số luồng ghi đồng thời.")
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--shards', default='', help="Danh sách số shard cần đo, vd: 1,2,4 (mặc định: 1 và tất cả).")
+
+    def handle(self, *args, **options):
+        aliases = shard_aliases()
+        counts = [int(n) for n in options['shards'].split(',') if n] or sorted({1, len(aliases)})
+        if max(counts) > len(aliases):
+            raise CommandError(f"Chỉ có {len(aliases)} shard (đặt DB_SHARDS để thêm).")
+
+        self.stdout.write(f"{'Shard':>6}{'Luồng':>8}{'Ghi':>10}{'Ghi/s':>10}{'Lỗi khóa':>10}")
+        for count in counts:
+            users = self.setup_users(aliases[:count], options['writers'])
+            try:
+                writes, errors, elapsed = self.run(users, options['seconds'])
+            finally:
+                self.cleanup(users)
+            self.stdout.write(
+                f"{count:>6}{options['writers']:>8}{writes:>10,}{writes / elapsed:>10,.0f}{errors:>10,}"
+            )
+
+    def setup_users(self, aliases, writers):
+        """Mỗi luồng một user, chia vòng tròn cho các shard: [(alias, user_id, wallet_id, category_id)]."""
+        stamp = int(time.time() * 1000)
+        users = []
+        for index in range(writers):
+            alias = aliases[index % len(aliases)]
+            user = User.objects.create(username=f"bench_shards_{stamp}_{index}")
+            move_user(user.pk, alias)
+            wallet = Wallet.objects.using(alias).create(user_id=user.pk, name="Bench")
+            category = Category.objects.using(alias).create(user_id=user.pk, name="Bench", type=Category.TYPE_EXPENSE)
+            users.append((alias, user.pk, wallet.pk, category.pk))
+        return users
+
+    def run(self, users, seconds):
+        deadline = time.perf_counter() + seconds
+        results = []
+        barrier = threading.Barrier(len(users))
+
+        def writer(alias, user_id, wallet_id, category_id):
+            writes = errors = 0
+            amount = Decimal('1000')
+            today = datetime.date.today()
+            barrier.wait()
+            with use_shard(alias):
+                while time.perf_counter() < deadline:
+                    try:
+                        with transaction.atomic(using=alias):
+                            Transaction.objects.create(
+                                user_id=user_id, wallet_id=wallet_id, category_id=category_id,
+                                amount=amount, date=today, description="bench",
+                            )
+                            Wallet.objects.filter(pk=wallet_id).update(balance=F('balance') - amount)
+                        writes += 1
+                    except OperationalError:  # "database is locked" khi nhiều luồng ghi cùng một file SQLite
+                        errors += 1
+            connections.close_all()
+            results.append((writes, errors))
+
+        threads = [threading.Thread(target=writer, args=user) for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return sum(w for w, _ in results), sum(e for _, e in results), elapsed
+
+    @staticmethod
+    def cleanup(users):
+        user_ids = [user_id for _, user_id, _, _ in users]
+        for alias in {alias for alias, *_ in users}:
+            for model in reversed(sharded_models()):
+                model._base_manager.using(alias).filter(user_id__in=user_ids).delete()
+            if alias != 'default':
+                User.objects.using(alias).filter(pk__in=user_ids).delete()
+        User.objects.filter(pk__in=user_ids).delete()
+        cache.delete_many([assignment_cache_key(user_id) for user_id in user_ids])
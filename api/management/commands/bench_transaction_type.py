@@ -0,0 +1,119 @@
+import datetime
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncDay
+from ...models import Wallet, Category, Transaction
+from ...services.ledger import MONEY_FIELD, ZERO, signed_amount
+
+EXPENSES = ["Ăn uống", "Cà phê", "Đi chợ", "Xăng xe", "Tiền nhà", "Điện nước", "Mua sắm", "Giải trí"]
+INCOMES = ["Lương", "Thưởng", "Freelance"]
+
+
+def joined_signed_amount(prefix=''):
+    """Biểu thức cũ: đọc dấu qua JOIN sang Category."""
+    return Case(
+        When(**{f'{prefix}category__type': Category.TYPE_INCOME}, then=F(f'{prefix}amount')),
+        default=-F(f'{prefix}amount'),
+        output_field=MONEY_FIELD,
+    )
+
+
+class Command(BaseCommand):
+    """
+    So sánh các truy vấn báo cáo/số dư đọc loại thu/chi qua JOIN Category (cũ) với
+    cột Transaction.type (mới) trên N giao dịch giả lập, và kiểm tra hai cách cho
+    cùng kết quả. Dữ liệu được tạo trong một transaction và ROLLBACK khi xong.
+
+    Ví dụ:
+        python manage.py bench_transaction_type --rows 500000
+    """
+    help = "Benchmark báo cáo: JOIN Category.type vs Transaction.type."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(username=f"bench_type_{int(time.time())}")
+            self.seed(user, options['rows'], options['batch_size'])
+            rows = Transaction.objects.filter(user=user, transfer__isnull=True)
+            wallets = Wallet.objects.filter(user=user)
+            year_start, year_end = datetime.date(2024, 1, 1), datetime.date(2024, 12, 31)
+            zero = Value(ZERO, output_field=DecimalField())
+
+            def cashflow(field):
+                return lambda: list(
+                    rows.filter(date__range=[year_start, year_end])
+                    .annotate(period=TruncDay('date')).values('period')
+                    .annotate(
+                        income=Coalesce(Sum('amount', filter=Q(**{field: 'income'})), zero),
+                        expense=Coalesce(Sum('amount', filter=Q(**{field: 'expense'})), zero),
+                    ).order_by('period')
+                )
+
+            def month_expense(field):
+                return lambda: rows.filter(
+                    **{field: 'expense'}, date__year=2024, date__month=6
+                ).aggregate(total=Sum('amount'))['total']
+
+            def balances(expression):
+                return lambda: sorted(
+                    wallets.annotate(net=Coalesce(Sum(expression), zero, output_field=MONEY_FIELD))
+                    .values_list('id', 'net')
+                )
+
+            cases = [
+                ("Dòng tiền theo ngày (1 năm)", cashflow('category__type'), cashflow('type')),
+                ("Tổng chi một tháng", month_expense('category__type'), month_expense('type')),
+                ("Số dư kỳ vọng các ví", balances(joined_signed_amount('transactions__')),
+                 balances(signed_amount('transactions__'))),
+            ]
+            self.stdout.write(f"{'Truy vấn':<30}{'JOIN (ms)':>12}{'cột type (ms)':>16}{'nhanh hơn':>12}")
+            for label, before, after in cases:
+                slow, slow_result = self.time_call(before, options['repeat'])
+                fast, fast_result = self.time_call(after, options['repeat'])
+                if slow_result != fast_result:
+                    raise CommandError(f"{label}: kết quả hai cách khác nhau.")
+                self.stdout.write(f"{label:<30}{slow:>12.1f}{fast:>16.1f}{slow / fast:>11.1f}×")
+
+            transaction.set_rollback(True)
+
+    def seed(self, user, rows, batch_size):
+        wallets = [Wallet.objects.create(user=user, name=f"Ví {i}") for i in range(3)]
+        categories = [
+            Category.objects.create(user=user, name=name, type=Category.TYPE_EXPENSE) for name in EXPENSES
+        ] + [
+            Category.objects.create(user=user, name=name, type=Category.TYPE_INCOME) for name in INCOMES
+        ]
+        rng = random.Random(42)
+        start = datetime.date(2022, 1, 1)
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for _ in range(min(batch_size, rows - offset)):
+                category = rng.choice(categories)
+                batch.append(Transaction(
+                    user=user, wallet=rng.choice(wallets), category=category, type=category.type,
+                    amount=Decimal(rng.randint(10, 500) * 1000),
+                    date=start + datetime.timedelta(days=rng.randint(0, 1095)),
+                ))
+            Transaction.objects.bulk_create(batch)
+        self.stdout.write(f"Đã tạo {rows:,} giao dịch trong {time.perf_counter() - started:.1f}s.")
+
+    @staticmethod
+    def time_call(call, repeat):
+        """Trả về (median ms, kết quả của lần chạy cuối)."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
@@ -0,0 +1,224 @@
+import datetime
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+
+# Tỉ lệ các thao tác trong một phiên dùng app Android (tổng = 100)
+SESSION_MIX = {
+    'open_app': 30,            # mở app: danh sách ví, danh mục, giao dịch gần đây
+    'create_transaction': 25,
+    'transfer': 5,
+    'reports': 15,             # màn hình báo cáo: tổng hợp + dòng tiền
+    'budgets': 15,
+    'chatbot': 10,
+}
+CHATBOT_MESSAGES = [
+    "Tháng này tôi chi bao nhiêu?",
+    "Ăn trưa 45k",
+    "Số dư ví chính còn bao nhiêu?",
+]
+
+
+def percentile(sorted_values, p):
+    """Phân vị theo nearest-rank trên list đã sắp xếp."""
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Stats:
+    """Độ trễ và mã trạng thái theo từng endpoint, dùng chung giữa các luồng."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, label, status, elapsed):
+        with self.lock:
+            self.latencies[label].append(elapsed)
+            self.statuses[label][status] += 1
+
+
+class VirtualUser:
+    """Một người dùng app: đăng ký, đăng nhập qua /token/, tạo dữ liệu ban đầu rồi lặp các thao tác."""
+
+    def __init__(self, base_url, username, password, stats, rng):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.prefix = parts.hostname, parts.port or 80, parts.path.rstrip('/')
+        self.username, self.password = username, password
+        self.stats, self.rng = stats, rng
+        self.connection = None
+        self.token = None
+
+    def request(self, method, path, data=None, label=None):
+        label = label or f"{method} {path.split('?')[0]}"
+        body = json.dumps(data) if data is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection = None  # kết nối hỏng: mở lại ở request sau
+            payload, status = b'', 0
+        self.stats.add(label, status, time.perf_counter() - started)
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    def setup(self):
+        self.request('POST', '/register/', {
+            'username': self.username, 'email': f"{self.username}@loadtest.local", 'password': self.password,
+        })
+        status, data = self.request('POST', '/token/', {'username': self.username, 'password': self.password})
+        if status != 200:
+            return False
+        self.token = data['access']
+
+        _, wallet = self.request('POST', '/wallets/', {'name': "Ví chính", 'balance': '10000000'})
+        _, savings = self.request('POST', '/wallets/', {'name': "Tiết kiệm", 'balance': '0'})
+        _, expense = self.request('POST', '/categories/', {'name': "Ăn uống", 'type': 'expense'})
+        _, income = self.request('POST', '/categories/', {'name': "Lương", 'type': 'income'})
+        if not all(isinstance(item, dict) and 'id' in item for item in (wallet, savings, expense, income)):
+            return False
+        self.wallet_ids = (wallet['id'], savings['id'])
+        self.category_ids = (expense['id'], income['id'])
+        today = datetime.date.today()
+        self.request('POST', '/budgets/', {
+            'category': expense['id'], 'amount': '3000000', 'month': today.month, 'year': today.year,
+        })
+        return True
+
+    # --- Các thao tác trong SESSION_MIX ---
+    def open_app(self):
+        self.request('GET', '/wallets/')
+        self.request('GET', '/categories/')
+        self.request('GET', '/transactions/?ordering=-date')
+
+    def create_transaction(self):
+        self.request('POST', '/transactions/', {
+            'wallet': self.wallet_ids[0],
+            'category': self.rng.choice(self.category_ids),
+            'amount': str(self.rng.randint(10, 500) * 1000),
+            'date': str(datetime.date.today() - datetime.timedelta(days=self.rng.randint(0, 60))),
+            'description': self.rng.choice(["Ăn trưa", "Cà phê", "Grab", "Đi chợ", "Lương tháng"]),
+        })
+
+    def transfer(self):
+        self.request('POST', '/transfers/', {
+            'from_wallet_id': self.wallet_ids[0], 'to_wallet_id': self.wallet_ids[1],
+            'amount': str(self.rng.randint(1, 50) * 10000), 'date': str(datetime.date.today()),
+        })
+
+    def reports(self):
+        self.request('GET', '/reports/summary/')
+        self.request('GET', '/reports/cashflow/?granularity=day')
+
+    def budgets(self):
+        self.request('GET', '/budgets/')
+
+    def chatbot(self):
+        self.request('POST', '/chatbot/', {'message': self.rng.choice(CHATBOT_MESSAGES)})
+
+    def run(self, deadline, think):
+        actions, weights = zip(*SESSION_MIX.items())
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(actions, weights)[0])()
+            if think:
+                time.sleep(min(self.rng.expovariate(1 / think), max(0, deadline - time.monotonic())))
+
+
+class Command(BaseCommand):
+    """
+    Load test một server đang chạy bằng phiên làm việc giả lập của app Android
+    (xem SESSION_MIX). Mỗi user ảo tự đăng ký tài khoản mới — chỉ chạy với CSDL thử.
+
+    Ví dụ:
+        CHATBOT_FAKE_LLM_LATENCY=0.8 python manage.py runserver --noreload
+        python manage.py loadtest --users 50 --duration 120
+    """
+    help = "Load test server: thông lượng, độ trễ p50/p95/p99 và tỉ lệ lỗi theo endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/api')
+        parser.add_argument('--users', type=int, default=20, help="Số user ảo chạy đồng thời.")
+        parser.add_argument('--duration', type=float, default=60, help="Số giây chạy (sau khi tạo dữ liệu).")
+        parser.add_argument('--think', type=float, default=1.0, help="Thời gian nghỉ trung bình giữa 2 thao tác (giây).")
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if urlsplit(options['base_url']).scheme != 'http':
+            raise CommandError("--base-url phải có dạng http://host:port/api")
+
+        stats = Stats()
+        run_id = int(time.time())
+        seed = options['seed'] if options['seed'] is not None else run_id
+        users = [
+            VirtualUser(options['base_url'], f"load_{run_id}_{i}", "LoadTest#2024", stats, random.Random(seed + i))
+            for i in range(options['users'])
+        ]
+
+        ready = []
+        threads = [threading.Thread(target=lambda u=user: u.setup() and ready.append(u)) for user in users]
+        self.run_threads(threads)
+        if not ready:
+            raise CommandError("Không user ảo nào đăng nhập được — server có đang chạy không?")
+        self.stdout.write(f"{len(ready)}/{len(users)} user ảo sẵn sàng, chạy {options['duration']:.0f}s…")
+
+        setup_stats, stats = stats, Stats()
+        for user in ready:
+            user.stats = stats
+        deadline = time.monotonic() + options['duration']
+        started = time.perf_counter()
+        self.run_threads([threading.Thread(target=user.run, args=(deadline, options['think'])) for user in ready])
+        elapsed = time.perf_counter() - started
+
+        self.report(stats, elapsed)
+        login = setup_stats.latencies.get('POST /token/', [])
+        if login:
+            self.stdout.write(f"Đăng nhập /token/: p50 {percentile(sorted(login), 50) * 1000:.0f} ms "
+                              f"/ p95 {percentile(sorted(login), 95) * 1000:.0f} ms")
+
+    @staticmethod
+    def run_threads(threads):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def report(self, stats, elapsed):
+        self.stdout.write(
+            f"{'Endpoint':<28}{'Số req':>8}{'req/s':>8}{'Lỗi %':>8}"
+            f"{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}  (ms)  mã lỗi"
+        )
+        total = errors = 0
+        for label in sorted(stats.latencies):
+            latencies = sorted(stats.latencies[label])
+            statuses = stats.statuses[label]
+            failed = {code: n for code, n in statuses.items() if code == 0 or code >= 400}
+            count, failed_count = len(latencies), sum(failed.values())
+            total += count
+            errors += failed_count
+            self.stdout.write(
+                f"{label:<28}{count:>8,}{count / elapsed:>8.1f}{failed_count / count * 100:>8.1f}"
+                + "".join(f"{percentile(latencies, p) * 1000:>8.0f}" for p in (50, 95, 99, 100))
+                + "        " + ", ".join(f"{code}×{n}" for code, n in sorted(failed.items()))
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Tổng: {total:,} request trong {elapsed:.1f}s = {total / elapsed:,.1f} req/s, "
+            f"lỗi {errors / total * 100 if total else 0:.1f}%"
+        ))
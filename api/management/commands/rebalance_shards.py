@@ -0,0 +1,88 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from ...models import Transaction
+from ...sharding import shard_aliases, move_user
+
+
+class Command(BaseCommand):
+    """
+    Cân bằng lại các shard theo số giao dịch: lần lượt chuyển user từ shard nặng
+    nhất sang shard nhẹ nhất khi việc đó làm chênh lệch giảm đi.
+
+    Ví dụ:
+        DB_SHARDS=3 python manage.py rebalance_shards --dry-run
+        DB_SHARDS=3 python manage.py rebalance_shards --tolerance 0.1
+        DB_SHARDS=3 python manage.py rebalance_shards --move 42:shard_2
+    """
+    help = "Chuyển user giữa các shard để cân bằng số giao dịch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ in kế hoạch, không chuyển dữ liệu.")
+        parser.add_argument('--tolerance', type=float, default=0.1,
+                            help="Dừng khi shard nặng nhất vượt mức trung bình không quá tỉ lệ này.")
+        parser.add_argument('--max-moves', type=int, default=100)
+        parser.add_argument('--move', help="Chuyển một user cụ thể: USER_ID:ALIAS.")
+
+    def handle(self, *args, **options):
+        aliases = shard_aliases()
+        if len(aliases) < 2:
+            raise CommandError("Chưa bật sharding (đặt biến môi trường DB_SHARDS >= 2).")
+
+        if options['move']:
+            user_id, _, target = options['move'].partition(':')
+            if target not in aliases:
+                raise CommandError(f"Alias không hợp lệ: {target!r} (có: {', '.join(aliases)}).")
+            plan = [(int(user_id), None, target, None)]
+        else:
+            plan = self.plan_moves(aliases, options['tolerance'], options['max_moves'])
+
+        if not plan:
+            self.stdout.write(self.style.SUCCESS("✅ Các shard đã cân bằng."))
+            return
+
+        started = time.perf_counter()
+        total = 0
+        for user_id, source, target, weight in plan:
+            label = f"user {user_id}: {source or '?'} -> {target}" + (f" ({weight:,} giao dịch)" if weight else "")
+            if options['dry_run']:
+                self.stdout.write(f"  [dry-run] {label}")
+                continue
+            moved = move_user(user_id, target)
+            total += moved
+            self.stdout.write(f"  {label}: đã chuyển {moved:,} dòng")
+
+        if not options['dry_run']:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Đã chuyển {len(plan)} user ({total:,} dòng) trong {elapsed:.2f}s."
+            ))
+
+    def plan_moves(self, aliases, tolerance, max_moves):
+        """Tham lam: [(user_id, nguồn, đích, số giao dịch)] — mỗi shard một truy vấn gom nhóm."""
+        users = {alias: {} for alias in aliases}
+        for alias in aliases:
+            rows = Transaction.objects.using(alias).order_by().values('user_id').annotate(n=Count('id'))
+            users[alias] = {row['user_id']: row['n'] for row in rows}
+        load = {alias: sum(counts.values()) for alias, counts in users.items()}
+        for alias in aliases:
+            self.stdout.write(f"  {alias}: {load[alias]:,} giao dịch / {len(users[alias]):,} user")
+
+        average = sum(load.values()) / len(aliases)
+        plan = []
+        while len(plan) < max_moves:
+            heavy = max(aliases, key=load.get)
+            light = min(aliases, key=load.get)
+            gap = load[heavy] - load[light]
+            if load[heavy] <= average * (1 + tolerance) or gap <= 0:
+                break
+            # user lớn nhất mà việc chuyển vẫn làm giảm chênh lệch (weight < gap)
+            candidates = [(n, uid) for uid, n in users[heavy].items() if 0 < n < gap]
+            if not candidates:
+                break
+            weight, user_id = max(candidates)
+            plan.append((user_id, heavy, light, weight))
+            users[light][user_id] = users[heavy].pop(user_id)
+            load[heavy] -= weight
+            load[light] += weight
+        return plan
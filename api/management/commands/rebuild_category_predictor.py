@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from ...services.predictor import rebuild
+from ...sharding import shard_aliases, shard_for_user, use_shard
+
+
+class Command(BaseCommand):
+    """
+    Đếm lại toàn bộ số liệu của bộ đoán danh mục từ giao dịch hiện có
+    (bình thường không cần — số đếm được cập nhật mỗi lần lưu giao dịch).
+
+    Ví dụ:
+        python manage.py rebuild_category_predictor
+        python manage.py rebuild_category_predictor --user 42
+    """
+    help = "Học lại bộ đoán danh mục từ toàn bộ giao dịch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Chỉ học lại cho user id này.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        aliases = [shard_for_user(options['user'])] if options['user'] else shard_aliases()
+        started = time.perf_counter()
+        learned = 0
+        for alias in aliases:
+            with use_shard(alias):
+                learned += rebuild(options['user'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Đã học {learned:,} giao dịch trong {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from ...services.autocomplete import rebuild
+from ...sharding import shard_aliases, shard_for_user, use_shard
+
+
+class Command(BaseCommand):
+    """
+    Dựng lại chỉ mục gợi ý mô tả từ giao dịch hiện có
+    (bình thường không cần — chỉ mục được cập nhật mỗi lần lưu giao dịch).
+
+    Ví dụ:
+        python manage.py rebuild_description_index
+        python manage.py rebuild_description_index --user 42
+    """
+    help = "Dựng lại chỉ mục gợi ý mô tả giao dịch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Chỉ dựng lại cho user id này.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        aliases = [shard_for_user(options['user'])] if options['user'] else shard_aliases()
+        started = time.perf_counter()
+        entries = 0
+        for alias in aliases:
+            with use_shard(alias):
+                entries += rebuild(options['user'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Đã dựng {entries:,} mô tả trong {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,80 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...models import Wallet
+from ...sharding import shard_aliases, shard_for_user
+from ...services.ledger import with_expected_balance, to_money
+
+
+class Command(BaseCommand):
+    """
+    Đối soát số dư ví: tính lại số dư kỳ vọng của MỌI ví bằng một truy vấn
+    gom nhóm trên toàn bộ giao dịch (mỗi shard một truy vấn) và báo cáo các ví bị lệch.
+
+    Ví dụ:
+        python manage.py reconcile_wallets
+        python manage.py reconcile_wallets --fix
+    """
+    help = "Đối soát số dư ví với tổng giao dịch; --fix để sửa hàng loạt."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help="Ghi lại số dư đúng cho các ví lệch (một lần bulk_update).")
+        parser.add_argument('--user', type=int, help="Chỉ đối soát ví của user id này.")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Số dòng đọc mỗi lần từ con trỏ CSDL (giới hạn bộ nhớ).")
+
+    def handle(self, *args, **options):
+        aliases = [shard_for_user(options['user'])] if options['user'] else shard_aliases()
+
+        started = time.perf_counter()
+        wallet_count = 0
+        transaction_count = 0
+        mismatches = {}  # alias -> [(id, expected)] — chỉ giữ các ví lệch
+
+        for alias in aliases:
+            wallets = Wallet.objects.using(alias)
+            if options['user']:
+                wallets = wallets.filter(user_id=options['user'])
+
+            # Chỉ lấy các cột cần thiết; kết quả là một dòng/ví nên được stream theo chunk
+            rows = (
+                with_expected_balance(wallets)
+                .order_by()
+                .values_list('id', 'user_id', 'name', 'balance', 'expected_balance', 'transaction_count')
+            )
+
+            for wallet_id, user_id, name, balance, expected, tx_count in rows.iterator(chunk_size=options['chunk_size']):
+                wallet_count += 1
+                transaction_count += tx_count
+                expected = to_money(expected)
+                if balance != expected:
+                    mismatches.setdefault(alias, []).append((wallet_id, expected))
+                    self.stdout.write(
+                        f"❌ Ví #{wallet_id} '{name}' (user {user_id}): "
+                        f"lưu {balance:,.2f} ≠ kỳ vọng {expected:,.2f} (lệch {balance - expected:+,.2f})"
+                    )
+
+        elapsed = time.perf_counter() - started
+        rate = transaction_count / elapsed if elapsed else 0
+        self.stdout.write(
+            f"Đã quét {transaction_count:,} giao dịch / {wallet_count:,} ví trong {elapsed:.2f}s "
+            f"({rate:,.0f} giao dịch/s). Số ví lệch: {sum(map(len, mismatches.values())):,}."
+        )
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("✅ Tất cả số dư ví đều khớp."))
+            return
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING("Chạy lại với --fix để cập nhật số dư."))
+            return
+
+        fixed = 0
+        for alias, wallets in mismatches.items():
+            with transaction.atomic(using=alias):
+                Wallet.objects.using(alias).bulk_update(
+                    [Wallet(id=wallet_id, balance=expected) for wallet_id, expected in wallets],
+                    ['balance'], batch_size=500,
+                )
+            fixed += len(wallets)
+        self.stdout.write(self.style.SUCCESS(f"✅ Đã sửa số dư {fixed:,} ví."))
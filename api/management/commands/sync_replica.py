@@ -0,0 +1,45 @@
+import sqlite3
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from ...db_router import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    """
+    Chép CSDL SQLite 'default' sang 'replica' bằng backup API (bản chụp nhất quán,
+    không cần dừng server) — dùng để thử router đọc/ghi ở máy local.
+    Với PostgreSQL/MySQL hãy dùng cơ chế replication của CSDL.
+
+    Ví dụ:
+        USE_READ_REPLICA=1 python manage.py sync_replica
+    """
+    help = "Đồng bộ bản sao SQLite 'replica' từ 'default'."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Lặp lại mỗi N giây (0 = chạy một lần).")
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.databases:
+            raise CommandError("Chưa cấu hình alias 'replica' (đặt USE_READ_REPLICA=1).")
+        primary = connections.databases['default']
+        replica = connections.databases[REPLICA_ALIAS]
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError("sync_replica chỉ hỗ trợ SQLite.")
+
+        while True:
+            started = time.perf_counter()
+            source = sqlite3.connect(str(primary['NAME']))
+            target = sqlite3.connect(str(replica['NAME']))
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Đã đồng bộ replica trong {(time.perf_counter() - started) * 1000:.0f}ms."
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
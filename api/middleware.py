@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .db_router import replica_reads, pin_to_primary, replica_enabled
+from .sharding import sharding_enabled, shard_for_user, use_shard
+from .profiling import profile_requested, profile_call, save_profile
+
+
+def user_id_from_jwt(request):
+    """Đọc user id từ access token mà không truy vấn CSDL (None nếu không có/không hợp lệ)."""
+    if not hasattr(request, '_jwt_user_id'):
+        request._jwt_user_id = _decode_user_id(request)
+    return request._jwt_user_id
+
+
+def _decode_user_id(request):
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authenticator.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Request an toàn (GET/HEAD/OPTIONS) đọc từ replica; request ghi thành công
+    ghim user vào primary một lúc để họ luôn thấy dữ liệu vừa ghi.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_enabled():
+            return self.get_response(request)
+
+        user_id = user_id_from_jwt(request)
+        safe = request.method in SAFE_METHODS
+        with replica_reads(user_id, enabled=safe):
+            response = self.get_response(request)
+
+        if not safe and user_id is not None and response.status_code < 400:
+            pin_to_primary(user_id)
+        return response
+
+
+class ShardRoutingMiddleware:
+    """Mọi truy vấn của request (không chỉ trong BaseViewSet) đi tới shard của user đang gọi API."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not sharding_enabled():
+            return self.get_response(request)
+
+        with use_shard(shard_for_user(user_id_from_jwt(request))):
+            return self.get_response(request)
+
+
+class RequestProfilingMiddleware:
+    """
+    Staff gửi header "X-Profile: 1" (hoặc ?_profile=1): request chạy dưới
+    profiler, kết quả (flame graph dạng folded + SQL) được lưu lại và trả id
+    trong header X-Profile-Id — tải về ở /api/profiles/<id>/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request) or not self.is_staff(request):
+            return self.get_response(request)
+
+        response, profile = profile_call(self.get_response, request)
+        profile.update(method=request.method, path=request.get_full_path(), status=response.status_code)
+        profile_id = save_profile(profile)
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Summary'] = (
+            f"{profile['duration_ms']} ms, {profile['query_count']} queries / {profile['query_ms']} ms SQL"
+        )
+        return response
+
+    @staticmethod
+    def is_staff(request):
+        user_id = user_id_from_jwt(request)
+        if user_id is None:
+            return request.user.is_authenticated and request.user.is_staff  # phiên đăng nhập admin
+        return User.objects.using('default').filter(pk=user_id, is_staff=True).exists()
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:13
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, When, F, Sum, DecimalField
+
+
+def backfill_opening_balance(apps, schema_editor):
+    """Lấy số dư hiện tại làm chuẩn: opening_balance = balance - (thu - chi)."""
+    Wallet = apps.get_model('api', 'Wallet')
+    signed = Case(
+        When(transactions__category__type='income', then=F('transactions__amount')),
+        default=-F('transactions__amount'),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+    wallets = []
+    for wallet in Wallet.objects.annotate(net_amount=Sum(signed)).iterator(chunk_size=2000):
+        net = Decimal(wallet.net_amount or 0).quantize(Decimal('0.01'))
+        wallet.opening_balance = wallet.balance - net
+        wallets.append(wallet)
+    Wallet.objects.bulk_update(wallets, ['opening_balance'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_category_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.RunPython(backfill_opening_balance, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+# Chép từ api.services.search tại thời điểm viết migration — migration không import
+# code ứng dụng để lịch sử không đổi theo code hiện tại.
+SQLITE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ai AFTER INSERT ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(rowid, description)
+            VALUES (new.id, replace(replace(coalesce(new.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ad AFTER DELETE ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description)
+            VALUES ('delete', old.id, replace(replace(coalesce(old.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_au AFTER UPDATE OF description ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description)
+            VALUES ('delete', old.id, replace(replace(coalesce(old.description, ''), 'đ', 'd'), 'Đ', 'D'));
+        INSERT INTO api_transaction_fts(rowid, description)
+            VALUES (new.id, replace(replace(coalesce(new.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+]
+
+SQLITE_FORWARD = [
+    # Bảng FTS5 contentless: chỉ lưu chỉ mục, không nhân đôi nội dung mô tả.
+    # unicode61 remove_diacritics 2 bỏ dấu tiếng Việt; riêng 'đ/Đ' được thay bằng replace().
+    """CREATE VIRTUAL TABLE api_transaction_fts USING fts5(
+        description, content='', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """INSERT INTO api_transaction_fts(rowid, description)
+        SELECT id, replace(replace(coalesce(description, ''), 'đ', 'd'), 'Đ', 'D') FROM api_transaction""",
+    *SQLITE_FTS_TRIGGERS,
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS api_transaction_fts_au",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_ad",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_ai",
+    "DROP TABLE IF EXISTS api_transaction_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # unaccent() chỉ là STABLE nên không dùng trực tiếp trong chỉ mục được
+    """CREATE OR REPLACE FUNCTION api_immutable_unaccent(text) RETURNS text
+        AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT""",
+    """CREATE INDEX api_transaction_desc_trgm ON api_transaction
+        USING gin (api_immutable_unaccent(lower(description)) gin_trgm_ops)""",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS api_transaction_desc_trgm",
+    "DROP FUNCTION IF EXISTS api_immutable_unaccent(text)",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_wallet_opening_balance'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Chép từ api.services.search tại thời điểm viết migration (không import code ứng dụng)
+SQLITE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ai AFTER INSERT ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(rowid, description)
+            VALUES (new.id, replace(replace(coalesce(new.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ad AFTER DELETE ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description)
+            VALUES ('delete', old.id, replace(replace(coalesce(old.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_au AFTER UPDATE OF description ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description)
+            VALUES ('delete', old.id, replace(replace(coalesce(old.description, ''), 'đ', 'd'), 'Đ', 'D'));
+        INSERT INTO api_transaction_fts(rowid, description)
+            VALUES (new.id, replace(replace(coalesce(new.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+]
+
+
+def ensure_sqlite_fts_triggers(apps, schema_editor):
+    """SQLite dựng lại bảng api_transaction thì mất trigger FTS — tạo lại nếu bảng FTS có."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'api_transaction_fts'")
+        if cursor.fetchone() is None:
+            return
+    for statement in SQLITE_FTS_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+TRANSFER_OUT_NAME = "Chuyển tiền đi"
+TRANSFER_IN_NAME = "Nhận tiền"
+
+
+def link_legacy_transfers(apps, schema_editor):
+    """
+    Ghép các cặp giao dịch do TransferView cũ tạo thành Transfer.
+    View cũ tạo chân chi rồi chân thu liền nhau nên id chân thu = id chân chi + 1,
+    cùng user, số tiền và ngày.
+    """
+    Category = apps.get_model('api', 'Category')
+    Transaction = apps.get_model('api', 'Transaction')
+    Transfer = apps.get_model('api', 'Transfer')
+
+    Category.objects.filter(name=TRANSFER_OUT_NAME, type='expense').update(is_system=True)
+    Category.objects.filter(name=TRANSFER_IN_NAME, type='income').update(is_system=True)
+
+    incoming = {
+        row[0]: row for row in Transaction.objects.filter(
+            category__name=TRANSFER_IN_NAME, category__type='income', transfer__isnull=True
+        ).values_list('id', 'user_id', 'wallet_id', 'amount', 'date')
+    }
+    outgoing = Transaction.objects.filter(
+        category__name=TRANSFER_OUT_NAME, category__type='expense', transfer__isnull=True
+    ).values_list('id', 'user_id', 'wallet_id', 'amount', 'date', 'description')
+
+    for out_id, user_id, wallet_id, amount, date, description in outgoing.iterator(chunk_size=2000):
+        leg = incoming.get(out_id + 1)
+        if leg is None:
+            continue
+        in_id, in_user_id, in_wallet_id, in_amount, in_date = leg
+        if (in_user_id, in_amount, in_date) != (user_id, amount, date):
+            continue
+        transfer = Transfer.objects.create(
+            user_id=user_id, from_wallet_id=wallet_id, to_wallet_id=in_wallet_id, amount=amount, date=date,
+            description=(description or '').rsplit(' (đến ', 1)[0].strip()[:200],
+        )
+        Transaction.objects.filter(id__in=[out_id, in_id]).update(transfer=transfer)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_transaction_fulltext_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='is_system',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='Transfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('date', models.DateField()),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('from_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers_out', to='api.wallet')),
+                ('to_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers_in', to='api.wallet')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Transfer',
+                'verbose_name_plural': 'Transfers',
+                'ordering': ['-date', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='transfer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='legs', to='api.transfer'),
+        ),
+        migrations.RunPython(ensure_sqlite_fts_triggers, migrations.RunPython.noop),
+        migrations.RunPython(link_legacy_transfers, migrations.RunPython.noop),
+    ]
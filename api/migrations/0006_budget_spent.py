@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:21
+
+import django.db.models.deletion
+from django.conf import settings
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_spent(apps, schema_editor):
+    """Tính spent cho các ngân sách hiện có bằng một truy vấn gom nhóm."""
+    Budget = apps.get_model('api', 'Budget')
+    Transaction = apps.get_model('api', 'Transaction')
+
+    totals = {
+        (row['user_id'], row['category_id'], row['year'], row['month']): row['total']
+        for row in Transaction.objects.filter(category__type='expense', transfer__isnull=True)
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('user_id', 'category_id', 'year', 'month')
+        .annotate(total=Sum('amount'))
+    }
+    budgets = list(Budget.objects.all())
+    for budget in budgets:
+        total = totals.get((budget.user_id, budget.category_id, budget.year, budget.month))
+        budget.spent = Decimal(total or 0).quantize(Decimal('0.01'))
+    Budget.objects.bulk_update(budgets, ['spent'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_transfer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='spent',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.PositiveSmallIntegerField()),
+                ('spent', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='api.budget')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(backfill_spent, migrations.RunPython.noop),
+    ]
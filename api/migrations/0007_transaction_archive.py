@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_budget_spent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon', models.DateField()),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-horizon'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='api.category')),
+                ('transfer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_legs', to='api.transfer')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='api.wallet')),
+            ],
+            options={
+                'verbose_name': 'Archived transaction',
+                'verbose_name_plural': 'Archived transactions',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['user', 'date'], name='api_archive_user_id_e6858a_idx')],
+            },
+        ),
+    ]
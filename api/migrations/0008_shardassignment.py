@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_transaction_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(default='default', max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='shard_assignment', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Shard assignment',
+                'verbose_name_plural': 'Shard assignments',
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:39
+
+import re
+import unicodedata
+import django.db.models.deletion
+from django.conf import settings
+from collections import Counter
+from django.db import migrations, models
+
+# Chép từ api.services.search / predictor tại thời điểm viết migration (không import code ứng dụng)
+DOC_TOKEN = ''
+MAX_TOKEN_LENGTH = 40
+_EXTRA_FOLD = str.maketrans({'đ': 'd', 'Đ': 'D'})
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFD', (text or '').translate(_EXTRA_FOLD))
+    return _TOKEN_RE.findall(''.join(ch for ch in text if unicodedata.category(ch) != 'Mn').lower())
+
+
+def description_tokens(description):
+    return sorted({
+        token[:MAX_TOKEN_LENGTH] for token in tokenize(description)
+        if not token[0].isdigit()
+    })
+
+
+def learn_existing_transactions(apps, schema_editor):
+    """Học từ các giao dịch sẵn có (kể cả kho lưu trữ, trừ chuyển tiền) — một lượt đọc + bulk_create."""
+    alias = schema_editor.connection.alias
+    CategoryTokenCount = apps.get_model('api', 'CategoryTokenCount')
+    counts = Counter()
+    for model_name in ('Transaction', 'ArchivedTransaction'):
+        rows = apps.get_model('api', model_name).objects.using(alias).filter(transfer__isnull=True)
+        for user_id, category_id, description in rows.values_list(
+            'user_id', 'category_id', 'description'
+        ).iterator(chunk_size=5000):
+            for token in [DOC_TOKEN, *description_tokens(description)]:
+                counts[(user_id, category_id, token)] += 1
+    CategoryTokenCount.objects.using(alias).bulk_create(
+        [CategoryTokenCount(user_id=user_id, category_id=category_id, token=token, count=count)
+         for (user_id, category_id, token), count in counts.items()],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_shardassignment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryTokenCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(blank=True, max_length=40)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_counts', to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_token_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'token'], name='api_categor_user_id_70a3e3_idx')],
+                'unique_together': {('user', 'category', 'token')},
+            },
+        ),
+        migrations.RunPython(learn_existing_transactions, migrations.RunPython.noop),
+    ]
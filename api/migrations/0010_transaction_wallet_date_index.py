@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_category_token_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', 'date', 'id'], name='api_transac_wallet__4854cb_idx'),
+        ),
+    ]
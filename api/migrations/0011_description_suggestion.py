@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:48
+
+import re
+import unicodedata
+import django.db.models.deletion
+from django.conf import settings
+from itertools import chain
+from django.db import migrations, models
+
+# Chép từ api.services.search / autocomplete tại thời điểm viết migration (không import code ứng dụng)
+MAX_KEY_LENGTH = 100
+MAX_DESCRIPTION_LENGTH = 255
+_EXTRA_FOLD = str.maketrans({'đ': 'd', 'Đ': 'D'})
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def description_key(description):
+    text = unicodedata.normalize('NFD', (description or '').translate(_EXTRA_FOLD))
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn').lower()
+    return ' '.join(_TOKEN_RE.findall(text))[:MAX_KEY_LENGTH]
+
+
+def index_entries(rows):
+    """(user_id, description, date, wallet_id, category_id, amount) theo (date, id) -> {(user_id, key): giá trị}."""
+    entries = {}
+    for owner_id, description, date, wallet_id, category_id, amount in rows:
+        key = description_key(description)
+        if not key:
+            continue
+        entry = entries.setdefault((owner_id, key), {'count': 0})
+        entry['count'] += 1
+        entry.update(
+            description=description.strip()[:MAX_DESCRIPTION_LENGTH], last_used=date,
+            wallet_id=wallet_id, category_id=category_id, amount=amount,
+        )
+    return entries
+
+
+def index_existing_descriptions(apps, schema_editor):
+    """Dựng chỉ mục gợi ý từ các giao dịch sẵn có (kho lưu trữ trước, trừ chuyển tiền)."""
+    alias = schema_editor.connection.alias
+    DescriptionSuggestion = apps.get_model('api', 'DescriptionSuggestion')
+    rows = chain.from_iterable(
+        apps.get_model('api', model_name).objects.using(alias).filter(transfer__isnull=True)
+        .order_by('date', 'id')
+        .values_list('user_id', 'description', 'date', 'wallet_id', 'category_id', 'amount')
+        .iterator(chunk_size=5000)
+        for model_name in ('ArchivedTransaction', 'Transaction')
+    )
+    DescriptionSuggestion.objects.using(alias).bulk_create(
+        [DescriptionSuggestion(user_id=user_id, key=key, **values)
+         for (user_id, key), values in index_entries(rows).items()],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_transaction_wallet_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DescriptionSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('description', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_used', models.DateField()),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='description_suggestions', to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='description_suggestions', to=settings.AUTH_USER_MODEL)),
+                ('wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='description_suggestions', to='api.wallet')),
+            ],
+            options={
+                'unique_together': {('user', 'key')},
+            },
+        ),
+        migrations.RunPython(index_existing_descriptions, migrations.RunPython.noop),
+    ]
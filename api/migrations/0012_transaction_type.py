@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:55
+
+from django.db import migrations, models
+
+# Chép từ api.services.search tại thời điểm viết migration (không import code ứng dụng)
+SQLITE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ai AFTER INSERT ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(rowid, description)
+            VALUES (new.id, replace(replace(coalesce(new.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ad AFTER DELETE ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description)
+            VALUES ('delete', old.id, replace(replace(coalesce(old.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_transaction_fts_au AFTER UPDATE OF description ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description)
+            VALUES ('delete', old.id, replace(replace(coalesce(old.description, ''), 'đ', 'd'), 'Đ', 'D'));
+        INSERT INTO api_transaction_fts(rowid, description)
+            VALUES (new.id, replace(replace(coalesce(new.description, ''), 'đ', 'd'), 'Đ', 'D'));
+    END""",
+]
+
+
+def ensure_sqlite_fts_triggers(apps, schema_editor):
+    """SQLite dựng lại bảng api_transaction thì mất trigger FTS — tạo lại nếu bảng FTS có."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'api_transaction_fts'")
+        if cursor.fetchone() is None:
+            return
+    for statement in SQLITE_FTS_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+def copy_category_type(apps, schema_editor):
+    """Chép Category.type sang giao dịch (mặc định 'expense' nên chỉ cần sửa các khoản thu)."""
+    alias = schema_editor.connection.alias
+    for model_name in ('Transaction', 'ArchivedTransaction'):
+        apps.get_model('api', model_name).objects.using(alias).filter(
+            category__type='income'
+        ).update(type='income')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_description_suggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('expense', 'Expense'), ('income', 'Income')], default='expense', editable=False, max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='type',
+            field=models.CharField(choices=[('expense', 'Expense'), ('income', 'Income')], default='expense', editable=False, max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'type', 'date'], name='api_transac_user_id_2ffc60_idx'),
+        ),
+        migrations.RunPython(copy_category_type, migrations.RunPython.noop),
+        # SQLite dựng lại bảng api_transaction khi thêm cột NOT NULL -> mất trigger FTS
+        migrations.RunPython(ensure_sqlite_fts_triggers, migrations.RunPython.noop),
+    ]
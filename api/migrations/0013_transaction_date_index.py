@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_transaction_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'id'], name='api_transac_date_305668_idx'),
+        ),
+    ]
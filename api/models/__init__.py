@@ -1,4 +1,9 @@
 from .category import Category
 from .wallet import Wallet
 from .transaction import Transaction
-from .budget import Budget
+from .transfer import Transfer
+from .budget import Budget, BudgetAlert
+from .archive import ArchivedTransaction, ArchiveCheckpoint
+from .shard import ShardAssignment
+from .predictor import CategoryTokenCount
+from .autocomplete import DescriptionSuggestion
@@ -0,0 +1,50 @@
+from django.db import models
+from django.contrib.auth.models import User
+from ..sharding import ShardedManager
+from .wallet import Wallet
+from .category import Category
+from .transfer import Transfer
+
+
+class ArchivedTransaction(models.Model):
+    """
+    Giao dịch cũ đã được chuyển sang bảng lưu trữ (chỉ đọc), giữ nguyên id gốc.
+    Cùng tên trường với Transaction để các truy vấn báo cáo dùng chung được.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_transactions")
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="archived_transactions")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="archived_transactions")
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    description = models.TextField(blank=True, null=True)
+    date = models.DateField()
+    type = models.CharField(max_length=10, choices=Category.TYPE_CHOICES, editable=False)
+    # Luôn NULL (chân chuyển tiền không bị lưu trữ) — giữ để bộ lọc transfer__isnull dùng chung
+    transfer = models.ForeignKey(
+        Transfer, on_delete=models.CASCADE, related_name="archived_legs", null=True, blank=True
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        verbose_name = "Archived transaction"
+        verbose_name_plural = "Archived transactions"
+        ordering = ["-date"]
+        indexes = [models.Index(fields=["user", "date"])]
+
+    def __str__(self):
+        return f"[archived] {self.category_id}: {self.amount:,.0f}đ ({self.date})"
+
+
+class ArchiveCheckpoint(models.Model):
+    """Mỗi lần chạy archive_transactions: mọi giao dịch có date < horizon đã nằm trong kho lưu trữ."""
+    horizon = models.DateField()
+    rows = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-horizon"]
+
+    def __str__(self):
+        return f"< {self.horizon}: {self.rows:,} giao dịch"
@@ -0,0 +1,33 @@
+from django.db import models
+from django.contrib.auth.models import User
+from ..sharding import ShardedManager
+from .wallet import Wallet
+from .category import Category
+
+
+class DescriptionSuggestion(models.Model):
+    """
+    Chỉ mục gợi ý mô tả giao dịch của từng user: mỗi mô tả (chuẩn hóa về `key` bỏ dấu,
+    viết thường) một dòng, kèm số lần dùng và ví/danh mục/số tiền của lần dùng gần nhất.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="description_suggestions")
+    key = models.CharField(max_length=100)
+    description = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    last_used = models.DateField()
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.SET_NULL, null=True, blank=True, related_name="description_suggestions"
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="description_suggestions"
+    )
+    amount = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        # (user, key) cũng là chỉ mục cho truy vấn tiền tố key >= 'tien d' AND key < 'tien d\uffff'
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"{self.description} ×{self.count}"
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ..sharding import ShardedManager
 from .category import Category
 import datetime
 
@@ -10,9 +11,41 @@ class Budget(models.Model):
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     month = models.IntegerField(default=datetime.date.today().month)
     year = models.IntegerField(default=datetime.date.today().year)
+    # Tổng chi đã ghi nhận trong tháng — cập nhật cùng transaction với mỗi lần ghi khoản chi
+    spent = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    objects = ShardedManager()
 
     class Meta:
         unique_together = ('user', 'category', 'month', 'year')
 
     def __str__(self):
         return f"{self.category.name} - {self.month}/{self.year}: {self.amount}"
+
+    @property
+    def remaining(self):
+        return self.amount - self.spent
+
+    @property
+    def percent_used(self):
+        if not self.amount:
+            return None
+        return round(self.spent / self.amount * 100, 2)
+
+
+class BudgetAlert(models.Model):
+    """Sự kiện: mức chi của một ngân sách vừa vượt một ngưỡng (vd: 80%, 100%)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts')
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='alerts')
+    threshold = models.PositiveSmallIntegerField()
+    spent = models.DecimalField(max_digits=15, decimal_places=2)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.budget_id}: vượt {self.threshold}% ({self.spent}/{self.amount})"
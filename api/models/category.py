@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ..sharding import ShardedManager
 
 
 class Category(models.Model):
@@ -13,6 +14,10 @@ class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="categories")
     name = models.CharField(max_length=100)
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    # Danh mục do hệ thống tạo (vd: chuyển tiền) — không cho sửa/xóa qua API
+    is_system = models.BooleanField(default=False)
+
+    objects = ShardedManager()
 
     class Meta:
         verbose_name = "Category"
@@ -0,0 +1,24 @@
+from django.db import models
+from django.contrib.auth.models import User
+from ..sharding import ShardedManager
+from .category import Category
+
+
+class CategoryTokenCount(models.Model):
+    """
+    Số đếm cho bộ đoán danh mục (naive Bayes) của từng user: số giao dịch thuộc
+    `category` có mô tả chứa `token` (đã bỏ dấu). token rỗng = tổng số giao dịch của danh mục.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="category_token_counts")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="token_counts")
+    token = models.CharField(max_length=40, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    objects = ShardedManager()
+
+    class Meta:
+        unique_together = ("user", "category", "token")
+        indexes = [models.Index(fields=["user", "token"])]
+
+    def __str__(self):
+        return f"{self.category_id}:{self.token or '*'} = {self.count}"
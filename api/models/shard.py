@@ -0,0 +1,16 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class ShardAssignment(models.Model):
+    """User nằm ở shard nào (bảng toàn cục, luôn ở 'default'). Không có dòng = 'default'."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="shard_assignment")
+    alias = models.CharField(max_length=50, default='default')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Shard assignment"
+        verbose_name_plural = "Shard assignments"
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.alias}"
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ..sharding import ShardedManager
 from .wallet import Wallet
 from .category import Category
 
@@ -11,26 +12,47 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     description = models.TextField(blank=True, null=True)
     date = models.DateField(auto_now_add=False)
+    # Bản sao Category.type (thu/chi), đồng bộ khi lưu và khi danh mục đổi loại —
+    # báo cáo và tính số dư không phải JOIN sang Category chỉ để biết dấu
+    type = models.CharField(max_length=10, choices=Category.TYPE_CHOICES, editable=False)
+    # Khác NULL nếu giao dịch là một chân của lần chuyển tiền giữa 2 ví
+    transfer = models.ForeignKey(
+        "Transfer", on_delete=models.CASCADE, related_name="legs", null=True, blank=True
+    )
+
+    objects = ShardedManager()
 
     class Meta:
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
         ordering = ["-date"]
+        indexes = [
+            # Sao kê ví: phân trang keyset theo (date, id) trong một ví
+            models.Index(fields=["wallet", "date", "id"]),
+            # Báo cáo thu/chi theo khoảng ngày: lọc (user, type, date) không cần JOIN Category
+            models.Index(fields=["user", "type", "date"]),
+            # Trang quản trị: sắp xếp mặc định (-date, -id) và date_hierarchy (MIN/MAX date)
+            models.Index(fields=["date", "id"]),
+        ]
 
     def __str__(self):
-        sign = "+" if self.category.type == Category.TYPE_INCOME else "-"
+        sign = "+" if self.type == Category.TYPE_INCOME else "-"
         return f"{self.category.name}: {sign}{self.amount:,.0f}đ ({self.date})"
 
+    def save(self, *args, **kwargs):
+        self.type = self.category.type
+        super().save(*args, **kwargs)
+
     # --- Cập nhật số dư ví ---
     def apply_to_wallet(self):
-        if self.category.type == Category.TYPE_INCOME:
+        if self.type == Category.TYPE_INCOME:
             self.wallet.balance += self.amount
         else:
             self.wallet.balance -= self.amount
         self.wallet.save()
 
     def revert_from_wallet(self):
-        if self.category.type == Category.TYPE_INCOME:
+        if self.type == Category.TYPE_INCOME:
             self.wallet.balance -= self.amount
         else:
             self.wallet.balance += self.amount
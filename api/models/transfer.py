@@ -0,0 +1,28 @@
+from django.db import models
+from django.contrib.auth.models import User
+from ..sharding import ShardedManager
+from .wallet import Wallet
+
+
+class Transfer(models.Model):
+    """
+    Một lần chuyển tiền giữa 2 ví. Hai giao dịch (chi ở ví nguồn, thu ở ví đích)
+    trỏ về đây qua Transaction.transfer nên được sửa/xóa cùng nhau.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="transfers")
+    from_wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transfers_out")
+    to_wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transfers_in")
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    date = models.DateField()
+    description = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        verbose_name = "Transfer"
+        verbose_name_plural = "Transfers"
+        ordering = ["-date", "-id"]
+
+    def __str__(self):
+        return f"{self.from_wallet_id} → {self.to_wallet_id}: {self.amount:,.0f}đ ({self.date})"
@@ -1,11 +1,16 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ..sharding import ShardedManager
 
 
 class Wallet(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="wallets")
     name = models.CharField(max_length=100)
     balance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    # Số dư lúc tạo ví (cộng dồn các lần sửa số dư thủ công) — gốc để đối soát
+    opening_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    objects = ShardedManager()
 
     class Meta:
         verbose_name = "Wallet"
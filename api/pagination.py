@@ -0,0 +1,48 @@
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class MergedLimitOffsetPagination(LimitOffsetPagination):
+    """
+    ?limit=&offset= cho danh sách gộp từ nhiều bảng (giao dịch nóng + lưu trữ).
+    Mỗi bảng chỉ đọc offset + limit + 1 dòng đầu theo cùng thứ tự rồi trộn trong
+    Python — không tải cả bảng và không COUNT(*) (trang sau có hay không nhờ dòng +1).
+    """
+    default_limit = 100
+    max_limit = 500
+
+    def paginate_merged(self, querysets, order_by, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        # Hòa thứ tự theo id để cửa sổ cắt của từng bảng và thứ tự trộn khớp nhau
+        order_by = [*order_by, '-id'] if not {'id', '-id', 'pk', '-pk'} & set(order_by) else list(order_by)
+        window = self.offset + self.limit + 1
+        items = self.sort_like(
+            [obj for queryset in querysets for obj in queryset.order_by(*order_by)[:window]], order_by
+        )
+        self.has_next = len(items) > self.offset + self.limit
+        return items[self.offset:self.offset + self.limit]
+
+    @staticmethod
+    def sort_like(items, order_by):
+        """Sắp xếp list theo order_by kiểu Django ('-date', 'amount', ...)."""
+        for field in reversed(order_by):
+            name = field.lstrip('-')
+            items.sort(key=lambda item: getattr(item, name), reverse=field.startswith('-'))
+        return items
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,130 @@
+"""
+Profiling theo yêu cầu cho một request cụ thể (chỉ staff): lấy mẫu call stack
+định kỳ (định dạng "folded" dùng được với flamegraph.pl / speedscope) và ghi
+lại mọi câu SQL cùng thời gian chạy. Kết quả được lưu trong cache để tải về.
+"""
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'   # gửi header "X-Profile: 1"
+PROFILE_PARAM = '_profile'          # hoặc query ?_profile=1
+MAX_QUERIES = 1000                  # request có nhiều hơn thì chỉ giữ bấy nhiêu câu đầu
+
+
+def profile_cache_key(profile_id):
+    return f"request-profile:{profile_id}"
+
+
+def profile_requested(request):
+    return bool(request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM))
+
+
+def _frame_label(code):
+    path = Path(code.co_filename)
+    try:
+        path = path.relative_to(settings.BASE_DIR)
+    except ValueError:
+        # thư viện: bỏ phần đường dẫn tới site-packages
+        parts = path.parts
+        if 'site-packages' in parts:
+            path = Path(*parts[parts.index('site-packages') + 1:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Luồng phụ lấy mẫu call stack của `thread_id` mỗi `interval` giây."""
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        """Mỗi dòng: "khung_gốc;...;khung_lá số_mẫu"."""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    """execute_wrapper ghi lại SQL, alias CSDL và thời gian chạy (ms) của mọi kết nối."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+def profile_call(func, *args, **kwargs):
+    """Chạy func dưới profiler; trả về (kết quả, dict profile chưa có thông tin request)."""
+    interval = getattr(settings, 'REQUEST_PROFILE_INTERVAL', 0.001)
+    sampler = StackSampler(threading.get_ident(), interval)
+    recorder = QueryRecorder()
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        with recorder.record():
+            result = func(*args, **kwargs)
+    finally:
+        sampler.stop()
+    elapsed = (time.perf_counter() - started) * 1000
+    return result, {
+        'duration_ms': round(elapsed, 1),
+        'sample_interval_ms': interval * 1000,
+        'query_count': len(recorder.queries),
+        'query_ms': round(sum(q['ms'] for q in recorder.queries), 1),
+        'queries': recorder.queries,
+        'folded': sampler.folded(),
+    }
+
+
+def save_profile(profile):
+    profile_id = uuid.uuid4().hex
+    cache.set(profile_cache_key(profile_id), profile, getattr(settings, 'REQUEST_PROFILE_TTL', 3600))
+    return profile_id
+
+
+def load_profile(profile_id):
+    return cache.get(profile_cache_key(profile_id))
@@ -2,4 +2,4 @@ from .user_serializer import UserSerializer
 from .category_serializer import CategorySerializer
 from .wallet_serializer import WalletSerializer
 from .transaction_serializer import TransactionSerializer, TransferSerializer
-from .budget_serializer import BudgetSerializer
+from .budget_serializer import BudgetSerializer, BudgetAlertSerializer
@@ -1,15 +1,33 @@
 from rest_framework import serializers
-from ..models import Budget
+from ..models import Budget, BudgetAlert
 from .category_serializer import CategorySerializer
 
 
 class BudgetSerializer(serializers.ModelSerializer):
     """
     Serializer cho ngân sách người dùng theo tháng/năm.
+    - spent được duy trì sẵn trên Budget nên remaining/percent_used không tốn truy vấn
     """
     category_details = CategorySerializer(source='category', read_only=True)
+    remaining = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    # spent tối đa 15 chữ số / amount nhỏ nhất 0.01 → phần trăm có thể tới 18 chữ số phần nguyên
+    percent_used = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
 
     class Meta:
         model = Budget
-        fields = ('id', 'category', 'amount', 'month', 'year', 'category_details')
-        read_only_fields = ('user', 'category_details')
+        fields = ('id', 'category', 'amount', 'month', 'year', 'spent', 'remaining', 'percent_used',
+                  'category_details')
+        read_only_fields = ('user', 'spent', 'category_details')
+
+
+class BudgetAlertSerializer(serializers.ModelSerializer):
+    """
+    Serializer cho sự kiện vượt ngưỡng ngân sách.
+    """
+    category_name = serializers.CharField(source='budget.category.name', read_only=True)
+    month = serializers.IntegerField(source='budget.month', read_only=True)
+    year = serializers.IntegerField(source='budget.year', read_only=True)
+
+    class Meta:
+        model = BudgetAlert
+        fields = ('id', 'budget', 'category_name', 'month', 'year', 'threshold', 'spent', 'amount', 'created_at')
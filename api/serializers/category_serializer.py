@@ -11,4 +11,4 @@ class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
-        read_only_fields = ('user',)
+        read_only_fields = ('user', 'is_system')
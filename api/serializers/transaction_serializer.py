@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from ..models import Transaction
+from ..models import Transaction, Transfer
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -14,16 +14,37 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = '__all__'
-        read_only_fields = ('user',)
+        read_only_fields = ('user', 'transfer')
 
+    def validate_category(self, category):
+        # Danh mục hệ thống chỉ dành cho 2 chân của chuyển tiền (/transfers/)
+        if category.is_system:
+            raise serializers.ValidationError("Không thể dùng danh mục hệ thống cho giao dịch thu/chi.")
+        return category
 
-class TransferSerializer(serializers.Serializer):
+
+class TransferSerializer(serializers.ModelSerializer):
     """
-    Serializer không liên kết với model.
-    Dùng để xác thực dữ liệu đầu vào cho API chuyển tiền giữa các ví.
+    Serializer cho lần chuyển tiền giữa các ví.
+    Giữ nguyên tên trường đầu vào cũ (from_wallet_id, to_wallet_id) cho client.
     """
-    amount = serializers.DecimalField(max_digits=15, decimal_places=2)
     from_wallet_id = serializers.IntegerField()
     to_wallet_id = serializers.IntegerField()
-    date = serializers.DateField()
+    from_wallet_name = serializers.CharField(source='from_wallet.name', read_only=True)
+    to_wallet_name = serializers.CharField(source='to_wallet.name', read_only=True)
     description = serializers.CharField(required=False, allow_blank=True, max_length=200)
+
+    class Meta:
+        model = Transfer
+        fields = ('id', 'amount', 'from_wallet_id', 'to_wallet_id', 'from_wallet_name', 'to_wallet_name',
+                  'date', 'description', 'created_at')
+        read_only_fields = ('created_at',)
+
+    def validate(self, attrs):
+        from_id = attrs.get('from_wallet_id', getattr(self.instance, 'from_wallet_id', None))
+        to_id = attrs.get('to_wallet_id', getattr(self.instance, 'to_wallet_id', None))
+        if from_id == to_id:
+            raise serializers.ValidationError("Ví nguồn và ví đích không được trùng nhau.")
+        if 'amount' in attrs and attrs['amount'] <= 0:
+            raise serializers.ValidationError({"amount": "Số tiền phải lớn hơn 0."})
+        return attrs
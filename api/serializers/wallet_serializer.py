@@ -11,7 +11,7 @@ class WalletSerializer(serializers.ModelSerializer):
     class Meta:
         model = Wallet
         fields = '__all__'
-        read_only_fields = ('user',)
+        read_only_fields = ('user', 'opening_balance')
 
     def get_formatted_balance(self, obj):
         """
@@ -0,0 +1,82 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.core.cache import cache
+from ..models import Transaction, ArchivedTransaction, ArchiveCheckpoint, Category
+from ..sharding import shard_atomic
+from .ledger import apply_wallet_deltas
+
+HORIZON_CACHE_KEY = 'transaction-archive-horizon'
+ARCHIVED_FIELDS = ('id', 'user_id', 'wallet_id', 'category_id', 'amount', 'description', 'date', 'type')
+
+
+def archive_horizon():
+    """Mốc lưu trữ hiện tại: mọi giao dịch có date < mốc nằm ở bảng lưu trữ (None nếu chưa có)."""
+    horizon = cache.get(HORIZON_CACHE_KEY, 'missing')
+    if horizon == 'missing':
+        horizon = ArchiveCheckpoint.objects.values_list('horizon', flat=True).first()
+        cache.set(HORIZON_CACHE_KEY, horizon, 300)
+    return horizon
+
+
+def reaches_archive(start_date):
+    """Khoảng ngày bắt đầu từ `start_date` (None = không giới hạn) có chạm vào kho lưu trữ không."""
+    horizon = archive_horizon()
+    return horizon is not None and (start_date is None or start_date < horizon)
+
+
+def transaction_models(start_date=None):
+    """Các bảng cần truy vấn cho khoảng ngày bắt đầu từ `start_date`: bảng nóng, và bảng lạnh nếu cần."""
+    if reaches_archive(start_date):
+        return [Transaction, ArchivedTransaction]
+    return [Transaction]
+
+
+def merge_aggregates(querysets, keys, sums):
+    """
+    Gộp kết quả .values(*keys).annotate(*sums) chạy trên nhiều bảng:
+    các dòng trùng khóa được cộng dồn, thứ tự xuất hiện đầu tiên được giữ.
+    """
+    merged = {}
+    for queryset in querysets:
+        for row in queryset:
+            key = tuple(row[k] for k in keys)
+            if key not in merged:
+                merged[key] = dict(row)
+            else:
+                for field in sums:
+                    merged[key][field] = (merged[key][field] or 0) + (row[field] or 0)
+    return list(merged.values())
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Chuyển tối đa `batch_size` giao dịch có date < cutoff sang bảng lưu trữ trong một transaction.
+    Phần thu/chi bị chuyển đi được cộng vào Wallet.opening_balance nên đối soát số dư vẫn đúng.
+    Chân chuyển tiền không bị lưu trữ (Transfer cần sửa/xóa được cả 2 chân).
+    Chạy trên shard hiện tại (xem sharding.use_shard).
+    """
+    with shard_atomic():
+        rows = list(
+            Transaction.objects.filter(date__lt=cutoff, transfer__isnull=True)
+            .order_by('id')
+            .values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        carried = defaultdict(Decimal)
+        archived = []
+        for row in rows:
+            sign = 1 if row['type'] == Category.TYPE_INCOME else -1
+            carried[row['wallet_id']] += sign * row['amount']
+            archived.append(ArchivedTransaction(**row))
+
+        ArchivedTransaction.objects.bulk_create(archived)
+        apply_wallet_deltas(carried, field='opening_balance')
+        Transaction.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def record_checkpoint(cutoff, rows):
+    ArchiveCheckpoint.objects.using('default').create(horizon=cutoff, rows=rows)
+    cache.delete(HORIZON_CACHE_KEY)
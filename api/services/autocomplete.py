@@ -0,0 +1,161 @@
+"""
+Gợi ý mô tả khi nhập giao dịch: chỉ mục DescriptionSuggestion theo user được cập
+nhật tăng dần mỗi khi giao dịch được lưu/sửa/xóa (như bộ đoán danh mục), nên tra
+cứu chỉ là một truy vấn khoảng trên chỉ mục (user, key) — không quét Transaction.
+"""
+from collections import defaultdict
+from django.db.models import F, Max
+from django.utils import timezone
+from ..models import DescriptionSuggestion
+from .archive import transaction_models
+from .search import tokenize
+
+MAX_KEY_LENGTH = 100
+MAX_DESCRIPTION_LENGTH = 255
+CANDIDATES = 200
+RECENCY_HALFLIFE_DAYS = 60
+
+
+def description_key(description):
+    """'  Tiền điện!! ' -> 'tien dien' (bỏ dấu, viết thường, chỉ giữ chữ/số)."""
+    return ' '.join(tokenize(description))[:MAX_KEY_LENGTH]
+
+
+def remember(user_id, *changes):
+    """
+    Cập nhật chỉ mục: remember(user.id, (description, date, wallet_id, category_id, amount, +1), ...).
+    delta âm khi giao dịch bị xóa/sửa mô tả; ví/danh mục/số tiền gần nhất lấy từ thay đổi dương
+    có ngày mới nhất. Thường 2–3 truy vấn mỗi lần gọi.
+    """
+    deltas = defaultdict(int)
+    latest = {}
+    for description, date, wallet_id, category_id, amount, delta in changes:
+        key = description_key(description)
+        if not key:
+            continue
+        deltas[key] += delta
+        if delta > 0 and (key not in latest or date >= latest[key]['last_used']):
+            latest[key] = {
+                'description': description.strip()[:MAX_DESCRIPTION_LENGTH], 'last_used': date,
+                'wallet_id': wallet_id, 'category_id': category_id, 'amount': amount,
+            }
+    if not deltas:
+        return
+
+    rows = DescriptionSuggestion.objects.filter(user_id=user_id)
+    existing = dict(rows.filter(key__in=list(deltas)).values_list('key', 'last_used'))
+
+    by_delta = defaultdict(list)
+    for key in existing:
+        if deltas[key]:
+            by_delta[deltas[key]].append(key)
+    for delta, keys in by_delta.items():
+        rows.filter(key__in=keys).update(count=F('count') + delta)
+    for key, values in latest.items():
+        if key in existing and values['last_used'] >= existing[key]:
+            rows.filter(key=key).update(**values)
+
+    DescriptionSuggestion.objects.bulk_create([
+        DescriptionSuggestion(user_id=user_id, key=key, count=deltas[key], **values)
+        for key, values in latest.items()
+        if key not in existing and deltas[key] > 0
+    ], ignore_conflicts=True)
+    if any(delta < 0 for delta in deltas.values()):
+        rows.filter(count__lte=0).delete()
+
+
+def reassign(user_id, rows, **values):
+    """
+    Giao dịch `rows` sắp được đổi ví/danh mục hàng loạt (gọi TRƯỚC khi UPDATE, cùng
+    transaction): mục gợi ý nào có lần dùng gần nhất nằm trong `rows` nhận giá trị mới,
+    vd reassign(user.id, rows, category_id=...). 1 truy vấn GROUP BY + mỗi ngày một UPDATE.
+    """
+    latest = {}
+    for description, last in rows.values('description').annotate(last=Max('date')).values_list('description', 'last'):
+        key = description_key(description)
+        if key and (key not in latest or last > latest[key]):
+            latest[key] = last
+    by_date = defaultdict(list)
+    for key, last in latest.items():
+        by_date[last].append(key)
+    entries = DescriptionSuggestion.objects.filter(user_id=user_id)
+    for last, keys in by_date.items():
+        entries.filter(key__in=keys, last_used__lte=last).update(**values)
+
+
+def suggest(user_id, prefix, limit=5, today=None):
+    """
+    Các mô tả đã dùng bắt đầu bằng `prefix` (không phân biệt dấu), xếp theo
+    số lần dùng × độ mới (trọng số giảm một nửa sau mỗi RECENCY_HALFLIFE_DAYS ngày).
+    """
+    key = description_key(prefix)
+    if not key:
+        return []
+    today = today or timezone.localdate()
+    candidates = (
+        DescriptionSuggestion.objects.filter(user_id=user_id, key__gte=key, key__lt=key + '\uffff')
+        .select_related('wallet', 'category')
+        .order_by('-count')[:CANDIDATES]
+    )
+
+    def score(entry):
+        age = max((today - entry.last_used).days, 0)
+        return entry.count * 0.5 ** (age / RECENCY_HALFLIFE_DAYS)
+
+    return [
+        {
+            'description': entry.description,
+            'count': entry.count,
+            'last_used': entry.last_used,
+            'wallet_id': entry.wallet_id,
+            'wallet_name': entry.wallet.name if entry.wallet else None,
+            'category_id': entry.category_id,
+            'category_name': entry.category.name if entry.category else None,
+            'amount': entry.amount,
+        }
+        for entry in sorted(candidates, key=score, reverse=True)[:limit]
+    ]
+
+
+def index_entries(rows):
+    """
+    Gom các dòng (user_id, description, date, wallet_id, category_id, amount) — đã sắp theo
+    (date, id) — thành {(user_id, key): giá trị dòng DescriptionSuggestion}. Dùng khi dựng lại chỉ mục.
+    """
+    entries = {}
+    for owner_id, description, date, wallet_id, category_id, amount in rows:
+        key = description_key(description)
+        if not key:
+            continue
+        entry = entries.setdefault((owner_id, key), {'count': 0})
+        entry['count'] += 1
+        entry.update(
+            description=description.strip()[:MAX_DESCRIPTION_LENGTH], last_used=date,
+            wallet_id=wallet_id, category_id=category_id, amount=amount,
+        )
+    return entries
+
+
+def rebuild(user_id=None, batch_size=5000):
+    """Xóa và dựng lại chỉ mục từ toàn bộ giao dịch (kể cả kho lưu trữ, trừ chuyển tiền)."""
+    stale = DescriptionSuggestion.objects.all()
+    if user_id is not None:
+        stale = stale.filter(user_id=user_id)
+    stale.delete()
+
+    def rows():
+        # Kho lưu trữ (cũ hơn) trước để lần dùng gần nhất là dòng cuối cùng
+        for model in reversed(transaction_models()):
+            queryset = model.objects.filter(transfer__isnull=True)
+            if user_id is not None:
+                queryset = queryset.filter(user_id=user_id)
+            yield from queryset.order_by('date', 'id').values_list(
+                'user_id', 'description', 'date', 'wallet_id', 'category_id', 'amount'
+            ).iterator(chunk_size=batch_size)
+
+    entries = index_entries(rows())
+    DescriptionSuggestion.objects.bulk_create(
+        [DescriptionSuggestion(user_id=owner_id, key=key, **values) for (owner_id, key), values in entries.items()],
+        batch_size=batch_size,
+    )
+    return len(entries)
@@ -0,0 +1,130 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Sum, Value
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.dispatch import Signal
+from ..models import Budget, BudgetAlert, Category
+from ..sharding import shard_for_user
+from .archive import transaction_models
+from .ledger import MONEY_FIELD, to_money
+
+DEFAULT_ALERT_THRESHOLDS = (80, 100)
+
+# Gửi sau khi transaction commit, một lần cho mỗi BudgetAlert (kwargs: alert)
+budget_threshold_crossed = Signal()
+
+
+def alert_thresholds():
+    return sorted(getattr(settings, 'BUDGET_ALERT_THRESHOLDS', DEFAULT_ALERT_THRESHOLDS))
+
+
+def expense_deltas(*changes):
+    """
+    Gom các thay đổi (category, date, delta) của khoản chi thành
+    {(category_id, year, month): delta}. Khoản thu bị bỏ qua.
+    """
+    deltas = defaultdict(Decimal)
+    for category, date, delta in changes:
+        if category.type == Category.TYPE_EXPENSE:
+            deltas[(category.pk, date.year, date.month)] += delta
+    return deltas
+
+
+def apply_spent_deltas(user_id, deltas):
+    """
+    Cộng `deltas` vào Budget.spent (1 SELECT FOR UPDATE + 1 UPDATE) và ghi
+    BudgetAlert cho mỗi ngưỡng vừa bị vượt. Phải gọi trong cùng transaction
+    với thao tác ghi giao dịch.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+
+    match = Q()
+    for category_id, year, month in deltas:
+        match |= Q(category_id=category_id, year=year, month=month)
+
+    alias = shard_for_user(user_id)
+    with transaction.atomic(using=alias):
+        budgets = list(Budget.objects.select_for_update().filter(match, user_id=user_id))
+        if not budgets:
+            return []
+
+        thresholds = alert_thresholds()
+        alerts = []
+        whens = []
+        for budget in budgets:
+            delta = deltas[(budget.category_id, budget.year, budget.month)]
+            old_spent, budget.spent = budget.spent, budget.spent + delta
+            whens.append(When(id=budget.id, then=F('spent') + Value(delta, output_field=MONEY_FIELD)))
+            if budget.amount > 0:
+                for threshold in thresholds:
+                    limit = budget.amount * threshold / 100
+                    if old_spent < limit <= budget.spent:
+                        alerts.append(BudgetAlert(
+                            user_id=user_id, budget=budget, threshold=threshold,
+                            spent=budget.spent, amount=budget.amount,
+                        ))
+
+        Budget.objects.filter(id__in=[b.id for b in budgets]).update(
+            spent=Case(*whens, default=F('spent'), output_field=MONEY_FIELD)
+        )
+        if alerts:
+            BudgetAlert.objects.bulk_create(alerts)
+            transaction.on_commit(lambda: _notify(alerts), using=alias)
+    return alerts
+
+
+def _notify(alerts):
+    for alert in alerts:
+        budget_threshold_crossed.send(sender=BudgetAlert, alert=alert)
+
+
+def track_expenses(user_id, *changes):
+    """Tiện ích: track_expenses(user.id, (category, date, +amount), (old_category, old_date, -old_amount))."""
+    return apply_spent_deltas(user_id, expense_deltas(*changes))
+
+
+def expected_spent(budgets):
+    """
+    {budget.pk: mức chi đúng} tính từ bảng giao dịch (kể cả kho lưu trữ) — chỉ đọc.
+    Cả danh sách ngân sách chung một truy vấn GROUP BY (danh mục, năm, tháng) mỗi bảng.
+    """
+    budgets = list(budgets)
+    if not budgets:
+        return {}
+    start = min(datetime.date(budget.year, budget.month, 1) for budget in budgets)
+    last_year, last_month = max((budget.year, budget.month) for budget in budgets)
+    end = datetime.date(last_year + last_month // 12, last_month % 12 + 1, 1)
+
+    totals = defaultdict(Decimal)
+    for model in transaction_models(start):
+        rows = (
+            model.objects.using(budgets[0]._state.db)
+            .filter(
+                category_id__in={budget.category_id for budget in budgets},
+                type=Category.TYPE_EXPENSE, transfer__isnull=True, date__gte=start, date__lt=end,
+            )
+            .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+            .values('category_id', 'year', 'month')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for row in rows:
+            totals[(row['category_id'], row['year'], row['month'])] += to_money(row['total'])
+    return {
+        budget.pk: to_money(totals.get((budget.category_id, budget.year, budget.month)))
+        for budget in budgets
+    }
+
+
+def recalculate_spent(budgets):
+    """Tính lại spent từ bảng giao dịch (khi tạo/sửa ngân sách hoặc đổi loại danh mục)."""
+    budgets = list(budgets)
+    expected = expected_spent(budgets)
+    for budget in budgets:
+        budget.spent = expected[budget.pk]
+        Budget.objects.filter(id=budget.id).update(spent=budget.spent)
@@ -0,0 +1,139 @@
+"""
+Thao tác hàng loạt trên giao dịch (đổi danh mục, chuyển ví, xóa): mỗi thao tác là
+MỘT câu UPDATE/DELETE trên bảng giao dịch, số dư ví được cập nhật bằng một delta
+gộp cho mỗi ví; ngân sách, bộ đoán danh mục và gợi ý mô tả bằng một lần gọi — tất
+cả trong một transaction trên shard của user. Giao dịch chuyển tiền luôn bị bỏ qua,
+kho lưu trữ (ArchivedTransaction) không bị đụng tới.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from ..models import Category, Transaction
+from ..sharding import shard_atomic
+from .budgets import apply_spent_deltas
+from .ledger import apply_wallet_deltas, to_money
+from .predictor import learn
+from .autocomplete import reassign, remember
+
+DEFAULT_BULK_MAX_ROWS = 10000
+
+
+class BulkLimitExceeded(Exception):
+    pass
+
+
+def bulk_max_rows():
+    return getattr(settings, 'TRANSACTION_BULK_MAX_ROWS', DEFAULT_BULK_MAX_ROWS)
+
+
+def _signed(category_type, amount):
+    return amount if category_type == Category.TYPE_INCOME else -amount
+
+
+def _lock(user_id, queryset):
+    """Khóa và chốt tập id cần xử lý (bỏ giao dịch chuyển tiền) → (queryset theo id, số bỏ qua)."""
+    selected = queryset.filter(user_id=user_id).order_by()
+    rows = list(selected.select_for_update().values_list('id', 'transfer_id')[:bulk_max_rows() + 1])
+    if len(rows) > bulk_max_rows():
+        raise BulkLimitExceeded(f"Tối đa {bulk_max_rows()} giao dịch mỗi lần.")
+    ids = [pk for pk, transfer_id in rows if transfer_id is None]
+    return Transaction.objects.filter(id__in=ids), len(rows) - len(ids)
+
+
+def _groups(rows):
+    """Tổng tiền theo (ví, danh mục, loại, năm, tháng) — 1 truy vấn GROUP BY."""
+    groups = list(
+        rows.annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('wallet_id', 'category_id', 'type', 'year', 'month')
+        .annotate(total=Sum('amount'), rows=Count('id'))
+        .order_by()
+    )
+    for group in groups:
+        group['total'] = to_money(group['total'])
+    return groups
+
+
+def _descriptions(rows):
+    """[(category_id, description, số giao dịch)] cho bộ đoán danh mục và gợi ý mô tả — 1 truy vấn GROUP BY."""
+    return [
+        (row['category_id'], row['description'], row['n'])
+        for row in rows.values('category_id', 'description').annotate(n=Count('id')).order_by()
+    ]
+
+
+def _result(groups, skipped, wallets):
+    return {
+        'affected': sum(group['rows'] for group in groups),
+        'skipped_transfers': skipped,
+        'wallets_updated': wallets,
+    }
+
+
+def bulk_recategorize(user_id, queryset, category):
+    """Chuyển các giao dịch của `queryset` sang `category` (cùng user)."""
+    with shard_atomic(user_id):
+        rows, skipped = _lock(user_id, queryset)
+        rows = rows.exclude(category_id=category.pk)
+        groups = _groups(rows)
+        learned = _descriptions(rows)
+
+        wallet_deltas, spent_deltas = defaultdict(Decimal), defaultdict(Decimal)
+        for group in groups:
+            total = group['total']
+            wallet_deltas[group['wallet_id']] += _signed(category.type, total) - _signed(group['type'], total)
+            if group['type'] == Category.TYPE_EXPENSE:
+                spent_deltas[(group['category_id'], group['year'], group['month'])] -= total
+            if category.type == Category.TYPE_EXPENSE:
+                spent_deltas[(category.pk, group['year'], group['month'])] += total
+
+        reassign(user_id, rows, category_id=category.pk)
+        rows.update(category_id=category.pk, type=category.type)
+        wallets = apply_wallet_deltas(wallet_deltas)
+        apply_spent_deltas(user_id, spent_deltas)
+        learn(user_id, *[
+            change for category_id, description, n in learned
+            for change in ((category_id, description, -n), (category.pk, description, n))
+        ])
+    return _result(groups, skipped, wallets)
+
+
+def bulk_move(user_id, queryset, wallet):
+    """Chuyển các giao dịch của `queryset` sang ví `wallet` (cùng user)."""
+    with shard_atomic(user_id):
+        rows, skipped = _lock(user_id, queryset)
+        rows = rows.exclude(wallet_id=wallet.pk)
+        groups = _groups(rows)
+
+        wallet_deltas = defaultdict(Decimal)
+        for group in groups:
+            signed = _signed(group['type'], group['total'])
+            wallet_deltas[group['wallet_id']] -= signed
+            wallet_deltas[wallet.pk] += signed
+
+        reassign(user_id, rows, wallet_id=wallet.pk)
+        rows.update(wallet_id=wallet.pk)
+        wallets = apply_wallet_deltas(wallet_deltas)
+    return _result(groups, skipped, wallets)
+
+
+def bulk_delete(user_id, queryset):
+    """Xóa các giao dịch của `queryset`, hoàn tác số dư ví, mức chi ngân sách, bộ đoán và gợi ý mô tả."""
+    with shard_atomic(user_id):
+        rows, skipped = _lock(user_id, queryset)
+        groups = _groups(rows)
+        learned = _descriptions(rows)
+
+        wallet_deltas, spent_deltas = defaultdict(Decimal), defaultdict(Decimal)
+        for group in groups:
+            wallet_deltas[group['wallet_id']] -= _signed(group['type'], group['total'])
+            if group['type'] == Category.TYPE_EXPENSE:
+                spent_deltas[(group['category_id'], group['year'], group['month'])] -= group['total']
+
+        rows.delete()
+        wallets = apply_wallet_deltas(wallet_deltas)
+        apply_spent_deltas(user_id, spent_deltas)
+        learn(user_id, *[(category_id, description, -n) for category_id, description, n in learned])
+        remember(user_id, *[(description, None, None, None, None, -n) for _, description, n in learned])
+    return _result(groups, skipped, wallets)
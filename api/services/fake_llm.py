@@ -0,0 +1,42 @@
+"""LLM giả lập (không gọi mạng) cho benchmark / load test chatbot."""
+import json
+import time
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def _chunks(text, size=16):
+    for start in range(0, len(text), size):
+        yield FakeResponse(text[start:start + size])
+
+
+class FakeGenerativeModel:
+    """
+    Cùng giao diện generate_content() với genai.GenerativeModel: chờ `latency`
+    giây (giả lập thời gian gọi Gemini) rồi trả lời câu hỏi tổng chi tháng này.
+    stream=True trả về từng mảnh JSON như Gemini (độ trễ chia đều cho các mảnh).
+    """
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        text = json.dumps({
+            "action": "answer_question",
+            "reply": "Để tôi xem tổng chi tháng này của bạn...",
+            "query_type": "total_expense_current_month",
+            "data": {},
+        }, ensure_ascii=False)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency)
+        return FakeResponse(text)
+
+    def _stream(self, text):
+        chunks = list(_chunks(text))
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
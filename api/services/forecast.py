@@ -0,0 +1,89 @@
+"""
+Dự báo chi tiêu cuối tháng và phát hiện khoản chi bất thường cho mọi danh mục
+cùng lúc: chuỗi chi theo ngày được nạp thành ma trận NumPy (danh mục × ngày) và
+mọi phép tính đều là phép toán trên ma trận, không lặp Python theo danh mục/ngày.
+"""
+import calendar
+import numpy as np
+from django.db.models import Sum
+from ..models import Category
+from .archive import transaction_models, merge_aggregates
+
+
+def daily_expense_matrix(user, start_date, end_date):
+    """
+    (category_ids, names, ma trận chi theo ngày shape (số danh mục, số ngày)) từ một
+    truy vấn gom nhóm (category, date) — thêm một truy vấn nếu chạm kho lưu trữ.
+    """
+    rows = merge_aggregates(
+        (
+            model.objects.filter(
+                user=user, type=Category.TYPE_EXPENSE, transfer__isnull=True,
+                date__range=[start_date, end_date],
+            )
+            .values('category_id', 'category__name', 'date')
+            .annotate(total=Sum('amount'))
+            .order_by()
+            for model in transaction_models(start_date)
+        ),
+        keys=('category_id', 'date'), sums=('total',),
+    )
+    n_days = (end_date - start_date).days + 1
+    names = {row['category_id']: row['category__name'] for row in rows}
+    category_ids = sorted(names)
+    matrix = np.zeros((len(category_ids), n_days))
+    if rows:
+        row_index = np.searchsorted(category_ids, [row['category_id'] for row in rows])
+        day_index = np.array([(row['date'] - start_date).days for row in rows])
+        np.add.at(matrix, (row_index, day_index), np.array([float(row['total']) for row in rows]))
+    return category_ids, [names[i] for i in category_ids], matrix
+
+
+def weekday_index(start_date, n_days):
+    """Thứ trong tuần (0 = thứ Hai) của từng cột."""
+    return (np.arange(n_days) + start_date.weekday()) % 7
+
+
+def forecast_matrix(matrix, start_date, today, halflife=14.0):
+    """
+    Dự báo cho mọi danh mục (mỗi phần tử ứng với một hàng của `matrix`, cột cuối = `today`):
+    - pace: chi trung bình/ngày có trọng số mũ (ngày càng gần càng nặng, chu kỳ bán rã `halflife`)
+    - weekday_factor (danh mục × 7): chi theo thứ so với trung bình, để dự báo mùa vụ theo tuần
+    - spent: đã chi từ đầu tháng tới `today`; projected: spent + dự báo các ngày còn lại của tháng
+    """
+    n_categories, n_days = matrix.shape
+    ages = np.arange(n_days)[::-1]
+    weights = 0.5 ** (ages / halflife)
+    pace = matrix @ weights / weights.sum()
+
+    weekdays = weekday_index(start_date, n_days)
+    one_hot = np.eye(7)[weekdays]                           # (ngày, 7)
+    weekday_mean = (matrix @ one_hot) / np.maximum(one_hot.sum(axis=0), 1)
+    overall_mean = matrix.mean(axis=1, keepdims=True)
+    weekday_factor = np.divide(
+        weekday_mean, overall_mean, out=np.ones_like(weekday_mean), where=overall_mean > 0
+    )
+
+    month_days = today.day
+    spent = matrix[:, n_days - month_days:].sum(axis=1)
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    remaining = np.bincount((today.weekday() + np.arange(1, days_in_month - today.day + 1)) % 7, minlength=7)
+    projected = spent + pace * (weekday_factor @ remaining)
+    return {'pace': pace, 'weekday_factor': weekday_factor, 'spent': spent, 'projected': projected}
+
+
+def anomaly_matrix(matrix, recent_days=7, threshold=3.0):
+    """
+    z-score của `recent_days` ngày gần nhất so với lịch sử trước đó (cùng danh mục).
+    Trả về (chỉ số hàng, chỉ số cột, z, mean, std) của các ô có z > threshold.
+    """
+    history, recent = matrix[:, :-recent_days], matrix[:, -recent_days:]
+    if history.shape[1] < 2:
+        empty = np.array([], dtype=int)
+        return empty, empty, np.array([]), np.array([]), np.array([])
+    mean = history.mean(axis=1, keepdims=True)
+    std = history.std(axis=1, keepdims=True)
+    z = np.divide(recent - mean, std, out=np.zeros_like(recent), where=std > 0)
+    rows, cols = np.nonzero((z > threshold) & (recent > 0))
+    return rows, cols + matrix.shape[1] - recent_days, z[rows, cols], mean[rows, 0], std[rows, 0]
+
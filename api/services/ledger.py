@@ -0,0 +1,136 @@
+from decimal import Decimal
+from django.core import signing
+from django.db.models import Case, When, F, Q, Sum, Count, Value, DecimalField, Window
+from django.db.models.expressions import RowRange
+from django.db.models.functions import Coalesce
+from ..models import Category, Wallet, Transaction
+
+MONEY_FIELD = DecimalField(max_digits=15, decimal_places=2)
+ZERO = Decimal('0.00')
+STATEMENT_CURSOR_SALT = 'wallet-statement'
+
+
+def signed_amount(prefix=''):
+    """Biểu thức SQL: +amount với khoản thu, -amount với khoản chi.
+
+    `prefix` cho phép dùng qua quan hệ, ví dụ 'transactions__' khi đứng từ Wallet.
+    """
+    return Case(
+        When(**{f'{prefix}type': Category.TYPE_INCOME}, then=F(f'{prefix}amount')),
+        default=-F(f'{prefix}amount'),
+        output_field=MONEY_FIELD,
+    )
+
+
+def with_expected_balance(wallets):
+    """
+    Gắn số dư kỳ vọng (opening_balance + tổng thu - tổng chi) vào queryset ví.
+    Toàn bộ được tính trong MỘT truy vấn LEFT JOIN + GROUP BY theo ví.
+    """
+    return wallets.annotate(
+        net_amount=Coalesce(Sum(signed_amount('transactions__')), Value(ZERO), output_field=MONEY_FIELD),
+        transaction_count=Count('transactions'),
+    ).annotate(
+        expected_balance=F('opening_balance') + F('net_amount'),
+    )
+
+
+def to_money(value):
+    """Chuẩn hóa về 2 chữ số thập phân (SQLite trả tổng dạng số thực)."""
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+
+def apply_wallet_deltas(deltas, field='balance'):
+    """
+    Cộng dồn {wallet_id: delta} vào `field` của ví (mặc định balance) bằng MỘT
+    câu UPDATE ... CASE. Dùng F() nên an toàn khi nhiều request cùng ghi một ví.
+    """
+    deltas = {wallet_id: delta for wallet_id, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    return Wallet.objects.filter(id__in=deltas).update(**{field: Case(
+        *[When(id=wallet_id, then=F(field) + Value(delta, output_field=MONEY_FIELD))
+          for wallet_id, delta in deltas.items()],
+        default=F(field),
+        output_field=MONEY_FIELD,
+    )})
+
+
+# ----------------------------------------------------------------------
+# Sao kê ví
+# ----------------------------------------------------------------------
+class InvalidCursor(Exception):
+    pass
+
+
+def _statement_cursor(wallet, row):
+    """Cursor trang kế: vị trí (date, id) của dòng cuối và số dư TRƯỚC dòng đó (mốc của trang sau)."""
+    return signing.dumps(
+        [wallet.pk, row['date'].isoformat(), row['id'], str(row['balance'] - row['signed_amount'])],
+        salt=STATEMENT_CURSOR_SALT, compress=True,
+    )
+
+
+def _read_statement_cursor(wallet, cursor):
+    try:
+        wallet_id, date, pk, balance = signing.loads(cursor, salt=STATEMENT_CURSOR_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        raise InvalidCursor("Cursor không hợp lệ.")
+    if wallet_id != wallet.pk:
+        raise InvalidCursor("Cursor không thuộc ví này.")
+    return date, pk, Decimal(balance)
+
+
+def wallet_statement(wallet, start_date=None, end_date=None, cursor=None, limit=50):
+    """
+    Sao kê ví (mới nhất trước) kèm số dư SAU mỗi giao dịch, neo vào Wallet.balance hiện tại:
+    số dư sau một giao dịch = mốc - tổng (có dấu) các giao dịch mới hơn nó, tính bằng
+    window function trên đúng các dòng của trang.
+
+    Phân trang keyset theo (date, id): cursor mang theo vị trí và số dư mốc của trang
+    kế, nên trang nào cũng tốn như nhau (không OFFSET, không cộng lại phần đã qua).
+    Giao dịch đã chuyển sang kho lưu trữ được gộp vào số dư đầu kỳ nên không xuất hiện.
+    Trả về (các dòng, cursor trang kế hoặc None).
+    """
+    rows = Transaction.objects.filter(wallet=wallet)
+    if start_date:
+        rows = rows.filter(date__gte=start_date)
+    if end_date:
+        rows = rows.filter(date__lte=end_date)
+
+    if cursor:
+        date, pk, anchor = _read_statement_cursor(wallet, cursor)
+        rows = rows.filter(Q(date__lt=date) | Q(date=date, id__lt=pk))
+    else:
+        anchor = wallet.balance
+        if end_date:
+            anchor -= to_money(
+                Transaction.objects.filter(wallet=wallet, date__gt=end_date)
+                .aggregate(total=Sum(signed_amount()))['total']
+            )
+
+    newest_first = [F('date').desc(), F('id').desc()]
+    page_ids = rows.order_by(*newest_first).values('id')[:limit + 1]
+    page = list(
+        Transaction.objects.filter(id__in=page_ids)
+        .annotate(
+            signed_amount=signed_amount(),
+            balance=Value(anchor, output_field=MONEY_FIELD) - Window(
+                Sum(signed_amount()), order_by=newest_first, frame=RowRange(start=None, end=0),
+            ) + signed_amount(),
+        )
+        .order_by(*newest_first)
+        .values(
+            'id', 'date', 'description', 'amount', 'signed_amount', 'balance',
+            'category_id', 'category__name', 'type', 'transfer_id',
+        )
+    )
+    for row in page:
+        row['signed_amount'] = to_money(row['signed_amount'])
+        row['balance'] = to_money(row['balance'])
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = _statement_cursor(wallet, page[-1])
+    return page, next_cursor
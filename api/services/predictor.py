@@ -0,0 +1,151 @@
+"""
+Bộ đoán danh mục từ mô tả giao dịch: naive Bayes đa thức (làm trơn Laplace)
+theo từng user, học tăng dần mỗi khi giao dịch được lưu/sửa/xóa. Số đếm nằm ở
+bảng CategoryTokenCount nên không cần huấn luyện lại hay giữ model trong bộ nhớ.
+"""
+import math
+from collections import Counter, defaultdict
+from django.db.models import F, Sum, Q
+from ..models import Category, CategoryTokenCount
+from .archive import transaction_models
+from .search import tokenize
+
+DOC_TOKEN = ''  # dòng đếm số giao dịch của danh mục
+MAX_TOKEN_LENGTH = 40
+# Số tham số tối đa trong một IN (...) khi learn() đọc/ghi theo lô
+LEARN_BATCH_SIZE = 500
+
+
+def description_tokens(description):
+    """Các từ (bỏ dấu, không trùng) có ích cho việc đoán — bỏ số tiền như '50', '50k', '2tr'."""
+    return sorted({
+        token[:MAX_TOKEN_LENGTH] for token in tokenize(description)
+        if not token[0].isdigit()
+    })
+
+
+def learn(user_id, *changes):
+    """
+    Cập nhật số đếm: learn(user.id, (category_id, description, +1), (old_category_id, old_description, -1)).
+    Đọc các dòng sẵn có theo (user, token IN ...) — index (user, token) — rồi khớp cặp
+    (category, token) trong Python; mỗi nhóm delta một UPDATE theo pk, cộng INSERT và
+    dọn các dòng về 0. Danh sách dài được chia lô (SQLite giới hạn số tham số).
+    """
+    deltas = Counter()
+    for category_id, description, delta in changes:
+        for token in [DOC_TOKEN, *description_tokens(description)]:
+            deltas[(category_id, token)] += delta
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    tokens = sorted({token for _, token in deltas})
+    existing = set()
+    by_delta = defaultdict(list)
+    for chunk in _chunks(tokens):
+        for pk, category_id, token in CategoryTokenCount.objects.filter(
+            user_id=user_id, token__in=chunk
+        ).values_list('pk', 'category_id', 'token'):
+            delta = deltas.get((category_id, token))
+            if delta is not None:
+                existing.add((category_id, token))
+                by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        for chunk in _chunks(pks):
+            CategoryTokenCount.objects.filter(pk__in=chunk).update(count=F('count') + delta)
+
+    CategoryTokenCount.objects.bulk_create([
+        CategoryTokenCount(user_id=user_id, category_id=category_id, token=token, count=delta)
+        for (category_id, token), delta in deltas.items()
+        if (category_id, token) not in existing and delta > 0
+    ], batch_size=LEARN_BATCH_SIZE, ignore_conflicts=True)
+    if any(delta < 0 for delta in deltas.values()):
+        CategoryTokenCount.objects.filter(user_id=user_id, count__lte=0).delete()
+
+
+def _chunks(items):
+    for start in range(0, len(items), LEARN_BATCH_SIZE):
+        yield items[start:start + LEARN_BATCH_SIZE]
+
+
+def predict(user_id, description, limit=3, category_type=None):
+    """
+    [{category_id, name, type, probability}] giảm dần theo xác suất — rỗng khi mô tả
+    không có từ nào từng gặp. 3 truy vấn, không phụ thuộc số giao dịch của user.
+    """
+    tokens = description_tokens(description)
+    if not tokens:
+        return []
+
+    counts = defaultdict(dict)
+    for category_id, token, count in CategoryTokenCount.objects.filter(
+        user_id=user_id, token__in=tokens
+    ).values_list('category_id', 'token', 'count'):
+        counts[category_id][token] = count
+    if not counts:
+        return []
+
+    categories = Category.objects.filter(user_id=user_id, is_system=False)
+    if category_type:
+        categories = categories.filter(type=category_type)
+    totals = (
+        categories.annotate(
+            docs=Sum('token_counts__count', filter=Q(token_counts__token=DOC_TOKEN)),
+            words=Sum('token_counts__count', filter=~Q(token_counts__token=DOC_TOKEN)),
+        )
+        .filter(docs__gt=0)
+        .values_list('id', 'name', 'type', 'docs', 'words')
+    )
+    totals = list(totals)
+    if not totals:
+        return []
+    vocabulary = (
+        CategoryTokenCount.objects.filter(user_id=user_id).exclude(token=DOC_TOKEN)
+        .values('token').distinct().count()
+    )
+
+    all_docs = sum(row[3] for row in totals)
+    scores = []
+    for category_id, name, kind, docs, words in totals:
+        score = math.log(docs / all_docs)
+        for token in tokens:
+            score += math.log((counts[category_id].get(token, 0) + 1) / ((words or 0) + vocabulary + 1))
+        scores.append((score, category_id, name, kind))
+
+    best = max(score for score, *_ in scores)
+    norm = sum(math.exp(score - best) for score, *_ in scores)
+    scores.sort(reverse=True)
+    # Xác suất chuẩn hóa trên mọi danh mục, nhưng chỉ gợi ý danh mục từng gặp ít nhất một từ của mô tả
+    return [
+        {'category_id': category_id, 'name': name, 'type': kind,
+         'probability': round(math.exp(score - best) / norm, 4)}
+        for score, category_id, name, kind in scores if category_id in counts
+    ][:limit]
+
+
+def rebuild(user_id=None, batch_size=5000):
+    """Xóa và đếm lại từ toàn bộ giao dịch (kể cả kho lưu trữ, trừ chuyển tiền). Trả về số giao dịch đã học."""
+    stale = CategoryTokenCount.objects.all()
+    if user_id is not None:
+        stale = stale.filter(user_id=user_id)
+    stale.delete()
+
+    counts = Counter()
+    learned = 0
+    for model in transaction_models():
+        rows = model.objects.filter(transfer__isnull=True)
+        if user_id is not None:
+            rows = rows.filter(user_id=user_id)
+        for owner_id, category_id, description in rows.values_list(
+            'user_id', 'category_id', 'description'
+        ).iterator(chunk_size=batch_size):
+            learned += 1
+            for token in [DOC_TOKEN, *description_tokens(description)]:
+                counts[(owner_id, category_id, token)] += 1
+
+    CategoryTokenCount.objects.bulk_create(
+        [CategoryTokenCount(user_id=owner_id, category_id=category_id, token=token, count=count)
+         for (owner_id, category_id, token), count in counts.items()],
+        batch_size=batch_size,
+    )
+    return learned
@@ -0,0 +1,119 @@
+"""
+Dựng prompt cho chatbot với ngân sách token:
+- phần hướng dẫn cố định nằm trong SYSTEM_INSTRUCTION (system instruction của model, giống
+  nhau với mọi user nên có thể dùng context caching của Gemini);
+- mỗi request chỉ kèm top-k ví/danh mục liên quan tới tin nhắn (so khớp mờ, không dấu).
+"""
+import math
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from django.conf import settings
+from .search import tokenize
+
+SYSTEM_INSTRUCTION = """Bạn là trợ lý tài chính cho người dùng Việt Nam. Mỗi tin nhắn kèm ngày hôm nay,
+danh sách ví (id|tên) và danh mục (id|tên|loại) LIÊN QUAN của user. Chỉ trả về MỘT đối tượng JSON.
+
+1. TẠO GIAO DỊCH (tin nhắn có số tiền), vd "ăn trưa 50k bằng tiền mặt":
+{"action": "create_transaction", "reply": "✅ Đã lưu: Ăn trưa (-50.000đ) vào 'Ăn uống' từ 'Tiền mặt' nhé!",
+ "data": {"amount": 50000, "date": "<YYYY-MM-DD>", "description": "Ăn trưa", "wallet_id": <id ví>, "category_id": <id danh mục>}}
+
+2. HỎI ĐÁP (không có số tiền) — chọn query_type:
+- "tổng chi tháng này?" -> {"action": "answer_question", "reply": "Đang tính...", "query_type": "total_expense_current_month", "data": {}}
+- "số dư ví tiền mặt?" -> {"action": "answer_question", "reply": "Đang kiểm tra...", "query_type": "get_wallet_balance", "data": {"wallet_id": <id ví>}}
+- "tháng 10 tiêu bao nhiêu?" -> {"action": "answer_question", "reply": "Đang kiểm tra...", "query_type": "total_expense_specific_month", "data": {"month": 10}}
+
+3. KHÔNG HIỂU: {"action": "unknown", "reply": "Xin lỗi, tôi chỉ là trợ lý tài chính. Tôi không hiểu câu hỏi này."}
+
+Dòng "Gợi ý" (nếu có) là danh mục đoán từ lịch sử giao dịch của user: dùng khi tin nhắn không nói rõ danh mục.
+
+4. LỖI VALIDATION (rất quan trọng): muốn tạo giao dịch nhưng KHÔNG có ví/danh mục khớp trong danh sách
+-> TUYỆT ĐỐI không tạo giao dịch, trả về
+{"action": "error_validation", "reply": "Xin lỗi, tôi không tìm thấy ví/danh mục nào tên '<tên>'. Vui lòng kiểm tra lại."}"""
+
+DEFAULT_TOP_WALLETS = 3
+DEFAULT_TOP_CATEGORIES = 6
+DEFAULT_TOKEN_BUDGET = 400
+MAX_MESSAGE_CHARS = 500
+
+
+def estimate_tokens(text):
+    """Ước lượng số token (~3 ký tự/token với tiếng Việt có dấu) — không cần gọi API."""
+    return math.ceil(len(text) / 3)
+
+
+def relevance(name, message_tokens):
+    """0..1: mức độ tên ví/danh mục xuất hiện (gần đúng, bỏ dấu) trong tin nhắn."""
+    name_tokens = tokenize(name)
+    if not name_tokens or not message_tokens:
+        return 0.0
+    return sum(
+        max(SequenceMatcher(None, token, word).ratio() for word in message_tokens)
+        for token in name_tokens
+    ) / len(name_tokens)
+
+
+def top_k(items, message_tokens, k):
+    """k phần tử có tên khớp tin nhắn nhất (ổn định theo thứ tự ban đầu khi bằng điểm)."""
+    if k is None or len(items) <= k:
+        return list(items)
+    ranked = sorted(items, key=lambda item: relevance(item['name'], message_tokens), reverse=True)
+    return ranked[:k]
+
+
+@dataclass
+class ChatPrompt:
+    text: str
+    wallets: list = field(default_factory=list)
+    categories: list = field(default_factory=list)
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+
+def _render(message, wallets, categories, today, suggestions=()):
+    wallet_lines = '; '.join(f"{w['id']}|{w['name']}" for w in wallets) or '(không có)'
+    category_lines = '; '.join(f"{c['id']}|{c['name']}|{c['type']}" for c in categories) or '(không có)'
+    lines = [f"Hôm nay: {today:%Y-%m-%d}", f"Ví: {wallet_lines}", f"Danh mục: {category_lines}"]
+    if suggestions:
+        lines.append("Gợi ý: " + '; '.join(
+            f"{s['category_id']}|{s['name']} ({s['probability']:.0%})" for s in suggestions
+        ))
+    lines.append(f"Tin nhắn: \"{message}\"")
+    return '\n'.join(lines)
+
+
+def build_chat_prompt(message, wallets, categories, today, top_wallets=None, top_categories=None, budget=None,
+                      suggestions=()):
+    """
+    Prompt cho một tin nhắn (phần hướng dẫn nằm ở SYSTEM_INSTRUCTION). Danh mục trong
+    `suggestions` (kết quả predictor.predict) luôn được giữ và đứng đầu. Nếu vượt
+    `budget` token thì bớt dần ví/danh mục ít liên quan nhất, cuối cùng cắt tin nhắn.
+    """
+    top_wallets = top_wallets or getattr(settings, 'CHATBOT_PROMPT_TOP_WALLETS', DEFAULT_TOP_WALLETS)
+    top_categories = top_categories or getattr(settings, 'CHATBOT_PROMPT_TOP_CATEGORIES', DEFAULT_TOP_CATEGORIES)
+    budget = budget or getattr(settings, 'CHATBOT_PROMPT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)
+
+    message = message[:MAX_MESSAGE_CHARS]
+    message_tokens = tokenize(message)
+    suggested_ids = [s['category_id'] for s in suggestions]
+    pinned = sorted((c for c in categories if c['id'] in suggested_ids), key=lambda c: suggested_ids.index(c['id']))
+    wallets = top_k(wallets, message_tokens, top_wallets)
+    others = top_k([c for c in categories if c['id'] not in suggested_ids], message_tokens,
+                   max(top_categories - len(pinned), 0))
+
+    def render():
+        return ChatPrompt(_render(message, wallets, pinned + others, today, suggestions), wallets, pinned + others)
+
+    prompt = render()
+    while prompt.tokens > budget and (others or len(wallets) > 1):
+        if others and len(pinned) + len(others) >= len(wallets):
+            others = others[:-1]
+        else:
+            wallets = wallets[:-1]
+        prompt = render()
+    if prompt.tokens > budget:
+        overflow_chars = (prompt.tokens - budget) * 3
+        message = message[:max(len(message) - overflow_chars, 0)]
+        prompt = render()
+    return prompt
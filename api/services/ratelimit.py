@@ -0,0 +1,121 @@
+"""
+Giới hạn tần suất gọi chatbot, lưu trạng thái trong Django cache để mọi worker
+dùng chung (production cần cache dùng chung như Redis/Memcached):
+
+- token bucket theo user: tối đa CHATBOT_BUCKET_CAPACITY lần liên tiếp, hồi
+  CHATBOT_BUCKET_REFILL_PER_MINUTE lượt mỗi phút;
+- giới hạn toàn cục CHATBOT_MAX_IN_FLIGHT lời gọi LLM đang chạy cùng lúc.
+"""
+import math
+import time
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+
+INFLIGHT_KEY = 'chatbot-inflight'
+# Chỗ in-flight tự hết hạn nếu worker chết giữa chừng mà không kịp trả lượt
+INFLIGHT_TTL = 300
+METRICS = ('allowed', 'throttled_user', 'throttled_busy')
+
+
+def bucket_cache_key(user_id):
+    return f"chatbot-bucket:{user_id}"
+
+
+def metric_cache_key(name):
+    return f"chatbot-metrics:{name}"
+
+
+def bucket_settings():
+    """(sức chứa, số lượt hồi mỗi giây)."""
+    capacity = getattr(settings, 'CHATBOT_BUCKET_CAPACITY', 5)
+    per_minute = getattr(settings, 'CHATBOT_BUCKET_REFILL_PER_MINUTE', 10)
+    return capacity, per_minute / 60
+
+
+def busy_retry_after():
+    return getattr(settings, 'CHATBOT_BUSY_RETRY_AFTER', 2)
+
+
+@contextmanager
+def _cache_lock(key, timeout=2, wait=0.5):
+    """Khóa ngắn bằng cache.add (nguyên tử trên mọi backend); yield False nếu không lấy được."""
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + wait
+    while not cache.add(lock_key, 1, timeout):
+        if time.monotonic() > deadline:
+            yield False
+            return
+        time.sleep(0.005)
+    try:
+        yield True
+    finally:
+        cache.delete(lock_key)
+
+
+def take_token(user_id, now=None):
+    """Lấy 1 lượt từ bucket của user. Trả về 0 nếu được phép, ngược lại số giây cần chờ."""
+    capacity, rate = bucket_settings()
+    now = time.time() if now is None else now
+    key = bucket_cache_key(user_id)
+    timeout = math.ceil(capacity / rate) + 1  # bucket đầy lại thì không cần giữ trạng thái
+
+    with _cache_lock(key) as locked:
+        if not locked:
+            return 1 / rate
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            cache.set(key, (tokens - 1, now), timeout)
+            return 0
+        cache.set(key, (tokens, now), timeout)
+        return (1 - tokens) / rate
+
+
+def max_in_flight():
+    return getattr(settings, 'CHATBOT_MAX_IN_FLIGHT', 8)
+
+
+def slot_cache_key(index):
+    return f"{INFLIGHT_KEY}:{index}"
+
+
+def acquire_slot():
+    """
+    Giữ một chỗ trong giới hạn in-flight toàn cục. Mỗi chỗ là một khóa cache riêng
+    (cache.add nguyên tử) với hạn INFLIGHT_TTL của chính nó — chỗ của worker chết tự
+    được trả mà không ảnh hưởng các chỗ khác. Trả về token để release_slot, None nếu đã đầy.
+    """
+    token = uuid.uuid4().hex
+    for index in range(max_in_flight()):
+        if cache.add(slot_cache_key(index), token, INFLIGHT_TTL):
+            return index, token
+    return None
+
+
+def release_slot(slot):
+    """Trả chỗ đã giữ; không làm gì nếu chỗ đã hết hạn và được người khác giữ lại."""
+    if slot is None:
+        return
+    index, token = slot
+    key = slot_cache_key(index)
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def record(metric):
+    key = metric_cache_key(metric)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def chatbot_metrics():
+    """Số request được phục vụ / bị chặn theo từng lý do, cùng số lời gọi đang chạy."""
+    values = cache.get_many([metric_cache_key(name) for name in METRICS])
+    metrics = {name: values.get(metric_cache_key(name), 0) for name in METRICS}
+    metrics['in_flight'] = len(cache.get_many([slot_cache_key(i) for i in range(max_in_flight())]))
+    return metrics
@@ -0,0 +1,75 @@
+import re
+import unicodedata
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'api_transaction_fts'
+PG_UNACCENT_FUNC = 'api_immutable_unaccent'
+
+# 'đ/Đ' là chữ cái riêng (không phải 'd' + dấu) nên NFD không tách được
+_EXTRA_FOLD = str.maketrans({'đ': 'd', 'Đ': 'D'})
+_TOKEN_RE = re.compile(r'\w+')
+
+_fts_available = {}
+
+
+def strip_accents(text):
+    """'Ăn trưa Đà Nẵng' -> 'an trua da nang' (bỏ dấu tiếng Việt, viết thường)."""
+    text = unicodedata.normalize('NFD', (text or '').translate(_EXTRA_FOLD))
+    return ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn').lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(strip_accents(text))
+
+
+def fts_available(using='default'):
+    """Bảng chỉ mục FTS/trigram đã được migration tạo trên CSDL này chưa (cache theo alias)."""
+    if using not in _fts_available:
+        connection = connections[using]
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                _fts_available[using] = cursor.fetchone() is not None
+        elif connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_proc WHERE proname = %s", [PG_UNACCENT_FUNC])
+                _fts_available[using] = cursor.fetchone() is not None
+        else:
+            _fts_available[using] = False
+    return _fts_available[using]
+
+
+def filter_by_description(queryset, query):
+    """
+    Lọc giao dịch có mô tả chứa TẤT CẢ các từ (tiền tố) trong `query`, không phân biệt dấu.
+    - SQLite: FTS5 (bảng contentless; trigger do migration 0004 tạo và các migration
+      dựng lại bảng api_transaction tạo lại).
+    - PostgreSQL: unaccent + chỉ mục GIN trigram.
+    - Bảng lưu trữ / CSDL khác / chưa migrate: quay về icontains (phân biệt dấu).
+    Truy vấn không có từ nào (vd. "!!!") không khớp giao dịch nào.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+
+    using = queryset.db
+    # Bảng lưu trữ (ArchivedTransaction) không có chỉ mục FTS
+    if not fts_available(using) or queryset.model._meta.db_table != 'api_transaction':
+        for term in query.split():
+            queryset = queryset.filter(description__icontains=term)
+        return queryset
+
+    if connections[using].vendor == 'sqlite':
+        match = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+        ))
+
+    # Biểu thức phải khớp NGUYÊN VĂN với chỉ mục GIN trong migration thì planner mới dùng được
+    for term in terms:
+        queryset = queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM api_transaction WHERE {PG_UNACCENT_FUNC}(lower(description)) LIKE %s",
+            ['%' + term + '%'],
+        ))
+    return queryset
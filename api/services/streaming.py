@@ -0,0 +1,82 @@
+"""Server-Sent Events cho chatbot: định dạng sự kiện và đọc dần trường "reply" từ JSON đang được stream."""
+import json
+import re
+
+_FIELD_START = re.compile(r'"reply"\s*:\s*"')
+_HIGH_SURROGATE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}')
+
+
+def sse_event(event, data):
+    """Một sự kiện SSE: 'event: <tên>\\ndata: <json>\\n\\n'."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class ReplyStream:
+    """
+    Nhận từng mảnh văn bản JSON của Gemini, trả về phần MỚI của chuỗi "reply" đã
+    giải mã được (chưa cần JSON hoàn chỉnh). Chuỗi escape bị cắt giữa chừng
+    (\\, \\uXXXX, cặp surrogate) được giữ lại tới mảnh sau.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.emitted = ''
+        self.closed = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.closed:
+            return ''
+        match = _FIELD_START.search(self.buffer)
+        if match is None:
+            return ''
+
+        raw, i = [], match.end()
+        while i < len(self.buffer):
+            ch = self.buffer[i]
+            if ch == '"':
+                self.closed = True
+                break
+            if ch == '\\':
+                size = 6 if self.buffer[i + 1:i + 2] == 'u' else 2
+                if i + size > len(self.buffer):
+                    break
+                raw.append(self.buffer[i:i + size])
+                i += size
+                continue
+            raw.append(ch)
+            i += 1
+
+        if raw and not self.closed and _HIGH_SURROGATE.fullmatch(raw[-1]):
+            raw.pop()  # nửa đầu của cặp surrogate (emoji) — đợi nửa sau
+        text = json.loads('"' + ''.join(raw) + '"')
+        delta, self.emitted = text[len(self.emitted):], text
+        return delta
+
+
+class ClosingStream:
+    """
+    Bọc generator của StreamingHttpResponse: `on_close` chạy đúng một lần khi
+    response được đóng — kể cả khi client ngắt kết nối trước khi đọc phần tử đầu
+    tiên (lúc đó khối finally của generator chưa bao giờ chạy).
+    """
+
+    def __init__(self, iterable, on_close):
+        self.iterator = iter(iterable)
+        self.on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.iterator)
+
+    def close(self):
+        try:
+            close = getattr(self.iterator, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            on_close, self.on_close = self.on_close, None
+            if on_close is not None:
+                on_close()
@@ -0,0 +1,108 @@
+from collections import defaultdict
+from django.core.cache import cache
+from ..models import Wallet, Category, Transaction, Transfer
+from ..sharding import shard_atomic
+from .ledger import apply_wallet_deltas
+
+TRANSFER_OUT_NAME = "Chuyển tiền đi"
+TRANSFER_IN_NAME = "Nhận tiền"
+DEFAULT_DESCRIPTION = "Chuyển tiền"
+
+
+def transfer_categories_cache_key(user_id):
+    return f"transfer-categories:{user_id}"
+
+
+def get_transfer_categories(user_id):
+    """
+    (id danh mục chi, id danh mục thu) dùng cho chuyển tiền của user.
+    Chỉ tạo một lần rồi cache — các lần chuyển sau không tốn truy vấn nào.
+    """
+    key = transfer_categories_cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        expense, _ = Category.objects.get_or_create(
+            user_id=user_id, name=TRANSFER_OUT_NAME, type=Category.TYPE_EXPENSE, defaults={'is_system': True}
+        )
+        income, _ = Category.objects.get_or_create(
+            user_id=user_id, name=TRANSFER_IN_NAME, type=Category.TYPE_INCOME, defaults={'is_system': True}
+        )
+        Category.objects.filter(pk__in=[expense.pk, income.pk], is_system=False).update(is_system=True)
+        ids = (expense.pk, income.pk)
+        cache.set(key, ids, None)
+    return ids
+
+
+def _load_wallet_names(user_id, *wallet_ids):
+    """Kiểm tra các ví thuộc user (1 truy vấn), trả về {id: name}."""
+    names = dict(Wallet.objects.filter(user_id=user_id, id__in=set(wallet_ids)).values_list('id', 'name'))
+    if len(names) != len(set(wallet_ids)):
+        raise Wallet.DoesNotExist("Không tìm thấy ví.")
+    return names
+
+
+def _leg_descriptions(description, names, from_wallet_id, to_wallet_id):
+    description = description or DEFAULT_DESCRIPTION
+    return (
+        f"{description} (đến {names[to_wallet_id]})",
+        f"{description} (từ {names[from_wallet_id]})",
+    )
+
+
+def create_transfer(user, *, from_wallet_id, to_wallet_id, amount, date, description=''):
+    """Tạo lần chuyển + 2 giao dịch + cập nhật 2 ví với số truy vấn cố định."""
+    expense_id, income_id = get_transfer_categories(user.pk)
+    with shard_atomic(user.pk):
+        names = _load_wallet_names(user.pk, from_wallet_id, to_wallet_id)
+        transfer = Transfer.objects.create(
+            user=user, from_wallet_id=from_wallet_id, to_wallet_id=to_wallet_id,
+            amount=amount, date=date, description=description or '',
+        )
+        out_text, in_text = _leg_descriptions(description, names, from_wallet_id, to_wallet_id)
+        Transaction.objects.bulk_create([
+            Transaction(user=user, wallet_id=from_wallet_id, category_id=expense_id, type=Category.TYPE_EXPENSE,
+                        transfer=transfer, amount=amount, date=date, description=out_text),
+            Transaction(user=user, wallet_id=to_wallet_id, category_id=income_id, type=Category.TYPE_INCOME,
+                        transfer=transfer, amount=amount, date=date, description=in_text),
+        ])
+        apply_wallet_deltas({from_wallet_id: -amount, to_wallet_id: amount})
+    return transfer
+
+
+def update_transfer(transfer, **changes):
+    """Sửa lần chuyển: hoàn tác số dư cũ, áp số dư mới (1 UPDATE) và cập nhật 2 chân."""
+    old_from, old_to, old_amount = transfer.from_wallet_id, transfer.to_wallet_id, transfer.amount
+    for field, value in changes.items():
+        setattr(transfer, field, value)
+
+    expense_id, income_id = get_transfer_categories(transfer.user_id)
+    with shard_atomic(transfer.user_id):
+        names = _load_wallet_names(transfer.user_id, transfer.from_wallet_id, transfer.to_wallet_id)
+        transfer.save()
+
+        deltas = defaultdict(int)
+        deltas[old_from] += old_amount
+        deltas[old_to] -= old_amount
+        deltas[transfer.from_wallet_id] -= transfer.amount
+        deltas[transfer.to_wallet_id] += transfer.amount
+        apply_wallet_deltas(deltas)
+
+        out_text, in_text = _leg_descriptions(
+            transfer.description, names, transfer.from_wallet_id, transfer.to_wallet_id
+        )
+        legs = Transaction.objects.filter(transfer=transfer)
+        legs.filter(category_id=expense_id).update(
+            wallet_id=transfer.from_wallet_id, amount=transfer.amount, date=transfer.date, description=out_text
+        )
+        legs.filter(category_id=income_id).update(
+            wallet_id=transfer.to_wallet_id, amount=transfer.amount, date=transfer.date, description=in_text
+        )
+    return transfer
+
+
+def delete_transfer(transfer):
+    """Xóa lần chuyển cùng 2 chân giao dịch và hoàn tác số dư."""
+    with shard_atomic(transfer.user_id):
+        apply_wallet_deltas({transfer.from_wallet_id: transfer.amount, transfer.to_wallet_id: -transfer.amount})
+        Transaction.objects.filter(transfer=transfer).delete()
+        transfer.delete()
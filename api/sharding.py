@@ -0,0 +1,203 @@
+"""
+Phân mảnh dữ liệu theo user: mọi bảng có cột user của app `api` được đặt trên
+một trong các alias CSDL 'default', 'shard_1', ..., 'shard_{N-1}'.
+
+- Bảng ShardAssignment (luôn ở 'default') ghi user nào nằm ở shard nào; user
+  chưa có dòng nào thì ở 'default' (dữ liệu có từ trước khi bật sharding).
+- Mỗi shard dùng một dải id riêng (shard k bắt đầu từ k * ID_BLOCK) nên có thể
+  chuyển user giữa các shard mà giữ nguyên khóa chính.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections, models, transaction
+
+SHARD_PREFIX = 'shard_'
+ID_BLOCK = 10 ** 12
+# Các model của app api KHÔNG phân mảnh (dữ liệu toàn cục, nằm ở 'default')
+GLOBAL_MODELS = {'ShardAssignment', 'ArchiveCheckpoint'}
+
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def shard_aliases():
+    """['default', 'shard_1', ...] theo thứ tự chỉ số shard."""
+    extra = [alias for alias in settings.DATABASES if alias.startswith(SHARD_PREFIX)]
+    return ['default'] + sorted(extra, key=shard_index)
+
+
+def shard_index(alias):
+    return 0 if alias == 'default' else int(alias[len(SHARD_PREFIX):])
+
+
+def sharding_enabled():
+    return len(shard_aliases()) > 1
+
+
+def is_sharded_model(model):
+    return model._meta.app_label == 'api' and model.__name__ not in GLOBAL_MODELS
+
+
+def sharded_models():
+    """Các model phân mảnh, sắp theo phụ thuộc khóa ngoại (bảng cha trước)."""
+    pending = [m for m in apps.get_app_config('api').get_models() if is_sharded_model(m)]
+    ordered = []
+    while pending:
+        for model in pending:
+            parents = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is not model
+            }
+            if not (parents & set(pending)):
+                ordered.append(model)
+                pending.remove(model)
+                break
+        else:
+            raise RuntimeError("Vòng phụ thuộc khóa ngoại giữa các model phân mảnh.")
+    return ordered
+
+
+def assignment_cache_key(user_id):
+    return f"user-shard:{user_id}"
+
+
+def shard_for_user(user_id):
+    """Alias CSDL chứa dữ liệu của user (cache, truy vấn ShardAssignment khi cache trống)."""
+    if user_id is None or not sharding_enabled():
+        return 'default'
+    key = assignment_cache_key(user_id)
+    alias = cache.get(key)
+    if alias is None:
+        from .models import ShardAssignment
+        alias = (
+            ShardAssignment.objects.using('default')
+            .filter(user_id=user_id).values_list('alias', flat=True).first()
+        ) or 'default'
+        cache.set(key, alias, None)
+    return alias
+
+
+def assign_new_user(user):
+    """Gán shard cho user vừa đăng ký (băm theo id) và chép bản ghi User sang shard đó."""
+    if not sharding_enabled():
+        return 'default'
+    from .models import ShardAssignment
+    aliases = shard_aliases()
+    alias = aliases[user.pk % len(aliases)]
+    ensure_user_on_shard(user, alias)
+    ShardAssignment.objects.using('default').update_or_create(user_id=user.pk, defaults={'alias': alias})
+    cache.set(assignment_cache_key(user.pk), alias, None)
+    return alias
+
+
+def ensure_user_on_shard(user, alias):
+    """Khóa ngoại tới auth_user cần dòng User trên chính shard đó (bản sao tối thiểu)."""
+    if alias != 'default':
+        User.objects.using(alias).update_or_create(
+            pk=user.pk, defaults={'username': user.username, 'password': '!', 'is_active': user.is_active}
+        )
+
+
+def current_shard():
+    return _current_shard.get() or 'default'
+
+
+@contextmanager
+def use_shard(alias):
+    """Định tuyến truy vấn (không có instance) của model phân mảnh tới `alias` trong khối lệnh."""
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def shard_atomic(user_id=None):
+    """transaction.atomic trên shard của user (hoặc shard hiện tại) thay vì luôn là 'default'."""
+    return transaction.atomic(using=shard_for_user(user_id) if user_id is not None else current_shard())
+
+
+class ShardedQuerySet(models.QuerySet):
+
+    def for_user(self, user):
+        """Dữ liệu của `user`, đọc từ đúng shard."""
+        user_id = getattr(user, 'pk', user)
+        return self.using(shard_for_user(user_id)).filter(user_id=user_id)
+
+
+class ShardedManager(models.Manager.from_queryset(ShardedQuerySet)):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Dải id theo shard
+# ----------------------------------------------------------------------
+def _auto_id_tables():
+    return [m._meta.db_table for m in sharded_models() if isinstance(m._meta.pk, models.AutoField)]
+
+
+def reset_id_sequences(alias):
+    """Đưa bộ đếm id của từng bảng về dải riêng của shard (sau migrate hoặc sau khi chuyển user)."""
+    base = shard_index(alias) * ID_BLOCK
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for table in _auto_id_tables():
+            cursor.execute(
+                f'SELECT MAX(id) FROM "{table}" WHERE id >= %s AND id < %s', [base, base + ID_BLOCK]
+            )
+            seq = cursor.fetchone()[0] or base
+            if connection.vendor == 'sqlite':
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name = %s", [table])
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, seq])
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, %s)", [table, max(seq, 1), seq != base]
+                )
+
+
+def configure_shard_sequences(sender, using, **kwargs):
+    """Receiver post_migrate: shard mới tạo bắt đầu cấp id từ dải của nó."""
+    if using.startswith(SHARD_PREFIX):
+        reset_id_sequences(using)
+
+
+# ----------------------------------------------------------------------
+# Chuyển user giữa các shard
+# ----------------------------------------------------------------------
+def move_user(user_id, target, chunk_size=5000):
+    """
+    Chép toàn bộ dữ liệu của user sang shard `target` (giữ nguyên id), xóa ở
+    shard cũ rồi cập nhật ShardAssignment. Trả về số dòng đã chuyển.
+    """
+    from .models import ShardAssignment
+    source = shard_for_user(user_id)
+    if source == target:
+        return 0
+
+    user = User.objects.using('default').get(pk=user_id)
+    models_in_order = sharded_models()
+    moved = 0
+    with transaction.atomic(using=target), transaction.atomic(using=source):
+        ensure_user_on_shard(user, target)
+        for model in models_in_order:
+            rows = model._base_manager.using(source).filter(user_id=user_id).order_by('pk')
+            batch = []
+            for obj in rows.iterator(chunk_size=chunk_size):
+                batch.append(obj)
+                if len(batch) >= chunk_size:
+                    model._base_manager.using(target).bulk_create(batch)
+                    moved += len(batch)
+                    batch = []
+            if batch:
+                model._base_manager.using(target).bulk_create(batch)
+                moved += len(batch)
+        for model in reversed(models_in_order):
+            model._base_manager.using(source).filter(user_id=user_id).delete()
+        reset_id_sequences(target)
+
+        ShardAssignment.objects.using('default').update_or_create(user_id=user_id, defaults={'alias': target})
+    cache.set(assignment_cache_key(user_id), target, None)
+    return moved
@@ -0,0 +1,12 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Category
+from .services.transfers import transfer_categories_cache_key
+
+
+@receiver(post_delete, sender=Category)
+def forget_transfer_categories(sender, instance, **kwargs):
+    """Danh mục hệ thống bị xóa (vd: xóa user) thì bỏ id đã cache."""
+    if instance.is_system:
+        cache.delete(transfer_categories_cache_key(instance.user_id))
@@ -0,0 +1,86 @@
+"""
+date_hierarchy cho bảng lớn: bản gốc của admin liệt kê năm/tháng/ngày bằng
+SELECT DISTINCT trên mọi dòng đang lọc; ở đây mỗi cấp chỉ cần MIN/MAX của cột
+ngày (đọc hai đầu index) rồi sinh dải lựa chọn giữa hai mốc — có thể có kỳ
+không có dòng nào, đổi lại không phải quét bảng.
+"""
+import datetime
+from django import template
+from django.db.models import Max, Min
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def bounded_date_hierarchy(cl):
+    field_name = cl.date_hierarchy
+    year_field = f"{field_name}__year"
+    month_field = f"{field_name}__month"
+    day_field = f"{field_name}__day"
+    year = cl.params.get(year_field)
+    month = cl.params.get(month_field)
+    day = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if year and month and day:
+        selected = datetime.date(int(year), int(month), int(day))
+        return {
+            'show': True,
+            'back': {
+                'link': link({year_field: year, month_field: month}),
+                'title': capfirst(formats.date_format(selected, 'YEAR_MONTH_FORMAT')),
+            },
+            'choices': [{'title': capfirst(formats.date_format(selected, 'MONTH_DAY_FORMAT'))}],
+        }
+
+    bounds = cl.queryset.aggregate(first=Min(field_name), last=Max(field_name))
+    first, last = bounds['first'], bounds['last']
+    if not (first and last):
+        return {'show': False}
+
+    # cl.queryset đã lọc theo năm/tháng đang chọn nên first/last nằm trong kỳ đó.
+    # Giống bản gốc: mọi dòng cùng năm (cùng tháng) thì mở sẵn cấp tháng (ngày)
+    if not year and first.year == last.year:
+        year = first.year
+        if first.month == last.month:
+            month = first.month
+
+    if year and month:
+        return {
+            'show': True,
+            'back': {'link': link({year_field: year}), 'title': str(year)},
+            'choices': [
+                {
+                    'link': link({year_field: year, month_field: month, day_field: d}),
+                    'title': capfirst(formats.date_format(
+                        datetime.date(int(year), int(month), d), 'MONTH_DAY_FORMAT'
+                    )),
+                }
+                for d in range(first.day, last.day + 1)
+            ],
+        }
+    if year:
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [
+                {
+                    'link': link({year_field: year, month_field: m}),
+                    'title': capfirst(formats.date_format(datetime.date(int(year), m, 1), 'YEAR_MONTH_FORMAT')),
+                }
+                for m in range(first.month, last.month + 1)
+            ],
+        }
+    return {
+        'show': True,
+        'back': None,
+        'choices': [
+            {'link': link({year_field: str(y)}), 'title': str(y)}
+            for y in range(first.year, last.year + 1)
+        ],
+    }
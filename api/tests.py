@@ -1,3 +1,1389 @@
-from django.test import TestCase
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+from decimal import Decimal
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .db_router import PrimaryReplicaRouter, ShardRouter, pin_to_primary, replica_reads
+from .middleware import ReplicaRoutingMiddleware
+from .models import (
+    ArchivedTransaction, Budget, Category, CategoryTokenCount, ShardAssignment, Transaction, Wallet,
+)
+from .serializers import BudgetSerializer
+from .views.chatbot import ChatbotView
+from .services import autocomplete, bulk, predictor, ratelimit
+from .services.fake_llm import FakeGenerativeModel
+from .services.forecast import anomaly_matrix
+from .services.predictor import DOC_TOKEN, learn
+from .services.prompting import MAX_MESSAGE_CHARS, build_chat_prompt
+from .sharding import ID_BLOCK, configure_shard_sequences, move_user, shard_for_user, sharded_models, use_shard
 
-# Create your tests here.
+
+class ReconcileWalletsCommandTests(TestCase):
+    """reconcile_wallets so số dư lưu với opening_balance + tổng giao dịch, một truy vấn gom nhóm."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        salary = Category.objects.create(user=cls.owner, name='Lương', type=Category.TYPE_INCOME)
+        food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        # Số dư lưu chưa tính 2 giao dịch bên dưới -> kỳ vọng 1000 + 500 - 200 = 1300
+        cls.stale = Wallet.objects.create(
+            user=cls.owner, name='Ngân hàng', balance=Decimal('1000'), opening_balance=Decimal('1000'),
+        )
+        cls.correct = Wallet.objects.create(user=cls.owner, name='Tiền mặt', balance=Decimal('-50'))
+        for wallet, category, amount in (
+            (cls.stale, salary, '500'), (cls.stale, food, '200'), (cls.correct, food, '50'),
+        ):
+            Transaction.objects.create(
+                user=cls.owner, wallet=wallet, category=category, amount=Decimal(amount),
+                date=datetime.date(2026, 3, 1),
+            )
+
+    def reconcile(self, **options):
+        out = StringIO()
+        call_command('reconcile_wallets', user=self.owner.pk, stdout=out, **options)
+        return out.getvalue()
+
+    def test_reports_mismatch_without_writing(self):
+        output = self.reconcile()
+        self.assertIn(f"Ví #{self.stale.pk} 'Ngân hàng'", output)
+        self.assertIn('kỳ vọng 1,300.00 (lệch -300.00)', output)
+        self.assertIn('Đã quét 3 giao dịch / 2 ví', output)
+        self.assertIn('Số ví lệch: 1', output)
+        self.assertEqual(Wallet.objects.get(pk=self.stale.pk).balance, Decimal('1000'))
+
+    def test_fix_rewrites_only_mismatched_wallets(self):
+        self.assertIn('Đã sửa số dư 1 ví', self.reconcile(fix=True))
+        self.assertEqual(Wallet.objects.get(pk=self.stale.pk).balance, Decimal('1300'))
+        self.assertEqual(Wallet.objects.get(pk=self.correct.pk).balance, Decimal('-50'))
+        self.assertIn('Số ví lệch: 0', self.reconcile())
+
+    def test_one_grouped_query(self):
+        with self.assertNumQueries(1):
+            self.reconcile()
+
+
+class CashFlowReportTests(TestCase):
+    """Dòng tiền gom theo kỳ trong SQL, chuỗi liên tục (kỳ trống = 0), giới hạn số kỳ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        salary = Category.objects.create(user=cls.owner, name='Lương', type=Category.TYPE_INCOME)
+        food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        for day, category, amount in (
+            ('2026-01-05', salary, '1000'),  # thứ Hai
+            ('2026-01-07', food, '200'),
+            ('2026-01-20', food, '300'),
+        ):
+            Transaction.objects.create(
+                user=cls.owner, wallet=wallet, category=category, amount=Decimal(amount),
+                date=datetime.date.fromisoformat(day),
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def cashflow(self, start, end, granularity):
+        return self.client.get(
+            reverse('report-cashflow'), {'start_date': start, 'end_date': end, 'granularity': granularity}
+        )
+
+    def series(self, *args):
+        response = self.cashflow(*args)
+        self.assertEqual(response.status_code, 200)
+        return [(row['day'].isoformat(), row['total_income'], row['total_expense']) for row in response.data]
+
+    def test_daily_series_is_zero_filled(self):
+        self.assertEqual(self.series('2026-01-05', '2026-01-08', 'day'), [
+            ('2026-01-05', Decimal('1000'), Decimal('0')),
+            ('2026-01-06', Decimal('0'), Decimal('0')),
+            ('2026-01-07', Decimal('0'), Decimal('200')),
+            ('2026-01-08', Decimal('0'), Decimal('0')),
+        ])
+
+    def test_weekly_buckets_start_on_monday(self):
+        self.assertEqual(self.series('2026-01-01', '2026-01-31', 'week'), [
+            ('2025-12-29', Decimal('0'), Decimal('0')),
+            ('2026-01-05', Decimal('1000'), Decimal('200')),
+            ('2026-01-12', Decimal('0'), Decimal('0')),
+            ('2026-01-19', Decimal('0'), Decimal('300')),
+            ('2026-01-26', Decimal('0'), Decimal('0')),
+        ])
+
+    def test_monthly_buckets(self):
+        self.assertEqual(self.series('2025-11-15', '2026-02-10', 'month'), [
+            ('2025-11-01', Decimal('0'), Decimal('0')),
+            ('2025-12-01', Decimal('0'), Decimal('0')),
+            ('2026-01-01', Decimal('1000'), Decimal('500')),
+            ('2026-02-01', Decimal('0'), Decimal('0')),
+        ])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.cashflow('2026-01-01', '2026-01-31', 'hour').status_code, 400)
+        self.assertEqual(self.cashflow('2026-02-01', '2026-01-01', 'day').status_code, 400)
+        # 367 ngày > tối đa 366 kỳ theo ngày
+        self.assertEqual(self.cashflow('2025-01-01', '2026-01-02', 'day').status_code, 400)
+
+
+class ComparisonReportTests(TestCase):
+    """So sánh thu/chi theo danh mục giữa hai kỳ — một truy vấn có điều kiện cho cả hai kỳ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.salary = Category.objects.create(user=cls.owner, name='Lương', type=Category.TYPE_INCOME)
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        cls.fuel = Category.objects.create(user=cls.owner, name='Xăng', type=Category.TYPE_EXPENSE)
+        for day, category, amount in (
+            ('2025-03-05', cls.food, '100'),
+            ('2026-02-10', cls.food, '200'),
+            ('2026-02-20', cls.fuel, '50'),
+            ('2026-03-01', cls.salary, '1000'),
+            ('2026-03-10', cls.food, '300'),
+        ):
+            Transaction.objects.create(
+                user=cls.owner, wallet=wallet, category=category, amount=Decimal(amount),
+                date=datetime.date.fromisoformat(day),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def compare(self, **params):
+        response = self.client.get(reverse('report-compare'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_month_over_previous_month(self):
+        data = self.compare(period='month', date='2026-03-15')
+        self.assertEqual(
+            (data['current']['start_date'], data['previous']['end_date']),
+            (datetime.date(2026, 3, 1), datetime.date(2026, 2, 28)),
+        )
+        rows = {row['category_id']: row for row in data['categories']}
+        self.assertEqual(
+            [row['category_id'] for row in data['categories']], [self.food.pk, self.fuel.pk, self.salary.pk]
+        )
+        self.assertEqual(
+            (rows[self.food.pk]['delta'], rows[self.food.pk]['delta_percent']), (Decimal('100'), Decimal('50.00'))
+        )
+        self.assertEqual(rows[self.fuel.pk]['current_total'], Decimal('0'))
+        self.assertEqual(rows[self.fuel.pk]['delta_percent'], Decimal('-100.00'))
+        # Kỳ trước bằng 0 -> không có phần trăm
+        self.assertIsNone(rows[self.salary.pk]['delta_percent'])
+        self.assertEqual(data['totals'][Category.TYPE_EXPENSE], {
+            'current_total': Decimal('300'), 'previous_total': Decimal('250'),
+            'delta': Decimal('50'), 'delta_percent': Decimal('20.00'),
+        })
+
+    def test_year_ago_and_quarter(self):
+        data = self.compare(period='month', date='2026-03-15', compare='year_ago')
+        self.assertEqual(data['previous']['start_date'], datetime.date(2025, 3, 1))
+        self.assertEqual(data['totals'][Category.TYPE_EXPENSE]['previous_total'], Decimal('100'))
+
+        data = self.compare(period='quarter', date='2026-03-15')
+        self.assertEqual(
+            (data['current']['start_date'], data['current']['end_date']),
+            (datetime.date(2026, 1, 1), datetime.date(2026, 3, 31)),
+        )
+        self.assertEqual(data['previous']['start_date'], datetime.date(2025, 10, 1))
+        self.assertEqual(data['totals'][Category.TYPE_EXPENSE]['current_total'], Decimal('550'))
+
+    def test_custom_ranges_must_be_complete(self):
+        response = self.client.get(reverse('report-compare'), {'start_date': '2026-03-01', 'end_date': '2026-03-31'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_single_query(self):
+        self.compare()  # nạp cache mốc lưu trữ
+        with self.assertNumQueries(1):
+            self.compare(period='year', date='2026-03-15')
+
+
+class AdminChangelistQueryTests(TestCase):
+    """
+    Số truy vấn của trang danh sách trong admin không phụ thuộc số dòng
+    (không N+1 qua khóa ngoại) và không COUNT(*) toàn bảng.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt', balance=Decimal('0'))
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        cls.salary = Category.objects.create(user=cls.owner, name='Lương', type=Category.TYPE_INCOME)
+        cls.today = datetime.date.today()
+        # Giao dịch cũ để date_hierarchy bắt đầu ở cấp năm
+        Transaction.objects.create(
+            user=cls.owner, wallet=cls.wallet, category=cls.salary, amount=Decimal('9000'),
+            date=cls.today.replace(year=cls.today.year - 2, day=1),
+        )
+        cls.add_rows(3)
+
+    @classmethod
+    def add_rows(cls, count):
+        """Thêm `count` ví, danh mục, giao dịch và ngân sách (mỗi dòng một khóa ngoại khác nhau)."""
+        start = Wallet.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(f'user{i}', password='secret')
+            wallet = Wallet.objects.create(user=user, name=f'Ví {i}')
+            category = Category.objects.create(user=user, name=f'Danh mục {i}', type=Category.TYPE_EXPENSE)
+            Transaction.objects.create(
+                user=user, wallet=wallet, category=category, amount=Decimal('1000'), date=cls.today,
+            )
+            Budget.objects.create(
+                user=user, category=category, amount=Decimal('5000'),
+                month=cls.today.month, year=cls.today.year,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, model, params=None):
+        url = reverse(f'admin:api_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def assert_constant_queries(self, model, params=None):
+        before = self.changelist_queries(model, params)
+        self.add_rows(5)
+        after = self.changelist_queries(model, params)
+        self.assertEqual(len(before), len(after), "\n".join(after))
+        for sql in after:
+            if 'COUNT(' in sql.upper():
+                self.assertIn('LIMIT', sql.upper(), sql)
+        return len(after)
+
+    def test_wallet_changelist(self):
+        self.assert_constant_queries(Wallet)
+
+    def test_category_changelist(self):
+        self.assert_constant_queries(Category, {'type': Category.TYPE_EXPENSE})
+
+    def test_transaction_changelist(self):
+        self.assert_constant_queries(Transaction)
+
+    def test_transaction_changelist_filtered(self):
+        params = {'type': Category.TYPE_EXPENSE, 'date__year': self.today.year, 'date__month': self.today.month}
+        self.assert_constant_queries(Transaction, params)
+
+    def test_budget_changelist(self):
+        self.assert_constant_queries(Budget, {'year': self.today.year})
+
+    def test_transaction_changelist_query_count(self):
+        # session + user, đếm (có LIMIT), một trang kết quả, MIN/MAX cho date_hierarchy (không DISTINCT)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('admin:api_transaction_changelist'))
+        self.assertContains(response, f'?date__year={self.today.year - 1}')
+
+
+class AdminReconcileActionTests(TestCase):
+    """Các action đối soát chỉ báo cáo chênh lệch, không sửa dữ liệu."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        today = datetime.date.today()
+        cls.tx = Transaction.objects.create(
+            user=cls.owner, wallet=cls.wallet, category=cls.food, amount=Decimal('1000'), date=today,
+        )
+        cls.budget = Budget.objects.create(
+            user=cls.owner, category=cls.food, amount=Decimal('5000'), month=today.month, year=today.year,
+        )
+        # Số dư và spent lưu sai so với giao dịch
+        Wallet.objects.filter(pk=cls.wallet.pk).update(balance=Decimal('123'))
+        Budget.objects.filter(pk=cls.budget.pk).update(spent=Decimal('0'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def run_action(self, model, action, pk):
+        url = reverse(f'admin:api_{model._meta.model_name}_changelist')
+        response = self.client.post(url, {'action': action, '_selected_action': [pk]}, follow=True)
+        self.assertEqual(response.status_code, 200)
+        return [str(message) for message in response.context['messages']]
+
+    def test_wallet_reconcile_reports_without_writing(self):
+        messages = self.run_action(Wallet, 'reconcile_balances', self.wallet.pk)
+        self.assertIn('bị lệch', messages[0])
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('123'))
+
+    def test_transaction_reconcile_reports_without_writing(self):
+        messages = self.run_action(Transaction, 'reconcile_wallets', self.tx.pk)
+        self.assertIn('bị lệch', messages[0])
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('123'))
+
+    def test_budget_reconcile_reports_without_writing(self):
+        messages = self.run_action(Budget, 'reconcile_spent', self.budget.pk)
+        self.assertIn('1,000.00', messages[0])
+        self.assertEqual(Budget.objects.get(pk=self.budget.pk).spent, Decimal('0'))
+
+    def test_bulk_delete_is_disabled(self):
+        url = reverse('admin:api_transaction_changelist')
+        response = self.client.post(url, {'action': 'delete_selected', '_selected_action': [self.tx.pk]})
+        self.assertTrue(Transaction.objects.filter(pk=self.tx.pk).exists())
+        self.assertIn(response.status_code, (200, 302))
+
+    def test_admin_is_read_only(self):
+        for obj in (self.tx, self.wallet, self.food, self.budget):
+            name = obj._meta.model_name
+            with self.subTest(model=name):
+                change = reverse(f'admin:api_{name}_change', args=[obj.pk])
+                self.assertEqual(self.client.get(change).status_code, 200)  # vẫn xem được
+                self.assertEqual(self.client.post(change, {}).status_code, 403)
+                delete = reverse(f'admin:api_{name}_delete', args=[obj.pk])
+                self.assertEqual(self.client.post(delete, {'post': 'yes'}).status_code, 403)
+                self.assertEqual(self.client.get(reverse(f'admin:api_{name}_add')).status_code, 403)
+        self.assertTrue(Transaction.objects.filter(pk=self.tx.pk).exists())
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('123'))
+
+    def test_budget_reconcile_is_one_aggregate(self):
+        today = datetime.date.today()
+        ids = [self.budget.pk]
+        for i in range(10):
+            category = Category.objects.create(user=self.owner, name=f'Mục {i}', type=Category.TYPE_EXPENSE)
+            ids.append(Budget.objects.create(
+                user=self.owner, category=category, amount=Decimal('100'), month=today.month, year=today.year,
+            ).pk)
+        url = reverse('admin:api_budget_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {'action': 'reconcile_spent', '_selected_action': ids})
+        aggregates = [q['sql'] for q in queries.captured_queries if 'SUM(' in q['sql'].upper()]
+        self.assertEqual(len(aggregates), 1, aggregates)
+
+
+class PredictorLearnTests(TestCase):
+    """learn() với rất nhiều cặp (danh mục, từ) trong một lần gọi."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        cls.coffee = Category.objects.create(user=cls.owner, name='Cafe', type=Category.TYPE_EXPENSE)
+
+    def test_learn_many_distinct_keys(self):
+        descriptions = [f'mon{i} quan{i}' for i in range(600)]
+        learn(self.owner.pk, *[(self.food.pk, d, 1) for d in descriptions])
+        # Chuyển toàn bộ sang danh mục khác: > 1000 khóa cũ bị trừ, > 1000 khóa mới được cộng
+        learn(
+            self.owner.pk,
+            *[(self.food.pk, d, -1) for d in descriptions],
+            *[(self.coffee.pk, d, 1) for d in descriptions],
+        )
+        self.assertFalse(CategoryTokenCount.objects.filter(user=self.owner, category=self.food).exists())
+        coffee = CategoryTokenCount.objects.filter(user=self.owner, category=self.coffee)
+        self.assertEqual(coffee.count(), 1 + 2 * 600)
+        self.assertEqual(coffee.get(token=DOC_TOKEN).count, 600)
+
+        learn(self.owner.pk, *[(self.coffee.pk, d, 1) for d in descriptions[:10]])
+        self.assertEqual(coffee.get(token='mon0').count, 2)
+        self.assertEqual(coffee.get(token='mon599').count, 1)
+
+
+class BulkActionTests(TestCase):
+    """Thao tác hàng loạt trên nhiều giao dịch có mô tả khác nhau."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt', balance=Decimal('-600000'))
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        cls.coffee = Category.objects.create(user=cls.owner, name='Cafe', type=Category.TYPE_EXPENSE)
+        today = datetime.date.today()
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=cls.owner, wallet=cls.wallet, category=cls.food, type=cls.food.type,
+                amount=Decimal('1000'), date=today, description=f'mon{i} quan{i}',
+            )
+            for i in range(600)
+        ])
+        predictor.rebuild(cls.owner.pk)
+        autocomplete.rebuild(cls.owner.pk)
+
+    def test_recategorize_many_distinct_descriptions(self):
+        # 600 mô tả × (2 từ + dòng đếm) × 2 danh mục: hơn 1000 khóa (danh mục, từ) trong một lần learn()
+        result = bulk.bulk_recategorize(self.owner.pk, Transaction.objects.filter(user=self.owner), self.coffee)
+        self.assertEqual(result['affected'], 600)
+        self.assertFalse(Transaction.objects.filter(category=self.food).exists())
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('-600000'))
+        self.assertFalse(CategoryTokenCount.objects.filter(category=self.food).exists())
+        self.assertEqual(CategoryTokenCount.objects.get(category=self.coffee, token=DOC_TOKEN).count, 600)
+        self.assertEqual(autocomplete.suggest(self.owner.pk, 'mon599 quan')[0]['category_id'], self.coffee.pk)
+
+    def test_move_updates_suggested_wallet(self):
+        bank = Wallet.objects.create(user=self.owner, name='Ngân hàng')
+        bulk.bulk_move(self.owner.pk, Transaction.objects.filter(description__startswith='mon1'), bank)
+        self.assertEqual(autocomplete.suggest(self.owner.pk, 'mon1 quan')[0]['wallet_id'], bank.pk)
+        self.assertEqual(autocomplete.suggest(self.owner.pk, 'mon2 quan')[0]['wallet_id'], self.wallet.pk)
+
+    def test_recategorize_keeps_newer_suggestion(self):
+        # Lần dùng "mon5 quan5" gần nhất không nằm trong các giao dịch bị chuyển
+        newer = datetime.date.today() + datetime.timedelta(days=1)
+        Transaction.objects.create(
+            user=self.owner, wallet=self.wallet, category=self.food, amount=Decimal('1000'),
+            date=newer, description='mon5 quan5',
+        )
+        autocomplete.rebuild(self.owner.pk)
+        bulk.bulk_recategorize(
+            self.owner.pk, Transaction.objects.filter(description='mon5 quan5').exclude(date=newer), self.coffee
+        )
+        self.assertEqual(autocomplete.suggest(self.owner.pk, 'mon5 quan')[0]['category_id'], self.food.pk)
+
+    def test_delete_many_distinct_descriptions(self):
+        result = bulk.bulk_delete(self.owner.pk, Transaction.objects.filter(user=self.owner))
+        self.assertEqual(result['affected'], 600)
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('0'))
+        self.assertFalse(CategoryTokenCount.objects.filter(user=self.owner).exists())
+
+
+class BudgetSerializerTests(TestCase):
+
+    def test_percent_used_of_heavily_overspent_budget(self):
+        owner = User.objects.create_user('owner', password='secret')
+        food = Category.objects.create(user=owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        budget = Budget.objects.create(
+            user=owner, category=food, amount=Decimal('0.01'), spent=Decimal('9999999999999.99'),
+            month=1, year=2026,
+        )
+        data = BudgetSerializer(budget).data
+        self.assertEqual(Decimal(data['percent_used']), Decimal('99999999999999900.00'))
+
+
+@override_settings(CHATBOT_MAX_IN_FLIGHT=2)
+class InFlightLimitTests(TestCase):
+    """Giới hạn số lời gọi LLM chạy đồng thời."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cap_is_enforced(self):
+        first, second = ratelimit.acquire_slot(), ratelimit.acquire_slot()
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(ratelimit.acquire_slot())
+        self.assertEqual(ratelimit.chatbot_metrics()['in_flight'], 2)
+
+        ratelimit.release_slot(first)
+        ratelimit.release_slot(first)  # trả hai lần không mở thêm chỗ
+        self.assertIsNotNone(ratelimit.acquire_slot())
+        self.assertIsNone(ratelimit.acquire_slot())
+
+    def test_expired_slot_does_not_release_new_holder(self):
+        stale = ratelimit.acquire_slot()
+        ratelimit.acquire_slot()
+        cache.delete(ratelimit.slot_cache_key(stale[0]))  # chỗ cũ hết hạn INFLIGHT_TTL
+        fresh = ratelimit.acquire_slot()
+        self.assertEqual(fresh[0], stale[0])
+
+        ratelimit.release_slot(stale)  # lời gọi cũ chạy xong muộn
+        self.assertIsNone(ratelimit.acquire_slot())
+        self.assertEqual(ratelimit.chatbot_metrics()['in_flight'], 2)
+
+
+@override_settings(CHATBOT_MAX_IN_FLIGHT=1)
+class ChatbotStreamSlotTests(TestCase):
+    """Chỗ in-flight của /chatbot/stream/ được trả khi response đóng."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('owner', password='secret'))
+        patcher = mock.patch('api.views.chatbot.model', FakeGenerativeModel(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self):
+        return self.client.post(reverse('chatbot-stream'), {'message': 'tổng chi tháng này'}, format='json')
+
+    def test_slot_released_when_closed_before_streaming(self):
+        response = self.post()
+        self.assertEqual(ratelimit.chatbot_metrics()['in_flight'], 1)
+        response.close()  # client ngắt kết nối trước khi đọc sự kiện nào
+        self.assertEqual(ratelimit.chatbot_metrics()['in_flight'], 0)
+
+    def test_slot_released_after_full_stream(self):
+        response = self.post()
+        body = b''.join(response.streaming_content).decode()
+        response.close()
+        self.assertIn('event: result', body)
+        self.assertEqual(ratelimit.chatbot_metrics()['in_flight'], 0)
+        self.assertEqual(self.post().status_code, 200)
+
+
+class ChatPromptBuilderTests(SimpleTestCase):
+    """Prompt mỗi tin nhắn chỉ kèm top-k ví/danh mục liên quan và không vượt ngân sách token."""
+    TODAY = datetime.date(2026, 3, 1)
+    WALLETS = [{'id': i, 'name': name} for i, name in enumerate(['Ngân hàng', 'Tiền mặt', 'Momo', 'Tiết kiệm'], 1)]
+    CATEGORIES = [
+        {'id': 10 + i, 'name': name, 'type': kind} for i, (name, kind) in enumerate([
+            ('Lương', 'income'), ('Xăng xe', 'expense'), ('Ăn trưa', 'expense'), ('Điện nước', 'expense'),
+            ('Cà phê', 'expense'), ('Quà tặng', 'expense'), ('Học phí', 'expense'), ('Thưởng', 'income'),
+        ])
+    ]
+
+    def build(self, message='ăn trua 50k bằng tien mat', **kwargs):
+        return build_chat_prompt(message, self.WALLETS, self.CATEGORIES, self.TODAY, **kwargs)
+
+    def test_keeps_most_relevant_items(self):
+        prompt = self.build(top_wallets=1, top_categories=2)
+        self.assertEqual([w['name'] for w in prompt.wallets], ['Tiền mặt'])
+        self.assertEqual(prompt.categories[0]['name'], 'Ăn trưa')
+        self.assertEqual(len(prompt.categories), 2)
+        self.assertIn('Hôm nay: 2026-03-01', prompt.text)
+        self.assertIn('Ví: 2|Tiền mặt', prompt.text)
+
+    def test_small_lists_are_sent_whole(self):
+        prompt = self.build(top_wallets=10, top_categories=10)
+        self.assertEqual((len(prompt.wallets), len(prompt.categories)), (4, 8))
+
+    def test_suggestions_are_pinned_first(self):
+        suggestion = {'category_id': 16, 'name': 'Học phí', 'probability': 0.7}
+        prompt = self.build(top_categories=2, suggestions=[suggestion])
+        self.assertEqual([c['name'] for c in prompt.categories], ['Học phí', 'Ăn trưa'])
+        self.assertIn('Gợi ý: 16|Học phí (70%)', prompt.text)
+
+    def test_token_budget_drops_least_relevant_items(self):
+        full = self.build(top_wallets=10, top_categories=10)
+        prompt = self.build(top_wallets=10, top_categories=10, budget=full.tokens - 10)
+        self.assertLessEqual(prompt.tokens, full.tokens - 10)
+        self.assertLess(len(prompt.wallets) + len(prompt.categories), 12)
+        self.assertIn('Tiền mặt', [w['name'] for w in prompt.wallets])
+
+    def test_message_is_truncated_last(self):
+        prompt = self.build(message='a' * 2000, budget=30)
+        self.assertEqual(len(prompt.wallets), 1)
+        self.assertEqual(prompt.categories, [])
+        self.assertLessEqual(prompt.tokens, 30)
+        self.assertLess(prompt.text.count('a'), MAX_MESSAGE_CHARS)
+
+
+class ChatbotTransactionDataTests(TestCase):
+    """Dữ liệu giao dịch LLM trả về được kiểm tra trước khi ghi."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+
+    def clean(self, date):
+        data = {'wallet_id': self.wallet.pk, 'category_id': self.food.pk, 'amount': '50000', 'date': date}
+        return ChatbotView.clean_transaction_data(self.owner, data)
+
+    def test_valid_dates(self):
+        self.assertEqual(self.clean('2026-03-01')[3], datetime.date(2026, 3, 1))
+        self.assertEqual(self.clean(datetime.date(2026, 3, 1))[3], datetime.date(2026, 3, 1))
+        self.assertEqual(self.clean(None)[3], timezone.localdate())
+
+    def test_non_string_dates_are_rejected(self):
+        for date in (20260301, ['2026-03-01'], {'day': 1}, '01/03/2026'):
+            with self.subTest(date=date), self.assertRaises(ValueError):
+                self.clean(date)
+
+
+class CategoryTypeChangeTests(TestCase):
+    """Đổi loại danh mục (chi ↔ thu) đảo dấu các giao dịch trong số dư ví."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(
+            user=cls.owner, name='Tiền mặt', balance=Decimal('900'), opening_balance=Decimal('1000'),
+        )
+        cls.other = Category.objects.create(user=cls.owner, name='Khác', type=Category.TYPE_EXPENSE)
+        Transaction.objects.create(
+            user=cls.owner, wallet=cls.wallet, category=cls.other, amount=Decimal('100'),
+            date=datetime.date.today(),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def reconcile_output(self):
+        out = StringIO()
+        call_command('reconcile_wallets', user=self.owner.pk, stdout=out)
+        return out.getvalue()
+
+    def test_flip_to_income_and_back(self):
+        url = reverse('category-detail', args=[self.other.pk])
+        response = self.client.patch(url, {'type': Category.TYPE_INCOME}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('1100'))
+        self.assertEqual(Transaction.objects.get(category=self.other).type, Category.TYPE_INCOME)
+        self.assertIn('Số ví lệch: 0', self.reconcile_output())
+
+        self.client.patch(url, {'type': Category.TYPE_EXPENSE}, format='json')
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('900'))
+        self.assertIn('Số ví lệch: 0', self.reconcile_output())
+
+    def test_flip_with_archived_transactions(self):
+        # Khoản chi 100 đã lưu trữ: đã được cộng vào opening_balance (1000 - 100)
+        wallet = Wallet.objects.create(
+            user=self.owner, name='Ngân hàng', balance=Decimal('900'), opening_balance=Decimal('900'),
+        )
+        old = Category.objects.create(user=self.owner, name='Cũ', type=Category.TYPE_EXPENSE)
+        ArchivedTransaction.objects.create(
+            id=10 ** 6, user=self.owner, wallet=wallet, category=old, type=old.type,
+            amount=Decimal('100'), date=datetime.date(2020, 1, 1),
+        )
+        self.client.patch(reverse('category-detail', args=[old.pk]), {'type': Category.TYPE_INCOME}, format='json')
+        wallet.refresh_from_db()
+        self.assertEqual((wallet.balance, wallet.opening_balance), (Decimal('1100'), Decimal('1100')))
+        self.assertIn('Số ví lệch: 0', self.reconcile_output())
+
+
+class TransferTests(TestCase):
+    """Tạo/sửa/xóa lần chuyển tiền cập nhật cả 2 chân giao dịch và số dư 2 ví như một đơn vị."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.other = User.objects.create_user('other', password='secret')
+        cls.bank = Wallet.objects.create(
+            user=cls.owner, name='Ngân hàng', balance=Decimal('1000'), opening_balance=Decimal('1000'),
+        )
+        cls.cash = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.savings = Wallet.objects.create(user=cls.owner, name='Tiết kiệm')
+        cls.foreign = Wallet.objects.create(user=cls.other, name='Ví lạ')
+
+    def setUp(self):
+        # id danh mục chuyển tiền được cache theo user — không dùng lại giữa các test
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def balances(self):
+        return [Wallet.objects.get(pk=w.pk).balance for w in (self.bank, self.cash, self.savings)]
+
+    def create(self, **overrides):
+        payload = {
+            'from_wallet_id': self.bank.pk, 'to_wallet_id': self.cash.pk, 'amount': '300',
+            'date': '2026-03-01', 'description': 'Rút tiền', **overrides,
+        }
+        return self.client.post(reverse('transfer-history-list'), payload, format='json')
+
+    def assert_reconciled(self):
+        out = StringIO()
+        call_command('reconcile_wallets', user=self.owner.pk, stdout=out)
+        self.assertIn('Số ví lệch: 0', out.getvalue())
+
+    def test_create_moves_money_with_two_system_legs(self):
+        response = self.create()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.balances(), [Decimal('700'), Decimal('300'), Decimal('0')])
+        legs = Transaction.objects.filter(transfer_id=response.data['id']).select_related('category')
+        self.assertEqual(
+            sorted((leg.type, leg.wallet_id, leg.description, leg.category.is_system) for leg in legs),
+            [
+                (Category.TYPE_EXPENSE, self.bank.pk, 'Rút tiền (đến Tiền mặt)', True),
+                (Category.TYPE_INCOME, self.cash.pk, 'Rút tiền (từ Ngân hàng)', True),
+            ],
+        )
+        self.assert_reconciled()
+
+    def test_update_moves_both_legs(self):
+        transfer_id = self.create().data['id']
+        response = self.client.patch(
+            reverse('transfer-history-detail', args=[transfer_id]),
+            {'to_wallet_id': self.savings.pk, 'amount': '100'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balances(), [Decimal('900'), Decimal('0'), Decimal('100')])
+        self.assertEqual(
+            set(Transaction.objects.filter(transfer_id=transfer_id).values_list('wallet_id', 'amount')),
+            {(self.bank.pk, Decimal('100')), (self.savings.pk, Decimal('100'))},
+        )
+        self.assert_reconciled()
+
+    def test_delete_restores_balances(self):
+        transfer_id = self.create().data['id']
+        response = self.client.delete(reverse('transfer-history-detail', args=[transfer_id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.balances(), [Decimal('1000'), Decimal('0'), Decimal('0')])
+        self.assertFalse(Transaction.objects.filter(transfer_id=transfer_id).exists())
+
+    def test_invalid_transfers(self):
+        self.assertEqual(self.create(to_wallet_id=self.bank.pk).status_code, 400)
+        self.assertEqual(self.create(amount='0').status_code, 400)
+        self.assertEqual(self.create(to_wallet_id=self.foreign.pk).status_code, 404)
+        self.assertEqual(self.balances(), [Decimal('1000'), Decimal('0'), Decimal('0')])
+
+    def test_legs_are_not_editable_as_transactions(self):
+        transfer_id = self.create().data['id']
+        leg = Transaction.objects.filter(transfer_id=transfer_id).first()
+        response = self.client.delete(reverse('transaction-detail', args=[leg.pk]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Transaction.objects.filter(transfer_id=transfer_id).count(), 2)
+
+    def test_legacy_endpoint(self):
+        response = self.client.post(reverse('transfer'), {
+            'from_wallet_id': self.bank.pk, 'to_wallet_id': self.cash.pk, 'amount': '50', 'date': '2026-03-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balances(), [Decimal('950'), Decimal('50'), Decimal('0')])
+
+
+class SystemCategoryTransactionTests(TestCase):
+    """Giao dịch thu/chi thường không được gắn vào danh mục hệ thống của chuyển tiền."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt', balance=Decimal('1000'))
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        cls.system = Category.objects.create(
+            user=cls.owner, name='Chuyển tiền đi', type=Category.TYPE_EXPENSE, is_system=True,
+        )
+        cls.lunch = Transaction.objects.create(
+            user=cls.owner, wallet=cls.wallet, category=cls.food, amount=Decimal('100'),
+            date=datetime.date(2026, 3, 1),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def payload(self, category):
+        return {'wallet': self.wallet.pk, 'category': category.pk, 'amount': '100', 'date': '2026-03-02'}
+
+    def test_create_rejects_system_category(self):
+        response = self.client.post(reverse('transaction-list'), self.payload(self.system), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('category', response.data)
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('1000'))
+
+    def test_update_rejects_system_category(self):
+        response = self.client.put(
+            reverse('transaction-detail', args=[self.lunch.pk]), self.payload(self.system), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Transaction.objects.get(pk=self.lunch.pk).category_id, self.food.pk)
+
+    def test_regular_category_still_accepted(self):
+        response = self.client.post(reverse('transaction-list'), self.payload(self.food), format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class TransactionArchiveTests(TestCase):
+    """archive_transactions chuyển giao dịch cũ sang bảng lưu trữ; danh sách chỉ đọc kho khi được yêu cầu."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        for day in ('2020-01-01', '2020-06-01', '2026-01-01', '2026-02-01'):
+            Transaction.objects.create(
+                user=cls.owner, wallet=cls.wallet, category=cls.food, amount=Decimal('100'),
+                date=datetime.date.fromisoformat(day),
+            )
+        cls.output = StringIO()
+        call_command('archive_transactions', before='2025-01-01', batch_size=1, stdout=cls.output)
+
+    def setUp(self):
+        # Mốc lưu trữ được cache — không để lọt sang các test khác
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def list_dates(self, params):
+        response = self.client.get(reverse('transaction-list'), params)
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        return response, [row['date'] for row in rows]
+
+    def test_command_moves_old_rows_in_batches(self):
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(ArchivedTransaction.objects.count(), 2)
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).opening_balance, Decimal('-200'))
+        output = self.output.getvalue()
+        self.assertIn('đã lưu trữ thêm 1 giao dịch (tổng 1)', output)
+        self.assertIn('đã lưu trữ thêm 1 giao dịch (tổng 2)', output)
+
+    def test_default_list_reads_hot_table_only(self):
+        response, dates = self.list_dates({})
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(dates, ['2026-02-01', '2026-01-01'])
+
+    def test_range_after_horizon_reads_hot_table_only(self):
+        response, dates = self.list_dates({'date__gte': '2025-06-01'})
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(dates), 2)
+
+    def test_range_before_horizon_is_merged_and_paginated(self):
+        response, dates = self.list_dates({'date__gte': '2019-01-01', 'limit': 3})
+        self.assertEqual(dates, ['2026-02-01', '2026-01-01', '2020-06-01'])
+        self.assertIsNone(response.data['previous'])
+        self.assertIn('offset=3', response.data['next'])
+
+        response, dates = self.list_dates({'date__gte': '2019-01-01', 'limit': 3, 'offset': 3})
+        self.assertEqual(dates, ['2020-01-01'])
+        self.assertIsNone(response.data['next'])
+
+    def test_include_archived_flag(self):
+        response, dates = self.list_dates({'include_archived': '1', 'ordering': 'date'})
+        self.assertEqual(dates, ['2020-01-01', '2020-06-01', '2026-01-01', '2026-02-01'])
+
+
+class TransactionSearchTests(TestCase):
+    """?search= trên danh sách giao dịch: không phân biệt dấu (FTS) và vẫn tìm được trong kho lưu trữ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.other = User.objects.create_user('other', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        for day, description in (
+            ('2020-01-01', 'Ăn trưa cũ'),
+            ('2026-01-01', 'Ăn trưa Đà Nẵng'),
+            ('2026-01-02', 'Đổ xăng'),
+        ):
+            Transaction.objects.create(
+                user=cls.owner, wallet=cls.wallet, category=cls.food, amount=Decimal('100'),
+                date=datetime.date.fromisoformat(day), description=description,
+            )
+        other_wallet = Wallet.objects.create(user=cls.other, name='Ví')
+        other_food = Category.objects.create(user=cls.other, name='Ăn', type=Category.TYPE_EXPENSE)
+        Transaction.objects.create(
+            user=cls.other, wallet=other_wallet, category=other_food, amount=Decimal('100'),
+            date=datetime.date(2026, 1, 1), description='Ăn trưa',
+        )
+        call_command('archive_transactions', before='2025-01-01', stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('transaction-list'), {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        return sorted(row['description'] for row in rows)
+
+    def test_accent_insensitive_prefix_match(self):
+        self.assertEqual(self.search('an trua'), ['Ăn trưa Đà Nẵng'])
+        self.assertEqual(self.search('DA NANG'), ['Ăn trưa Đà Nẵng'])
+        self.assertEqual(self.search('do xa'), ['Đổ xăng'])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search('trua xang'), [])
+
+    def test_query_without_words_matches_nothing(self):
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_blank_query_is_ignored(self):
+        self.assertEqual(len(self.search('  ')), 2)
+
+    def test_archive_falls_back_to_icontains(self):
+        # Bảng lưu trữ không có chỉ mục FTS: khớp chuỗi con, phân biệt dấu
+        self.assertEqual(self.search('trưa', include_archived='1'), ['Ăn trưa cũ', 'Ăn trưa Đà Nẵng'])
+        self.assertEqual(self.search('an trua', include_archived='1'), ['Ăn trưa Đà Nẵng'])
+
+
+class DashboardTests(TestCase):
+    """Màn hình chính trong một lần gọi với số truy vấn cố định, không phụ thuộc lượng dữ liệu."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        wallets = [
+            Wallet.objects.create(user=cls.owner, name=f'Ví {i}', balance=Decimal('100')) for i in range(3)
+        ]
+        salary = Category.objects.create(user=cls.owner, name='Lương', type=Category.TYPE_INCOME)
+        expenses = [
+            Category.objects.create(user=cls.owner, name=f'Chi {i}', type=Category.TYPE_EXPENSE) for i in range(4)
+        ]
+        Transaction.objects.create(
+            user=cls.owner, wallet=wallets[0], category=salary, amount=Decimal('5000'),
+            date=datetime.date(2026, 3, 1),
+        )
+        for i in range(20):
+            Transaction.objects.create(
+                user=cls.owner, wallet=wallets[i % 3], category=expenses[i % 4],
+                amount=Decimal(10 * (i % 4 + 1)), date=datetime.date(2026, 3, i + 2),
+            )
+        # Ngoài kỳ: không được tính
+        Transaction.objects.create(
+            user=cls.owner, wallet=wallets[0], category=expenses[0], amount=Decimal('999'),
+            date=datetime.date(2026, 2, 28),
+        )
+        for category in expenses[:3]:
+            Budget.objects.create(user=cls.owner, category=category, amount=Decimal('1000'), month=3, year=2026)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def dashboard(self, **params):
+        return self.client.get(reverse('dashboard'), {'date': '2026-03-15', **params})
+
+    def test_aggregates(self):
+        data = self.dashboard(recent=3, top=2).data
+        self.assertEqual(data['total_balance'], Decimal('300'))
+        self.assertEqual((data['total_income'], data['total_expense']), (Decimal('5000'), Decimal('500')))
+        self.assertEqual(data['net'], Decimal('4500'))
+        self.assertEqual(
+            [(row['category__name'], row['total_amount']) for row in data['top_expense_categories']],
+            [('Chi 3', Decimal('200')), ('Chi 2', Decimal('150'))],
+        )
+        self.assertEqual(len(data['budgets']), 3)
+        self.assertEqual(
+            [row['date'] for row in data['recent_transactions']], ['2026-03-21', '2026-03-20', '2026-03-19']
+        )
+
+    def test_query_count_is_constant(self):
+        self.dashboard()  # nạp cache mốc lưu trữ
+        with self.assertNumQueries(4):
+            response = self.dashboard(recent=50, top=20)
+        self.assertEqual(len(response.data['recent_transactions']), 22)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.dashboard(period='week').status_code, 400)
+        self.assertEqual(self.dashboard(recent='many').status_code, 400)
+
+
+class ForecastReportTests(TestCase):
+    """Dự báo cuối tháng theo nhịp chi có trọng số và phát hiện ngày chi bất thường (z-score)."""
+    TODAY = datetime.date(2026, 3, 10)
+    START = datetime.date(2026, 1, 10)  # history_days=60
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        cls.shopping = Category.objects.create(user=cls.owner, name='Mua sắm', type=Category.TYPE_EXPENSE)
+        Budget.objects.create(user=cls.owner, category=cls.food, amount=Decimal('3000'), month=3, year=2026)
+
+        def expense(category, day, amount):
+            return Transaction(
+                user=cls.owner, wallet=wallet, category=category, type=Category.TYPE_EXPENSE,
+                amount=Decimal(amount), date=day,
+            )
+
+        days = [cls.START + datetime.timedelta(days=i) for i in range(60)]
+        # Ăn uống đều 100/ngày; Mua sắm 10 cách ngày rồi một khoản 5000 trong tuần gần nhất
+        Transaction.objects.bulk_create(
+            [expense(cls.food, day, '100') for day in days]
+            + [expense(cls.shopping, day, '10') for day in days[:53:2]]
+            + [expense(cls.shopping, datetime.date(2026, 3, 9), '5000')]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def forecast(self, **params):
+        return self.client.get(reverse('report-forecast'), {'date': '2026-03-10', 'history_days': 60, **params})
+
+    def test_steady_pace_is_projected_to_month_end(self):
+        data = self.forecast().data
+        self.assertEqual(data['history_start'], self.START)
+        food = next(item for item in data['categories'] if item['category_id'] == self.food.pk)
+        # 10 ngày đã chi 1000 + 21 ngày còn lại × 100
+        self.assertEqual((food['spent'], food['daily_pace'], food['projected']), (1000.0, 100.0, 3100.0))
+        self.assertEqual(food['budget'], Decimal('3000'))
+        self.assertTrue(food['projected_over_budget'])
+
+    def test_spike_is_reported_as_anomaly(self):
+        anomalies = self.forecast().data['anomalies']
+        self.assertEqual(
+            [(a['category_id'], a['date'], a['amount']) for a in anomalies],
+            [(self.shopping.pk, datetime.date(2026, 3, 9), 5000.0)],
+        )
+        self.assertGreater(anomalies[0]['z_score'], 3)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.forecast(history_days=7).status_code, 400)
+        self.assertEqual(self.forecast(halflife=0).status_code, 400)
+
+    def test_no_history_means_no_anomalies(self):
+        rows, cols, z, mean, std = anomaly_matrix(np.ones((2, 7)), recent_days=7)
+        self.assertEqual((len(rows), len(cols)), (0, 0))
+
+
+class WalletStatementTests(TestCase):
+    """Sao kê ví kèm số dư sau mỗi giao dịch (window function), phân trang keyset bằng cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.other = User.objects.create_user('other', password='secret')
+        # opening_balance 1000; số dư lưu đã gồm 4 giao dịch bên dưới
+        cls.wallet = Wallet.objects.create(
+            user=cls.owner, name='Tiền mặt', balance=Decimal('1250'), opening_balance=Decimal('1000'),
+        )
+        cls.spare = Wallet.objects.create(user=cls.owner, name='Dự phòng')
+        salary = Category.objects.create(user=cls.owner, name='Lương', type=Category.TYPE_INCOME)
+        food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        for day, category, amount in (
+            ('2026-03-01', salary, '500'), ('2026-03-02', food, '200'),
+            ('2026-03-02', food, '100'), ('2026-03-05', salary, '50'),
+        ):
+            Transaction.objects.create(
+                user=cls.owner, wallet=cls.wallet, category=category, amount=Decimal(amount),
+                date=datetime.date.fromisoformat(day),
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def statement(self, wallet=None, **params):
+        return self.client.get(reverse('wallet-statement', args=[(wallet or self.wallet).pk]), params)
+
+    @staticmethod
+    def lines(response):
+        return [(row['amount'], row['balance']) for row in response.data['results']]
+
+    def test_running_balance_newest_first(self):
+        response = self.statement()
+        self.assertEqual(self.lines(response), [
+            (Decimal('50'), Decimal('1250')),
+            (Decimal('-100'), Decimal('1200')),
+            (Decimal('-200'), Decimal('1300')),
+            (Decimal('500'), Decimal('1500')),
+        ])
+        self.assertIsNone(response.data['next'])
+
+    def test_cursor_pages_continue_the_balance(self):
+        first = self.statement(limit=2)
+        self.assertEqual(self.lines(first), [(Decimal('50'), Decimal('1250')), (Decimal('-100'), Decimal('1200'))])
+        second = self.statement(limit=2, cursor=first.data['next'])
+        self.assertEqual(self.lines(second), [(Decimal('-200'), Decimal('1300')), (Decimal('500'), Decimal('1500'))])
+        self.assertIsNone(second.data['next'])
+
+    def test_end_date_anchors_on_balance_at_that_date(self):
+        response = self.statement(end_date='2026-03-02')
+        self.assertEqual(self.lines(response)[0], (Decimal('-100'), Decimal('1200')))
+
+    def test_invalid_requests(self):
+        cursor = self.statement(limit=1).data['next']
+        self.assertEqual(self.statement(cursor=cursor + 'x').status_code, 400)
+        # cursor của ví khác
+        self.assertEqual(self.statement(wallet=self.spare, cursor=cursor).status_code, 400)
+        self.assertEqual(self.statement(start_date='03/2026').status_code, 400)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.statement().status_code, 404)
+
+
+class LocalDateAnchorTests(TestCase):
+    """Ngày mặc định của báo cáo là ngày theo TIME_ZONE (Asia/Ho_Chi_Minh), không phải ngày UTC."""
+    # 2026-09-30 20:30 UTC = 2026-10-01 03:30 giờ Việt Nam (sang tháng mới)
+    NOW = datetime.datetime(2026, 9, 30, 20, 30, tzinfo=datetime.timezone.utc)
+    TODAY = datetime.date(2026, 10, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.wallet = Wallet.objects.create(user=cls.owner, name='Tiền mặt')
+        cls.food = Category.objects.create(user=cls.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        Transaction.objects.create(
+            user=cls.owner, wallet=cls.wallet, category=cls.food, amount=Decimal('50000'),
+            date=cls.TODAY,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        patcher = mock.patch('django.utils.timezone.now', return_value=self.NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_forecast_anchor(self):
+        response = self.client.get(reverse('report-forecast'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['date'], self.TODAY)
+        self.assertTrue(response.data['categories'])
+
+    def test_dashboard_anchor(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['period']['start_date'], self.TODAY)
+        self.assertEqual(response.data['total_expense'], Decimal('50000'))
+
+    def test_compare_anchor(self):
+        response = self.client.get(reverse('report-compare'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current']['start_date'], self.TODAY)
+        self.assertEqual(
+            response.data['totals'][Category.TYPE_EXPENSE]['current_total'], Decimal('50000')
+        )
+
+    def test_cashflow_default_range_ends_today(self):
+        response = self.client.get(reverse('report-cashflow'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[-1]['day'], self.TODAY)
+        self.assertEqual(response.data[-1]['total_expense'], Decimal('50000'))
+
+    def test_summary_default_range_ends_today(self):
+        response = self.client.get(reverse('report-summary'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(row['total_amount'] for row in response.data), Decimal('50000'))
+
+
+class RequestProfilingTests(TestCase):
+    """Staff bật profiling cho từng request; kết quả (SQL + flame graph) tải về qua /profiles/<id>/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='secret', is_staff=True)
+        cls.member = User.objects.create_user('member', password='secret')
+        Wallet.objects.create(user=cls.staff, name='Tiền mặt')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def client_for(self, user):
+        # Middleware nhận diện user qua JWT (force_authenticate chỉ có tác dụng trong DRF)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_staff_request_is_profiled(self):
+        client = self.client_for(self.staff)
+        response = client.get(reverse('wallet-list'), {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queries', response['X-Profile-Summary'])
+
+        profile = client.get(reverse('request-profile', args=[response['X-Profile-Id']])).data
+        self.assertEqual((profile['method'], profile['status']), ('GET', 200))
+        self.assertEqual(profile['query_count'], len(profile['queries']))
+        self.assertTrue(any('api_wallet' in query['sql'] for query in profile['queries']))
+
+        folded = client.get(reverse('request-profile', args=[response['X-Profile-Id']]), {'output': 'folded'})
+        self.assertEqual(folded['Content-Type'], 'text/plain; charset=utf-8')
+
+    def test_header_flag(self):
+        response = self.client_for(self.staff).get(reverse('wallet-list'), HTTP_X_PROFILE='1')
+        self.assertIn('X-Profile-Id', response)
+
+    def test_not_profiled_without_flag_or_for_non_staff(self):
+        self.assertNotIn('X-Profile-Id', self.client_for(self.staff).get(reverse('wallet-list')))
+        member = self.client_for(self.member)
+        self.assertNotIn('X-Profile-Id', member.get(reverse('wallet-list'), {'_profile': '1'}))
+        self.assertEqual(member.get(reverse('request-profile', args=['abc'])).status_code, 403)
+
+    def test_unknown_profile(self):
+        response = self.client_for(self.staff).get(reverse('request-profile', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+
+class ReplicaRoutingTests(TestCase):
+    """Đọc đi replica khi ngữ cảnh cho phép; ghi luôn ở primary và ghim user vào primary sau khi ghi."""
+    # Chỉ thêm alias vào settings (connections không đổi): router chỉ quyết định tên alias
+    REPLICA = {'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.dict(settings.DATABASES, self.REPLICA)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica_only_inside_replica_reads(self):
+        self.assertIsNone(self.router.db_for_read(Wallet))
+        with replica_reads(self.owner.pk):
+            self.assertEqual(self.router.db_for_read(Wallet), 'replica')
+            self.assertEqual(self.router.db_for_write(Wallet), 'default')
+        with replica_reads(self.owner.pk, enabled=False):
+            self.assertIsNone(self.router.db_for_read(Wallet))
+
+    def test_pinned_user_reads_primary(self):
+        pin_to_primary(self.owner.pk)
+        with replica_reads(self.owner.pk):
+            self.assertIsNone(self.router.db_for_read(Wallet))
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'api'))
+        self.assertFalse(self.router.allow_migrate('replica', 'api'))
+
+    def run_middleware(self, method, status_code=200):
+        seen = {}
+
+        def get_response(request):
+            seen['read'] = self.router.db_for_read(Wallet)
+            return mock.Mock(status_code=status_code)
+
+        request = getattr(RequestFactory(), method)(
+            '/api/wallets/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}'
+        )
+        ReplicaRoutingMiddleware(get_response)(request)
+        return seen['read']
+
+    def test_middleware_routes_safe_requests_and_pins_after_writes(self):
+        self.assertEqual(self.run_middleware('get'), 'replica')
+        self.assertIsNone(self.run_middleware('post', status_code=400))
+        self.assertEqual(self.run_middleware('get'), 'replica')
+        self.run_middleware('post', status_code=201)
+        # Vừa ghi thành công -> đọc từ primary (read-your-writes)
+        self.assertIsNone(self.run_middleware('get'))
+
+
+class ShardingTests(TestCase):
+    """Dữ liệu của user đi tới shard được gán; mỗi shard cấp id trong dải riêng để chuyển user giữ nguyên id."""
+    SHARD = 'shard_1'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret')
+        cls.moved = User.objects.create_user('moved', password='secret')
+        ShardAssignment.objects.create(user=cls.moved, alias=cls.SHARD)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # Bật sharding mà không thêm alias vào settings.DATABASES (test không được mở alias lạ)
+        for target in ('api.sharding.shard_aliases', 'api.db_router.shard_aliases'):
+            patcher = mock.patch(target, return_value=['default', self.SHARD])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_shard(self):
+        """Shard thật trên file tạm, đăng ký cho luồng test (connections là thread-local)."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections[self.SHARD] = DatabaseWrapper(
+            {**settings.DATABASES['default'], 'NAME': os.path.join(directory.name, 'shard.sqlite3')}, self.SHARD
+        )
+        self.addCleanup(connections.__delitem__, self.SHARD)
+        self.addCleanup(connections[self.SHARD].close)
+        with connections[self.SHARD].schema_editor() as editor:
+            for model in (User, *sharded_models()):
+                editor.create_model(model)
+
+    def test_router_follows_assignment(self):
+        router = ShardRouter()
+        self.assertEqual(shard_for_user(self.owner.pk), 'default')
+        self.assertEqual(shard_for_user(self.moved.pk), self.SHARD)
+        self.assertEqual(router.db_for_write(Wallet, instance=Wallet(user_id=self.moved.pk)), self.SHARD)
+        self.assertEqual(router.db_for_write(Wallet, instance=self.moved), self.SHARD)
+        self.assertEqual(router.db_for_write(Wallet, instance=Wallet(user_id=self.owner.pk)), 'default')
+        # 'default' -> None để PrimaryReplicaRouter quyết định đọc replica hay primary
+        self.assertIsNone(router.db_for_read(Wallet))
+        with use_shard(self.SHARD):
+            self.assertEqual(router.db_for_read(Wallet), self.SHARD)
+            self.assertIsNone(router.db_for_read(ShardAssignment))
+        self.assertEqual(Wallet.objects.for_user(self.moved).db, self.SHARD)
+        self.assertTrue(router.allow_migrate(self.SHARD, 'api'))
+
+    def test_new_shard_allocates_ids_from_its_block(self):
+        self.make_shard()
+        User.objects.using(self.SHARD).create(pk=self.moved.pk, username='moved', password='!')
+        # Dòng chuyển tới từ 'default' giữ id nhỏ; không được kéo bộ đếm của shard theo
+        Wallet.objects.using(self.SHARD).create(id=7, user_id=self.moved.pk, name='Chuyển tới')
+        configure_shard_sequences(sender=None, using=self.SHARD)
+        wallet = Wallet.objects.using(self.SHARD).create(user_id=self.moved.pk, name='Mới')
+        self.assertEqual(wallet.pk, ID_BLOCK + 1)
+
+    def test_move_user_keeps_ids_and_balances(self):
+        self.make_shard()
+        food = Category.objects.create(user=self.owner, name='Ăn uống', type=Category.TYPE_EXPENSE)
+        wallet = Wallet.objects.create(user=self.owner, name='Tiền mặt', balance=Decimal('-100'))
+        tx = Transaction.objects.create(
+            user=self.owner, wallet=wallet, category=food, amount=Decimal('100'), date=datetime.date(2026, 3, 1),
+        )
+
+        self.assertEqual(move_user(self.owner.pk, self.SHARD), 3)
+
+        self.assertEqual(shard_for_user(self.owner.pk), self.SHARD)
+        self.assertFalse(Transaction.objects.using('default').filter(user=self.owner).exists())
+        moved = Transaction.objects.for_user(self.owner).get()
+        self.assertEqual((moved.pk, moved.wallet_id, moved.category_id), (tx.pk, wallet.pk, food.pk))
+        self.assertEqual(Wallet.objects.for_user(self.owner).get().balance, Decimal('-100'))
+        # Dữ liệu mới của user trên shard nhận id trong dải của shard
+        self.assertGreater(Wallet.objects.using(self.SHARD).create(user=self.owner, name='Mới').pk, ID_BLOCK)
+
+
+class SqliteWriteConcurrencyTests(SimpleTestCase):
+    """
+    Nhiều request cùng đọc-rồi-ghi (như cập nhật số dư ví) trên file SQLite với
+    OPTIONS trong settings: phải xếp hàng chờ khóa, không lỗi "database is locked".
+    """
+    ALIAS = 'sqlite-lock-test'
+    WORKERS = 8
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'lock.sqlite3')
+        with sqlite3.connect(self.path) as db:
+            db.execute('CREATE TABLE counter (value INTEGER)')
+            db.execute('INSERT INTO counter VALUES (0)')
+        db.close()
+
+    def increment(self, barrier, errors):
+        # Mỗi luồng một kết nối riêng với OPTIONS của CSDL default (connections là thread-local)
+        connections[self.ALIAS] = DatabaseWrapper(
+            {**settings.DATABASES['default'], 'NAME': self.path}, self.ALIAS
+        )
+        try:
+            barrier.wait()
+            with transaction.atomic(using=self.ALIAS), connections[self.ALIAS].cursor() as cursor:
+                cursor.execute('SELECT value FROM counter')
+                value = cursor.fetchone()[0]
+                time.sleep(0.01)
+                cursor.execute('UPDATE counter SET value = %s', [value + 1])
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections[self.ALIAS].close()
+            del connections[self.ALIAS]
+
+    def test_concurrent_writers_queue_instead_of_failing(self):
+        barrier = threading.Barrier(self.WORKERS)
+        errors = []
+        threads = [threading.Thread(target=self.increment, args=(barrier, errors)) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with sqlite3.connect(self.path) as db:
+            self.assertEqual(db.execute('SELECT value FROM counter').fetchone()[0], self.WORKERS)
+        db.close()
@@ -0,0 +1,16 @@
+from rest_framework.throttling import BaseThrottle
+from .services.ratelimit import take_token, record
+
+
+class ChatbotTokenBucketThrottle(BaseThrottle):
+    """Token bucket theo user cho chatbot; DRF trả 429 kèm Retry-After = wait()."""
+
+    def allow_request(self, request, view):
+        self.retry_after = take_token(request.user.pk)
+        if self.retry_after:
+            record('throttled_user')
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
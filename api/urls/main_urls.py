@@ -11,6 +11,9 @@ from ..views import (
     transfer_view,
     report_view,
     chatbot,
+    profile_view,
+    dashboard_view,
+    forecast_view,
 )
 
 router = DefaultRouter()
@@ -18,6 +21,7 @@ router.register(r'categories', category_view.CategoryViewSet, basename='category
 router.register(r'wallets', wallet_view.WalletViewSet, basename='wallet')
 router.register(r'transactions', transaction_view.TransactionViewSet, basename='transaction')
 router.register(r'budgets', budget_view.BudgetViewSet, basename='budget')
+router.register(r'transfers', transfer_view.TransferViewSet, basename='transfer-history')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -29,6 +33,12 @@ urlpatterns = [
 
     path('transfer/', transfer_view.TransferView.as_view(), name='transfer'),
     path('reports/summary/', report_view.ReportView.as_view(), name='report-summary'),
+    path('reports/compare/', report_view.ComparisonReportView.as_view(), name='report-compare'),
+    path('dashboard/', dashboard_view.DashboardView.as_view(), name='dashboard'),
     path('reports/cashflow/', cashflow_view.CashFlowReportView.as_view(), name='report-cashflow'),
+    path('reports/forecast/', forecast_view.ForecastReportView.as_view(), name='report-forecast'),
     path('chatbot/', chatbot.ChatbotView.as_view(), name='chatbot'),
+    path('chatbot/stream/', chatbot.ChatbotStreamView.as_view(), name='chatbot-stream'),
+    path('chatbot/metrics/', chatbot.ChatbotMetricsView.as_view(), name='chatbot-metrics'),
+    path('profiles/<str:profile_id>/', profile_view.RequestProfileView.as_view(), name='request-profile'),
 ]
@@ -3,8 +3,11 @@ from .base_viewset import BaseViewSet
 from .category_view import CategoryViewSet
 from .wallet_view import WalletViewSet
 from .transaction_view import TransactionViewSet
-from .transfer_view import TransferView
-from .report_view import ReportView
+from .transfer_view import TransferView, TransferViewSet
+from .report_view import ReportView, ComparisonReportView
 from .budget_view import BudgetViewSet
 from .cashflow_view import CashFlowReportView
-from .chatbot import ChatbotView
+from .forecast_view import ForecastReportView
+from .dashboard_view import DashboardView
+from .chatbot import ChatbotView, ChatbotStreamView
+from .profile_view import RequestProfileView
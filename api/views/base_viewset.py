@@ -1,14 +1,25 @@
+from functools import wraps
 from rest_framework import viewsets, permissions
+from ..sharding import shard_atomic
+
+
+def atomic_for_request_user(method):
+    """Như @transaction.atomic nhưng mở transaction trên shard của user đang gọi API."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with shard_atomic(self.request.user.pk):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class BaseViewSet(viewsets.ModelViewSet):
-    """Tự động lọc theo user đăng nhập và gán user khi tạo mới."""
+    """Tự động lọc theo user đăng nhập (trên shard của user) và gán user khi tạo mới."""
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         if not self.request.user.is_authenticated:
             return self.queryset.none()
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.for_user(self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -1,17 +1,38 @@
-import datetime
-from ..models import Budget
-from ..serializers import BudgetSerializer
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from ..models import Budget, BudgetAlert
+from ..serializers import BudgetSerializer, BudgetAlertSerializer
+from ..services.budgets import recalculate_spent
 from .base_viewset import BaseViewSet
 
 
 class BudgetViewSet(BaseViewSet):
-    """CRUD cho Ngân sách (Budgets)."""
-    queryset = Budget.objects.all().order_by('category__name')
+    """CRUD cho Ngân sách (Budgets), kèm mức đã chi / còn lại."""
+    queryset = Budget.objects.select_related('category').order_by('category__name')
     serializer_class = BudgetSerializer
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        today = datetime.date.today()
+        today = timezone.localdate()
         month = self.request.query_params.get('month', today.month)
         year = self.request.query_params.get('year', today.year)
         return queryset.filter(month=month, year=year)
+
+    def perform_create(self, serializer):
+        budget = serializer.save(user=self.request.user)
+        recalculate_spent([budget])
+
+    def perform_update(self, serializer):
+        budget = serializer.save()
+        recalculate_spent([budget])
+
+    @action(detail=False, methods=['get'])
+    def alerts(self, request):
+        """GET /budgets/alerts/ — các lần vượt ngưỡng gần nhất (?limit=, mặc định 20)."""
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            limit = 20
+        alerts = BudgetAlert.objects.for_user(request.user).select_related('budget__category')[:limit]
+        return Response(BudgetAlertSerializer(alerts, many=True).data)
@@ -1,19 +1,62 @@
 import datetime
 from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
 from django.db.models import Sum, Q, DecimalField, Value
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, TruncDay, TruncWeek, TruncMonth, TruncYear
+from django.utils import timezone
 from rest_framework import permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from ..models import Transaction
+from ..services.archive import transaction_models, merge_aggregates
+
+# granularity -> (hàm Trunc, số kỳ tối đa cho một lần gọi)
+GRANULARITIES = {
+    'day': (TruncDay, 366),
+    'week': (TruncWeek, 260),
+    'month': (TruncMonth, 120),
+    'year': (TruncYear, 50),
+}
+
+
+def bucket_start(day, granularity):
+    """Ngày bắt đầu của kỳ chứa `day` — khớp với Trunc* phía SQL."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if granularity == 'year':
+        return day.replace(year=day.year + 1)
+    return day + timedelta(days=1)
+
+
+def iter_buckets(start_date, end_date, granularity):
+    current = bucket_start(start_date, granularity)
+    while current <= end_date:
+        yield current
+        current = next_bucket(current, granularity)
 
 
 class CashFlowReportView(APIView):
+    """
+    Dòng tiền thu/chi theo kỳ (?granularity=day|week|month|year, mặc định day).
+    Gom nhóm trong SQL và trả về chuỗi liên tục — kỳ không có giao dịch = 0.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        today = datetime.date.today()
+        today = timezone.localdate()
 
         try:
             start_date_str = request.query_params.get('start_date')
@@ -24,23 +67,51 @@ class CashFlowReportView(APIView):
             start_date = today - timedelta(days=30)
             end_date = today
 
-        daily_summary_query = Transaction.objects.filter(
-            user=user,
-            date__range=[start_date, end_date]
-        ).values('date').annotate(
-            total_income=Coalesce(
-                Sum('amount', filter=Q(category__type='income'), output_field=DecimalField()),
-                Value(0, output_field=DecimalField())
-            ),
-            total_expense=Coalesce(
-                Sum('amount', filter=Q(category__type='expense'), output_field=DecimalField()),
-                Value(0, output_field=DecimalField())
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return Response({"error": "granularity phải là một trong: day, week, month, year."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start_date > end_date:
+            return Response({"error": "start_date phải trước end_date."}, status=status.HTTP_400_BAD_REQUEST)
+
+        trunc, max_buckets = GRANULARITIES[granularity]
+        buckets = list(islice(iter_buckets(start_date, end_date, granularity), max_buckets + 1))
+        if len(buckets) > max_buckets:
+            return Response(
+                {"error": f"Khoảng thời gian quá dài: tối đa {max_buckets} kỳ với granularity={granularity}."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        ).order_by('date')
 
-        daily_summary_data = [
-            {'day': item['date'], 'total_income': item['total_income'], 'total_expense': item['total_expense']}
-            for item in daily_summary_query
-        ]
+        summary_query = merge_aggregates(
+            (
+                model.objects.filter(
+                    user=user,
+                    date__range=[start_date, end_date],
+                    transfer__isnull=True,
+                ).annotate(period=trunc('date')).values('period').annotate(
+                    total_income=Coalesce(
+                        Sum('amount', filter=Q(type='income'), output_field=DecimalField()),
+                        Value(0, output_field=DecimalField())
+                    ),
+                    total_expense=Coalesce(
+                        Sum('amount', filter=Q(type='expense'), output_field=DecimalField()),
+                        Value(0, output_field=DecimalField())
+                    )
+                ).order_by('period')
+                for model in transaction_models(start_date)
+            ),
+            keys=('period',), sums=('total_income', 'total_expense'),
+        )
+
+        totals = {item['period']: item for item in summary_query}
+        zero = Decimal('0')
+        summary_data = []
+        for period in buckets:
+            item = totals.get(period)
+            summary_data.append({
+                'day': period,  # ngày bắt đầu của kỳ (giữ tên trường cũ cho client)
+                'total_income': item['total_income'] if item else zero,
+                'total_expense': item['total_expense'] if item else zero,
+            })
 
-        return Response(daily_summary_data, status=status.HTTP_200_OK)
+        return Response(summary_data, status=status.HTTP_200_OK)
@@ -1,9 +1,68 @@
-from ..models import Category
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Sum
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from ..models import ArchivedTransaction, Category, Budget, Transaction
 from ..serializers import CategorySerializer
-from .base_viewset import BaseViewSet
+from ..services.budgets import recalculate_spent
+from ..services.ledger import apply_wallet_deltas, to_money
+from ..services.predictor import predict
+from .base_viewset import BaseViewSet, atomic_for_request_user
 
 
 class CategoryViewSet(BaseViewSet):
     """CRUD cho danh mục thu/chi."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+
+    @atomic_for_request_user
+    def perform_update(self, serializer):
+        self.ensure_not_system(serializer.instance)
+        old_type = serializer.instance.type
+        category = serializer.save()
+        if category.type != old_type:
+            # Đồng bộ loại đã chép sang các giao dịch (Transaction.type), đảo dấu phần
+            # đóng góp của chúng vào số dư ví (±2 × tổng mỗi ví), rồi tính lại mức chi
+            # của các ngân sách trên danh mục này
+            sign = 2 if category.type == Category.TYPE_INCOME else -2
+            balance_deltas, opening_deltas = defaultdict(Decimal), defaultdict(Decimal)
+            for model in (Transaction, ArchivedTransaction):
+                rows = model.objects.filter(category=category)
+                for row in rows.values('wallet_id').annotate(total=Sum('amount')).order_by():
+                    delta = sign * to_money(row['total'])
+                    balance_deltas[row['wallet_id']] += delta
+                    if model is ArchivedTransaction:
+                        # Giao dịch đã lưu trữ nằm trong opening_balance (xem archive_batch)
+                        opening_deltas[row['wallet_id']] += delta
+                rows.update(type=category.type)
+            apply_wallet_deltas(balance_deltas)
+            apply_wallet_deltas(opening_deltas, field='opening_balance')
+            recalculate_spent(Budget.objects.filter(category=category))
+
+    def perform_destroy(self, instance):
+        self.ensure_not_system(instance)
+        instance.delete()
+
+    @staticmethod
+    def ensure_not_system(instance):
+        if instance.is_system:
+            raise ValidationError("Không thể sửa hoặc xóa danh mục hệ thống.")
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        GET /categories/suggest/?description=ăn trưa — danh mục có khả năng nhất
+        theo lịch sử giao dịch của user (?limit=, mặc định 3; ?type=expense|income).
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 3)), 10)
+        except ValueError:
+            limit = 3
+        category_type = request.query_params.get('type')
+        if category_type not in (None, Category.TYPE_EXPENSE, Category.TYPE_INCOME):
+            raise ValidationError({"type": "Phải là expense hoặc income."})
+        return Response(predict(
+            request.user.id, request.query_params.get('description', ''), limit=limit, category_type=category_type,
+        ))
@@ -7,26 +7,49 @@ import google.generativeai as genai
 
 # --- Django imports ---
 from django.conf import settings
-from django.db import transaction
 from django.db.models import Sum
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
+from rest_framework.exceptions import Throttled
 
 # --- Models ---
 from ..models.wallet import Wallet
 from ..models.category import Category
 from ..models.transaction import Transaction
+from ..services.budgets import track_expenses
+from ..services.archive import transaction_models
+from ..db_router import replica_reads
+from ..sharding import shard_atomic, shard_for_user, use_shard
+from ..services.fake_llm import FakeGenerativeModel
+from ..services.prompting import SYSTEM_INSTRUCTION, build_chat_prompt
+from ..services.predictor import predict, learn
+from ..services.autocomplete import remember
+from ..services.streaming import ClosingStream, ReplyStream, sse_event
+from ..services.ratelimit import acquire_slot, release_slot, record, busy_retry_after, chatbot_metrics
+from ..serializers import TransactionSerializer
+from ..throttles import ChatbotTokenBucketThrottle
+
+MAX_AMOUNT = Decimal(10) ** 13  # Transaction.amount: max_digits=15, decimal_places=2
 
 # --- (C) CẤU HÌNH API KEY ---
-try:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    model = genai.GenerativeModel('models/gemini-2.5-flash')  # Dùng mô hình Flash cho tốc độ
-    print("✅ (Chatbot) Kết nối Google Gemini API thành công!")
-except Exception as e:
-    print(f"❌ (Chatbot) Lỗi: Không thể kết nối Gemini API. Kiểm tra API Key. Lỗi: {e}")
-    model = None
+if settings.CHATBOT_FAKE_LLM_LATENCY is not None:
+    # Load test: LLM giả lập trả lời sau X giây, không gọi Gemini
+    model = FakeGenerativeModel(settings.CHATBOT_FAKE_LLM_LATENCY)
+    print(f"⚠️ (Chatbot) Đang dùng LLM giả lập (độ trễ {settings.CHATBOT_FAKE_LLM_LATENCY}s).")
+else:
+    try:
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        model = genai.GenerativeModel(
+            'models/gemini-2.5-flash',  # Dùng mô hình Flash cho tốc độ
+            system_instruction=SYSTEM_INSTRUCTION,  # hướng dẫn cố định, tách khỏi prompt từng tin nhắn
+        )
+        print("✅ (Chatbot) Kết nối Google Gemini API thành công!")
+    except Exception as e:
+        print(f"❌ (Chatbot) Lỗi: Không thể kết nối Gemini API. Kiểm tra API Key. Lỗi: {e}")
+        model = None
 
 
 # ==========================================================
@@ -38,223 +61,219 @@ class ChatbotView(APIView):
     để tạo giao dịch và hỏi đáp.
     """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ChatbotTokenBucketThrottle]
 
     def post(self, request, *args, **kwargs):
         user = request.user
         message = request.data.get('message', '').strip()
 
-        if not message:
-            return Response({"reply": "Tin nhắn rỗng"}, status=status.HTTP_400_BAD_REQUEST)
-        if model is None:
-            return Response({"reply": "Lỗi: Bot AI chưa sẵn sàng. Vui lòng kiểm tra API Key phía server."},
-                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        rejected = self.admit(message)
+        if rejected is not None:
+            return rejected
 
         try:
-            # --- (1) Lấy "Kiến thức" (Context) của User ---
-            wallets = list(Wallet.objects.filter(user=user).values('id', 'name'))
-            categories = list(Category.objects.filter(user=user).values('id', 'name', 'type'))
-
-            # --- (2) Xây dựng Câu lệnh (Prompt) cho AI ---
-            prompt = self.build_prompt(message, wallets, categories)
+            prompt = self.prepare_prompt(user, message)
 
             # --- (3) Gọi API Google AI ---
-            generation_config = genai.types.GenerationConfig(
-                response_mime_type="application/json"
-            )
-            response = model.generate_content(prompt, generation_config=generation_config)
+            response = model.generate_content(prompt, generation_config=self.generation_config())
 
             print("--- AI Raw Response ---")
             print(response.text)
             print("-----------------------")
 
             # --- (4) Xử lý JSON trả về ---
-            ai_data = json.loads(response.text)
-            action = ai_data.get("action")
-            reply_message = ai_data.get("reply", "Tôi đã xử lý xong.")
-
-            # --- (A) TẠO GIAO DỊCH ---
-            if action == "create_transaction":
-                data = ai_data.get("data")
-                self.create_transaction_from_ai(user, data)
-                return Response({"reply": reply_message})
-
-            # --- (B) LỖI VALIDATION (PHẦN BỔ SUNG HOÀN THIỆN) ---
-            # Xử lý KỊCH BẢN 4: Không tạo giao dịch và báo lỗi cho người dùng.
-            elif action == "error_validation":
-                return Response({"reply": reply_message}, status=status.HTTP_400_BAD_REQUEST)
-
-            # --- (C) TRẢ LỜI CÂU HỎI ---
-            elif action == "answer_question":
-                query_type = ai_data.get("query_type")
-                data = ai_data.get("data", {})
-                final_reply = ""
-
-                # --- 1. Tổng chi tháng này ---
-                if query_type == "total_expense_current_month":
-                    now = timezone.now()
-                    total = Transaction.objects.filter(
-                        user=user,
-                        category__type='expense',
-                        date__year=now.year,
-                        date__month=now.month
-                    ).aggregate(total_sum=Sum('amount'))['total_sum'] or Decimal(0)
-                    final_reply = f"Tổng chi tháng này của bạn là {total:,.0f}đ."
-
-                # --- 2. Số dư ví ---
-                elif query_type == "get_wallet_balance":
-                    wallet_id = data.get("wallet_id")
-                    if wallet_id is None:
-                        final_reply = "Xin lỗi, tôi không rõ bạn muốn hỏi số dư của ví nào."
-                    else:
-                        try:
-                            wallet = Wallet.objects.get(id=wallet_id, user=user)
-                            final_reply = f"Số dư trong ví '{wallet.name}' của bạn là {wallet.balance:,.0f}đ."
-                        except Wallet.DoesNotExist:
-                            final_reply = "Xin lỗi, tôi không tìm thấy ví đó trong tài khoản của bạn."
-
-                # --- 3. Tổng chi của tháng cụ thể ---
-                elif query_type == "total_expense_specific_month":
-                    month = data.get("month")
-                    if month is None:
-                        final_reply = "Bạn vui lòng nói rõ tháng nào nhé (ví dụ: 'tháng 10')."
-                    else:
-                        now = timezone.now()
-                        total = Transaction.objects.filter(
-                            user=user,
-                            category__type='expense',
-                            date__year=now.year,  # (Giả định user hỏi năm hiện tại)
-                            date__month=month
-                        ).aggregate(total_sum=Sum('amount'))['total_sum'] or Decimal(0)
-                        final_reply = f"Tổng chi tháng {month} của bạn là {total:,.0f}đ."
-
-                # --- Không biết xử lý ---
-                else:
-                    final_reply = "Tôi đã nhận được câu hỏi, nhưng hiện tại tôi chưa được lập trình để tính điều này."
-
-                return Response({"reply": final_reply})
-
-            # --- (D) KHÔNG HIỂU ---
-            else:
-                return Response({"reply": ai_data.get("reply", "Xin lỗi, tôi chưa hiểu ý bạn.")})
+            result = self.run_action(user, json.loads(response.text))
+            return Response({"reply": result['reply']}, status=result['status'])
 
         except Exception as e:
             print(f"--- AI API Error --- \n{e}\n------------------")
             return Response({"reply": f"Xin lỗi, Bot AI đang gặp lỗi: {str(e)}"})
+        finally:
+            release_slot(self.slot)
+
+    def admit(self, message):
+        """
+        Response lỗi nếu không phục vụ được; None nếu đã giữ được một chỗ gọi Gemini
+        (lưu ở self.slot — nhớ release_slot).
+        """
+        if not message:
+            return Response({"reply": "Tin nhắn rỗng"}, status=status.HTTP_400_BAD_REQUEST)
+        if model is None:
+            return Response({"reply": "Lỗi: Bot AI chưa sẵn sàng. Vui lòng kiểm tra API Key phía server."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        # Giới hạn số lời gọi Gemini chạy đồng thời trên toàn hệ thống
+        self.slot = acquire_slot()
+        if self.slot is None:
+            record('throttled_busy')
+            raise Throttled(wait=busy_retry_after(), detail="Bot AI đang bận, vui lòng thử lại sau giây lát.")
+        record('allowed')
+        return None
+
+    def prepare_prompt(self, user, message):
+        # --- (1) Lấy "Kiến thức" (Context) của User ---
+        wallets = list(Wallet.objects.filter(user=user).values('id', 'name'))
+        categories = list(Category.objects.filter(user=user).values('id', 'name', 'type'))
+
+        # Đoán danh mục từ lịch sử giao dịch của user (không cần gọi AI)
+        suggestions = predict(user.id, message, limit=2)
+
+        # --- (2) Xây dựng Câu lệnh (Prompt) cho AI ---
+        return self.build_prompt(message, wallets, categories, suggestions)
+
+    @staticmethod
+    def generation_config():
+        return genai.types.GenerationConfig(response_mime_type="application/json")
+
+    def run_action(self, user, ai_data):
+        """
+        Thực hiện hành động AI trả về. Trả về dict: action, reply, status (HTTP)
+        và transaction (giao dịch vừa tạo, nếu có).
+        """
+        action = ai_data.get("action")
+        reply_message = ai_data.get("reply", "Tôi đã xử lý xong.")
+        result = {"action": action, "reply": reply_message, "status": status.HTTP_200_OK, "transaction": None}
+
+        # --- (A) TẠO GIAO DỊCH ---
+        if action == "create_transaction":
+            try:
+                result["transaction"] = self.create_transaction_from_ai(user, ai_data.get("data"))
+            except ValueError as e:
+                # Dữ liệu AI trả về không hợp lệ -> không ghi gì vào CSDL
+                result.update(reply=str(e), status=status.HTTP_400_BAD_REQUEST)
+
+        # --- (B) LỖI VALIDATION (PHẦN BỔ SUNG HOÀN THIỆN) ---
+        # Xử lý KỊCH BẢN 4: Không tạo giao dịch và báo lỗi cho người dùng.
+        elif action == "error_validation":
+            result["status"] = status.HTTP_400_BAD_REQUEST
+
+        # --- (C) TRẢ LỜI CÂU HỎI ---
+        elif action == "answer_question":
+            query_type = ai_data.get("query_type")
+            data = ai_data.get("data", {})
+            # Câu hỏi chỉ đọc dữ liệu -> được phép đi replica (trừ khi user vừa ghi)
+            with replica_reads(user.id):
+                result["reply"] = self.answer_question(user, query_type, data)
+
+        # --- (D) KHÔNG HIỂU ---
+        else:
+            result["reply"] = ai_data.get("reply", "Xin lỗi, tôi chưa hiểu ý bạn.")
+        return result
+
+    # ==========================================================
+    # 📊 Trả lời câu hỏi bằng truy vấn phía server
+    # ==========================================================
+    def answer_question(self, user, query_type, data):
+        final_reply = ""
+
+        # --- 1. Tổng chi tháng này ---
+        if query_type == "total_expense_current_month":
+            today = timezone.localdate()
+            total = sum((
+                model.objects.filter(
+                    user=user,
+                    type='expense',
+                    transfer__isnull=True,
+                    date__year=today.year,
+                    date__month=today.month
+                ).aggregate(total_sum=Sum('amount'))['total_sum'] or Decimal(0)
+                for model in transaction_models(datetime.date(today.year, today.month, 1))
+            ), Decimal(0))
+            final_reply = f"Tổng chi tháng này của bạn là {total:,.0f}đ."
+
+        # --- 2. Số dư ví ---
+        elif query_type == "get_wallet_balance":
+            wallet_id = data.get("wallet_id")
+            if wallet_id is None:
+                final_reply = "Xin lỗi, tôi không rõ bạn muốn hỏi số dư của ví nào."
+            else:
+                try:
+                    wallet = Wallet.objects.get(id=wallet_id, user=user)
+                    final_reply = f"Số dư trong ví '{wallet.name}' của bạn là {wallet.balance:,.0f}đ."
+                except Wallet.DoesNotExist:
+                    final_reply = "Xin lỗi, tôi không tìm thấy ví đó trong tài khoản của bạn."
+
+        # --- 3. Tổng chi của tháng cụ thể ---
+        elif query_type == "total_expense_specific_month":
+            month = data.get("month")
+            if month is None:
+                final_reply = "Bạn vui lòng nói rõ tháng nào nhé (ví dụ: 'tháng 10')."
+            else:
+                today = timezone.localdate()
+                total = sum((
+                    model.objects.filter(
+                        user=user,
+                        type='expense',
+                        transfer__isnull=True,
+                        date__year=today.year,  # (Giả định user hỏi năm hiện tại)
+                        date__month=month
+                    ).aggregate(total_sum=Sum('amount'))['total_sum'] or Decimal(0)
+                    for model in transaction_models(datetime.date(today.year, int(month), 1))
+                ), Decimal(0))
+                final_reply = f"Tổng chi tháng {month} của bạn là {total:,.0f}đ."
+
+        # --- Không biết xử lý ---
+        else:
+            final_reply = "Tôi đã nhận được câu hỏi, nhưng hiện tại tôi chưa được lập trình để tính điều này."
+
+        return final_reply
 
     # ==========================================================
     # 🧠 Hàm "Dạy" AI cách hiểu câu hỏi và yêu cầu JSON
     # ==========================================================
-    def build_prompt(self, message, wallets, categories):
-        wallets_str = json.dumps(wallets)
-        categories_str = json.dumps(categories)
-        today_str = datetime.date.today().strftime('%Y-%m-%d')
-
-        prompt = f"""
-        Bạn là một trợ lý tài chính thông minh cho người dùng Việt Nam.
-        Ngày hôm nay là: {today_str}.
-
-        Kiến thức của bạn:
-        1. Danh sách Ví của user: {wallets_str}
-        2. Danh sách Danh mục của user: {categories_str}
-
-        Nhiệm vụ:
-        Phân tích tin nhắn và phản hồi bằng JSON duy nhất.
-
-        ---
-        KỊCH BẢN 1: TẠO GIAO DỊCH (Nếu có số tiền)
-        Ví dụ user: "ăn trưa 50k bằng tiền mặt"
-        => Trả về JSON:
-        {{
-          "action": "create_transaction",
-          "reply": "✅ Đã lưu: Ăn trưa (-50.000đ) vào 'Ăn uống' từ 'Tiền mặt' nhé!",
-          "data": {{
-            "amount": 50000,
-            "date": "{today_str}",
-            "description": "Ăn trưa",
-            "wallet_id": (id ví),
-            "category_id": (id danh mục)
-          }}
-        }}
-
-        ---
-        KỊCH BẢN 2: HỎI ĐÁP (Nếu không có số tiền)
-        Nhiệm vụ là nhận diện ý định và yêu cầu server truy vấn.
-
-        Ví dụ 1: "tổng chi tháng này?"
-        =>
-        {{
-          "action": "answer_question",
-          "reply": "Bạn đợi chút, tôi đang tính tổng chi tháng này...",
-          "query_type": "total_expense_current_month",
-          "data": {{}}
-        }}
-
-        Ví dụ 2: "số dư ví tiền mặt?"
-        =>
-        {{
-          "action": "answer_question",
-          "reply": "Đang kiểm tra số dư 'Tiền mặt'...",
-          "query_type": "get_wallet_balance",
-          "data": {{"wallet_id": (id ví tiền mặt)}}
-        }}
-
-        Ví dụ 3: "tháng 10 tiêu bao nhiêu?"
-        =>
-        {{
-          "action": "answer_question",
-          "reply": "Đang kiểm tra chi tiêu tháng 10...",
-          "query_type": "total_expense_specific_month",
-          "data": {{"month": 10}}
-        }}
-
-        ---
-        KỊCH BẢN 3: KHÔNG HIỂU
-        {{
-          "action": "unknown",
-          "reply": "Xin lỗi, tôi chỉ là trợ lý tài chính. Tôi không hiểu câu hỏi này."
-        }}
-
-        ---
-        KỊCH BẢN 4: LỖI VALIDATION (RẤT QUAN TRỌNG)
-        Nếu user muốn TẠO GIAO DỊCH nhưng bạn KHÔNG tìm thấy 'wallet_id' hoặc 'category_id'
-        khớp với Kiến thức hiện tại → TUYỆT ĐỐI KHÔNG tạo giao dịch.
-
-        Ví dụ 1: User nói "ăn trưa 50k bằng ví 'thẻ'" (không có ví 'thẻ')
-        {{
-          "action": "error_validation",
-          "reply": "Xin lỗi, tôi không tìm thấy ví nào tên 'thẻ'. Vui lòng kiểm tra lại."
-        }}
-
-        Ví dụ 2: User nói "chi 100k cho 'xe cộ'" (không có danh mục 'xe cộ')
-        {{
-          "action": "error_validation",
-          "reply": "Xin lỗi, tôi không tìm thấy danh mục nào tên 'xe cộ'. Vui lòng kiểm tra lại."
-        }}
-
-        ---
-        Bây giờ, xử lý tin nhắn người dùng:
-        "{message}"
-        """
-        return prompt
+    def build_prompt(self, message, wallets, categories, suggestions=()):
+        # Chỉ gửi ví/danh mục liên quan tới tin nhắn, trong ngân sách token
+        return build_chat_prompt(
+            message, wallets, categories, timezone.localdate(), suggestions=suggestions
+        ).text
 
     # ==========================================================
     # 🧾 Hàm tạo giao dịch thực tế
     # ==========================================================
-    def create_transaction_from_ai(self, user, data):
+    @staticmethod
+    def clean_transaction_data(user, data):
+        """Kiểm tra dữ liệu giao dịch AI trả về (ví/danh mục của user, số tiền > 0, ngày) — ValueError nếu sai."""
+        if not isinstance(data, dict):
+            raise ValueError("Thiếu thông tin giao dịch.")
         try:
-            with transaction.atomic():
-                wallet = Wallet.objects.get(id=data['wallet_id'], user=user)
-                category = Category.objects.get(id=data['category_id'], user=user)
-                amount = Decimal(data['amount'])
-                date = data.get('date', datetime.date.today())
+            wallet = Wallet.objects.get(id=data['wallet_id'], user=user)
+            category = Category.objects.get(id=data['category_id'], user=user, is_system=False)
+        except (KeyError, TypeError, ValueError, Wallet.DoesNotExist, Category.DoesNotExist):
+            raise ValueError("Không tìm thấy ví hoặc danh mục của giao dịch.")
+        try:
+            amount = Decimal(str(data['amount']))
+        except (KeyError, ArithmeticError):
+            raise ValueError("Số tiền không hợp lệ.")
+        if not amount.is_finite() or amount <= 0:
+            raise ValueError("Số tiền phải lớn hơn 0.")
+        if amount >= MAX_AMOUNT:
+            raise ValueError("Số tiền quá lớn.")
+        date = data.get('date') or timezone.localdate()
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        elif isinstance(date, str):
+            try:
+                date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError("Ngày giao dịch không hợp lệ (YYYY-MM-DD).")
+        elif not isinstance(date, datetime.date):
+            # Số, list, dict... từ LLM: từ chối ở đây thay vì để lỗi khi ghi giao dịch
+            raise ValueError("Ngày giao dịch không hợp lệ (YYYY-MM-DD).")
+        description = str(data.get('description') or category.name).capitalize()
+        return wallet, category, amount.quantize(Decimal('0.01')), date, description
 
-                Transaction.objects.create(
+    def create_transaction_from_ai(self, user, data):
+        # Kiểm tra trước, chỉ ghi khi dữ liệu hợp lệ (ValueError -> không ghi gì)
+        wallet, category, amount, date, description = self.clean_transaction_data(user, data)
+        try:
+            with shard_atomic(user.pk):
+                transaction_obj = Transaction.objects.create(
                     user=user,
                     wallet=wallet,
                     category=category,
                     amount=amount,
                     date=date,
-                    description=data.get('description', category.name).capitalize()
+                    description=description,
                 )
 
                 # Cập nhật số dư ví
@@ -263,7 +282,76 @@ class ChatbotView(APIView):
                 else:
                     wallet.balance -= amount
                 wallet.save(update_fields=['balance'])
+                track_expenses(user.id, (category, date, amount))
+                learn(user.id, (category.pk, transaction_obj.description, 1))
+                remember(user.id, (transaction_obj.description, date, wallet.pk, category.pk, amount, 1))
+            return transaction_obj
         except Exception as e:
             print(f"Lỗi khi tạo Giao dịch từ AI: {e}")
             # Bạn có thể ném lỗi (raise e) để chatbot báo lỗi ngược lại cho user
-            raise Exception(f"Lỗi server khi lưu giao dịch: {e}")
\ No newline at end of file
+            raise Exception(f"Lỗi server khi lưu giao dịch: {e}")
+
+
+class ChatbotStreamView(ChatbotView):
+    """
+    Như ChatbotView nhưng trả lời dần qua Server-Sent Events (text/event-stream):
+        event: ack     — ngay khi nhận tin nhắn
+        event: delta   — từng đoạn câu trả lời ({"text": ...}) khi Gemini đang sinh
+        event: result  — kết quả cuối ({"action", "reply", "status", "transaction"})
+        event: error   — lỗi ({"reply": ...})
+    Giao dịch chỉ được ghi sau khi JSON hoàn chỉnh đã được kiểm tra (như ChatbotView);
+    các đoạn delta là lời tạm của AI — client hiển thị `reply` của result thay cho chúng.
+    """
+
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        message = request.data.get('message', '').strip()
+
+        rejected = self.admit(message)
+        if rejected is not None:
+            return rejected
+
+        # Middleware đã trả response trước khi stream chạy -> tự định tuyến tới shard của user.
+        # Chỗ in-flight được trả khi response đóng (ClosingStream), không chờ generator chạy tới finally
+        try:
+            stream = ClosingStream(self.events(user, message, shard_for_user(user.pk)), self.release)
+        except Exception:
+            self.release()
+            raise
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx: không gom buffer
+        return response
+
+    def release(self):
+        release_slot(self.slot)
+
+    def events(self, user, message, alias):
+        try:
+            yield sse_event('ack', {"status": "received"})
+            with use_shard(alias):
+                prompt = self.prepare_prompt(user, message)
+
+            reply = ReplyStream()
+            for chunk in model.generate_content(prompt, generation_config=self.generation_config(), stream=True):
+                text = reply.feed(chunk.text)
+                if text:
+                    yield sse_event('delta', {"text": text})
+
+            with use_shard(alias):
+                result = self.run_action(user, json.loads(reply.buffer))
+            if result['transaction'] is not None:
+                result['transaction'] = TransactionSerializer(result['transaction']).data
+            yield sse_event('result', result)
+
+        except Exception as e:
+            print(f"--- AI API Error (stream) --- \n{e}\n------------------")
+            yield sse_event('error', {"reply": f"Xin lỗi, Bot AI đang gặp lỗi: {str(e)}"})
+
+
+class ChatbotMetricsView(APIView):
+    """Số liệu giới hạn tần suất chatbot (chỉ admin): được phục vụ, bị chặn theo user / do quá tải."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(chatbot_metrics())
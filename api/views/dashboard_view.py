@@ -0,0 +1,92 @@
+from decimal import Decimal
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from ..models import Wallet, Category, Transaction, Budget
+from ..serializers import WalletSerializer, TransactionSerializer, BudgetSerializer
+from ..services.archive import transaction_models, merge_aggregates
+from .report_view import PERIOD_MONTHS, parse_date, period_range
+
+MAX_RECENT = 50
+MAX_TOP = 20
+
+
+class DashboardView(APIView):
+    """
+    Toàn bộ dữ liệu màn hình chính trong một lần gọi, với số truy vấn cố định
+    (4 truy vấn; thêm 1 nếu kỳ chạm vào kho lưu trữ): ví, tổng thu/chi và top
+    danh mục chi của kỳ, ngân sách của kỳ, các giao dịch gần nhất.
+
+    Tham số:
+        period=month|quarter|year (mặc định month), date=YYYY-MM-DD (mặc định hôm nay)
+        recent=số giao dịch gần nhất (mặc định 10, tối đa 50)
+        top=số danh mục chi nhiều nhất (mặc định 5, tối đa 20)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        params = request.query_params
+        try:
+            period = params.get('period', 'month')
+            if period not in PERIOD_MONTHS:
+                raise ValueError(period)
+            anchor = parse_date(params['date']) if params.get('date') else timezone.localdate()
+            recent = min(max(int(params.get('recent', 10)), 0), MAX_RECENT)
+            top = min(max(int(params.get('top', 5)), 0), MAX_TOP)
+        except (ValueError, TypeError):
+            return Response({"error": "Tham số không hợp lệ (period, date, recent, top)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        start_date, end_date = period_range(anchor, period)
+
+        # (1) Ví
+        wallets = list(Wallet.objects.filter(user=user))
+
+        # (2) Tổng theo danh mục của kỳ — suy ra tổng thu, tổng chi và top danh mục chi
+        rows = merge_aggregates(
+            (
+                model.objects.filter(user=user, date__range=[start_date, end_date], transfer__isnull=True)
+                .values('category_id', 'category__name', 'type')
+                .annotate(total_amount=Sum('amount'))
+                .order_by()
+                for model in transaction_models(start_date)
+            ),
+            keys=('category_id',), sums=('total_amount',),
+        )
+        totals = {Category.TYPE_INCOME: Decimal('0'), Category.TYPE_EXPENSE: Decimal('0')}
+        for row in rows:
+            totals[row['type']] += row['total_amount']
+        expenses = sorted(
+            (row for row in rows if row['type'] == Category.TYPE_EXPENSE),
+            key=lambda row: row['total_amount'], reverse=True,
+        )[:top]
+
+        # (3) Ngân sách các tháng trong kỳ (kỳ luôn nằm trong một năm)
+        budgets = Budget.objects.filter(
+            user=user, year=start_date.year, month__range=(start_date.month, end_date.month)
+        ).select_related('category')
+
+        # (4) Giao dịch gần nhất
+        recent_transactions = (
+            Transaction.objects.filter(user=user)
+            .select_related('category', 'wallet')
+            .order_by('-date', '-id')[:recent]
+        ) if recent else []
+
+        return Response({
+            'period': {'period': period, 'start_date': start_date, 'end_date': end_date},
+            'wallets': WalletSerializer(wallets, many=True).data,
+            'total_balance': sum((wallet.balance for wallet in wallets), Decimal('0')),
+            'total_income': totals[Category.TYPE_INCOME],
+            'total_expense': totals[Category.TYPE_EXPENSE],
+            'net': totals[Category.TYPE_INCOME] - totals[Category.TYPE_EXPENSE],
+            'top_expense_categories': [
+                {'category_id': row['category_id'], 'category__name': row['category__name'],
+                 'total_amount': row['total_amount']}
+                for row in expenses
+            ],
+            'budgets': BudgetSerializer(budgets, many=True).data,
+            'recent_transactions': TransactionSerializer(recent_transactions, many=True).data,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,85 @@
+import datetime
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from ..models import Budget
+from ..services.forecast import daily_expense_matrix, forecast_matrix, anomaly_matrix
+from .report_view import parse_date
+
+MAX_HISTORY_DAYS = 3 * 366
+
+
+class ForecastReportView(APIView):
+    """
+    Dự báo chi tiêu cuối tháng theo từng danh mục chi và các ngày chi bất thường.
+
+    Tham số:
+        date=YYYY-MM-DD (mặc định hôm nay) — ngày tính dự báo
+        history_days=số ngày lịch sử (mặc định 180, 28..1098)
+        halflife=chu kỳ bán rã (ngày) của trọng số nhịp chi (mặc định 14)
+        z=ngưỡng z-score để coi là bất thường (mặc định 3), recent=số ngày gần nhất được xét (mặc định 7)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        params = request.query_params
+        try:
+            today = parse_date(params['date']) if params.get('date') else timezone.localdate()
+            history_days = int(params.get('history_days', 180))
+            halflife = float(params.get('halflife', 14))
+            threshold = float(params.get('z', 3))
+            recent = int(params.get('recent', 7))
+            if not (28 <= history_days <= MAX_HISTORY_DAYS and halflife > 0 and 1 <= recent < history_days):
+                raise ValueError
+        except (ValueError, TypeError):
+            return Response({"error": "Tham số không hợp lệ (date, history_days, halflife, z, recent)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Ma trận phải phủ cả đầu tháng để tính số đã chi
+        start_date = min(today - datetime.timedelta(days=history_days - 1), today.replace(day=1))
+        category_ids, names, matrix = daily_expense_matrix(user, start_date, today)
+        budgets = dict(
+            Budget.objects.filter(user=user, year=today.year, month=today.month)
+            .values_list('category_id', 'amount')
+        )
+
+        forecast = forecast_matrix(matrix, start_date, today, halflife=halflife)
+        categories = []
+        for i, category_id in enumerate(category_ids):
+            budget = budgets.get(category_id)
+            projected = round(float(forecast['projected'][i]), 2)
+            categories.append({
+                'category_id': category_id,
+                'category_name': names[i],
+                'spent': round(float(forecast['spent'][i]), 2),
+                'daily_pace': round(float(forecast['pace'][i]), 2),
+                'projected': projected,
+                'budget': budget,
+                'projected_over_budget': budget is not None and projected > float(budget),
+            })
+        categories.sort(key=lambda item: item['projected'], reverse=True)
+
+        rows, cols, z, mean, std = anomaly_matrix(matrix, recent_days=recent, threshold=threshold)
+        anomalies = [
+            {
+                'category_id': category_ids[row],
+                'category_name': names[row],
+                'date': start_date + datetime.timedelta(days=int(col)),
+                'amount': round(float(matrix[row, col]), 2),
+                'z_score': round(float(score), 2),
+                'typical_daily': round(float(avg), 2),
+            }
+            for row, col, score, avg in zip(rows, cols, z, mean)
+        ]
+        anomalies.sort(key=lambda item: item['z_score'], reverse=True)
+
+        return Response({
+            'date': today,
+            'history_start': start_date,
+            'categories': categories,
+            'total_spent': round(sum(item['spent'] for item in categories), 2),
+            'total_projected': round(sum(item['projected'] for item in categories), 2),
+            'anomalies': anomalies,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,24 @@
+from django.http import HttpResponse
+from rest_framework import permissions, status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from ..profiling import load_profile
+
+
+class RequestProfileView(APIView):
+    """
+    Tải kết quả profiling của một request (xem RequestProfilingMiddleware).
+    ?output=folded trả về flame graph dạng text cho flamegraph.pl / speedscope.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id, *args, **kwargs):
+        profile = load_profile(profile_id)
+        if profile is None:
+            return Response({"error": "Không tìm thấy profile (có thể đã hết hạn)."},
+                            status=status.HTTP_404_NOT_FOUND)
+        if request.query_params.get('output') == 'folded':
+            response = HttpResponse(profile['folded'], content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.folded"'
+            return response
+        return Response(profile)
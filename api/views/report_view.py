@@ -1,11 +1,14 @@
 import datetime
 from datetime import timedelta
 from django.utils import timezone
-from django.db.models import Sum
+from decimal import Decimal
+from django.db.models import Sum, Q, Value, DecimalField
+from django.db.models.functions import Coalesce
 from rest_framework import permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from ..models import Transaction
+from ..models import Category
+from ..services.archive import transaction_models, merge_aggregates
 
 
 class ReportView(APIView):
@@ -14,7 +17,7 @@ class ReportView(APIView):
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        end_date = timezone.now().date()
+        end_date = timezone.localdate()
         start_date = end_date - timedelta(days=30)
 
         try:
@@ -25,13 +28,129 @@ class ReportView(APIView):
         except (ValueError, TypeError):
             pass
 
-        expenses = (
-            Transaction.objects.filter(
-                user=user, category__type='expense', date__range=[start_date, end_date]
-            )
-            .values('category__name')
-            .annotate(total_amount=Sum('amount'))
-            .order_by('-total_amount')
+        expenses = merge_aggregates(
+            (
+                model.objects.filter(
+                    user=user, type='expense', date__range=[start_date, end_date],
+                    transfer__isnull=True,
+                )
+                .values('category__name')
+                .annotate(total_amount=Sum('amount'))
+                .order_by('-total_amount')
+                for model in transaction_models(start_date)
+            ),
+            keys=('category__name',), sums=('total_amount',),
         )
+        expenses.sort(key=lambda row: row['total_amount'], reverse=True)
 
         return Response(expenses, status=status.HTTP_200_OK)
+
+
+PERIOD_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+
+def parse_date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def month_start(year, month):
+    """Ngày đầu tháng, cho phép month vượt khỏi 1..12 (tự chuyển năm)."""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime.date(year, month, 1)
+
+
+def period_range(anchor, period, offset=0):
+    """Khoảng [start, end] của kỳ chứa `anchor`, dịch `offset` kỳ (âm = lùi lại)."""
+    months = PERIOD_MONTHS[period]
+    first_month = (anchor.month - 1) // months * months + 1
+    start = month_start(anchor.year, first_month + offset * months)
+    end = month_start(start.year, start.month + months) - timedelta(days=1)
+    return start, end
+
+
+class ComparisonReportView(APIView):
+    """
+    So sánh thu/chi theo danh mục giữa hai kỳ trong MỘT truy vấn (conditional aggregation).
+
+    Tham số:
+        period=month|quarter|year (mặc định month), date=YYYY-MM-DD (mặc định hôm nay)
+        compare=previous|year_ago (kỳ liền trước hoặc cùng kỳ năm trước)
+        hoặc tự chọn: start_date, end_date, compare_start_date, compare_end_date
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            current, previous = self.resolve_periods(params)
+        except (ValueError, TypeError, KeyError):
+            return Response({"error": "Tham số kỳ so sánh không hợp lệ."}, status=status.HTTP_400_BAD_REQUEST)
+
+        in_current = Q(date__range=current)
+        in_previous = Q(date__range=previous)
+        zero = Value(Decimal('0'), output_field=DecimalField())
+        rows = merge_aggregates(
+            (
+                model.objects.filter(Q(user=request.user, transfer__isnull=True) & (in_current | in_previous))
+                .values('category_id', 'category__name', 'type')
+                .annotate(
+                    current_total=Coalesce(Sum('amount', filter=in_current), zero),
+                    previous_total=Coalesce(Sum('amount', filter=in_previous), zero),
+                )
+                for model in transaction_models(min(current[0], previous[0]))
+            ),
+            keys=('category_id',), sums=('current_total', 'previous_total'),
+        )
+        rows.sort(key=lambda row: (row['type'], -row['current_total']))
+
+        categories = []
+        totals = {
+            Category.TYPE_INCOME: {'current_total': Decimal('0'), 'previous_total': Decimal('0')},
+            Category.TYPE_EXPENSE: {'current_total': Decimal('0'), 'previous_total': Decimal('0')},
+        }
+        for row in rows:
+            categories.append({
+                'category_id': row['category_id'],
+                'category_name': row['category__name'],
+                'category_type': row['type'],
+                **self.compare(row['current_total'], row['previous_total']),
+            })
+            totals[row['type']]['current_total'] += row['current_total']
+            totals[row['type']]['previous_total'] += row['previous_total']
+
+        return Response({
+            'current': {'start_date': current[0], 'end_date': current[1]},
+            'previous': {'start_date': previous[0], 'end_date': previous[1]},
+            'categories': categories,
+            'totals': {kind: self.compare(t['current_total'], t['previous_total']) for kind, t in totals.items()},
+        }, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def compare(current_total, previous_total):
+        delta = current_total - previous_total
+        percent = round(delta / previous_total * 100, 2) if previous_total else None
+        return {
+            'current_total': current_total,
+            'previous_total': previous_total,
+            'delta': delta,
+            'delta_percent': percent,
+        }
+
+    @staticmethod
+    def resolve_periods(params):
+        if params.get('start_date') or params.get('compare_start_date'):
+            current = (parse_date(params['start_date']), parse_date(params['end_date']))
+            previous = (parse_date(params['compare_start_date']), parse_date(params['compare_end_date']))
+        else:
+            period = params.get('period', 'month')
+            anchor = parse_date(params['date']) if params.get('date') else timezone.localdate()
+            current = period_range(anchor, period)
+            if params.get('compare', 'previous') == 'year_ago':
+                previous = period_range(anchor, period, offset=-(12 // PERIOD_MONTHS[period]))
+            else:
+                previous = period_range(anchor, period, offset=-1)
+
+        if current[0] > current[1] or previous[0] > previous[1]:
+            raise ValueError("start_date phải trước end_date")
+        return current, previous
@@ -1,41 +1,85 @@
-from django.db import transaction
+import datetime
 from rest_framework import filters
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
 from django_filters import rest_framework as django_filters
-from ..models import Transaction
+from ..models import Transaction, ArchivedTransaction, Category, Wallet
 from ..serializers import TransactionSerializer
-from .base_viewset import BaseViewSet
+from ..filters import TransactionSearchFilter
+from ..pagination import MergedLimitOffsetPagination
+from ..services.budgets import track_expenses
+from ..services.predictor import learn
+from ..services.autocomplete import remember, suggest
+from ..services.archive import reaches_archive
+from ..services import bulk
+from .base_viewset import BaseViewSet, atomic_for_request_user
 
 
 class TransactionViewSet(BaseViewSet):
     """CRUD cho giao dịch VÀ HỖ TRỢ LỌC/TÌM KIẾM."""
-    queryset = Transaction.objects.all().order_by('-date')
+    queryset = Transaction.objects.select_related('category', 'wallet').order_by('-date')
     serializer_class = TransactionSerializer
 
     filter_backends = (
         django_filters.DjangoFilterBackend,
-        filters.SearchFilter,
+        TransactionSearchFilter,
         filters.OrderingFilter
     )
-    filterset_fields = ['category', 'wallet']
+    filterset_fields = {'category': ['exact'], 'wallet': ['exact'], 'date': ['gte', 'lte']}
     search_fields = ['description']
     ordering_fields = ['date', 'amount']
+    bulk_filter_params = {'category', 'wallet', 'date__gte', 'date__lte', 'search'}
 
+    def list(self, request, *args, **kwargs):
+        """
+        Danh sách giao dịch (mặc định chỉ bảng nóng). Chỉ khi client yêu cầu rõ —
+        ?date__gte= trước mốc lưu trữ hoặc ?include_archived=1 — mới đọc thêm
+        ArchivedTransaction; kết quả gộp được phân trang (?limit=&offset=).
+        """
+        try:
+            start_date = datetime.date.fromisoformat(request.query_params['date__gte'])
+        except (KeyError, ValueError):
+            start_date = None
+        include_archived = request.query_params.get('include_archived') in ('1', 'true')
+        if not (start_date or include_archived) or not reaches_archive(start_date):
+            return super().list(request, *args, **kwargs)
+
+        hot = self.filter_queryset(self.get_queryset())
+        cold = self.filter_queryset(
+            ArchivedTransaction.objects.for_user(request.user).select_related('category', 'wallet')
+        )
+        paginator = MergedLimitOffsetPagination()
+        page = paginator.paginate_merged(
+            (hot, cold), hot.query.order_by or Transaction._meta.ordering, request
+        )
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @atomic_for_request_user
     def perform_create(self, serializer):
-        """Tạo giao dịch mới và cập nhật số dư ví."""
+        """Tạo giao dịch mới, cập nhật số dư ví và mức chi của ngân sách."""
         transaction_obj = serializer.save(user=self.request.user)
         wallet = transaction_obj.wallet
-        if transaction_obj.category.type == 'income':
+        if transaction_obj.type == 'income':
             wallet.balance += transaction_obj.amount
         else:
             wallet.balance -= transaction_obj.amount
         wallet.save(update_fields=['balance'])
+        track_expenses(
+            transaction_obj.user_id,
+            (transaction_obj.category, transaction_obj.date, transaction_obj.amount),
+        )
+        learn(transaction_obj.user_id, (transaction_obj.category_id, transaction_obj.description, 1))
+        remember(transaction_obj.user_id, self.autocomplete_change(transaction_obj, 1))
 
+    @atomic_for_request_user
     def perform_update(self, serializer):
-        """Cập nhật giao dịch và điều chỉnh số dư ví."""
+        """Cập nhật giao dịch, điều chỉnh số dư ví và mức chi của ngân sách."""
         old_transaction = self.get_object()
+        self.ensure_not_transfer(old_transaction)
         old_wallet = old_transaction.wallet
         old_amount = old_transaction.amount
-        old_type = old_transaction.category.type
+        old_type = old_transaction.type
 
         if old_type == 'income':
             old_wallet.balance -= old_amount
@@ -49,18 +93,107 @@ class TransactionViewSet(BaseViewSet):
         if old_wallet.id == new_wallet.id:
             new_wallet.refresh_from_db()
 
-        if new_transaction.category.type == 'income':
+        if new_transaction.type == 'income':
             new_wallet.balance += new_transaction.amount
         else:
             new_wallet.balance -= new_transaction.amount
         new_wallet.save(update_fields=['balance'])
+        track_expenses(
+            new_transaction.user_id,
+            (old_transaction.category, old_transaction.date, -old_amount),
+            (new_transaction.category, new_transaction.date, new_transaction.amount),
+        )
+        learn(
+            new_transaction.user_id,
+            (old_transaction.category_id, old_transaction.description, -1),
+            (new_transaction.category_id, new_transaction.description, 1),
+        )
+        remember(
+            new_transaction.user_id,
+            self.autocomplete_change(old_transaction, -1),
+            self.autocomplete_change(new_transaction, 1),
+        )
 
+    @atomic_for_request_user
     def perform_destroy(self, instance):
-        """Xóa giao dịch và hoàn tác số dư ví."""
+        """Xóa giao dịch, hoàn tác số dư ví và mức chi của ngân sách."""
+        self.ensure_not_transfer(instance)
         wallet = instance.wallet
-        if instance.category.type == 'income':
+        if instance.type == 'income':
             wallet.balance -= instance.amount
         else:
             wallet.balance += instance.amount
         wallet.save(update_fields=['balance'])
+        track_expenses(instance.user_id, (instance.category, instance.date, -instance.amount))
+        learn(instance.user_id, (instance.category_id, instance.description, -1))
+        remember(instance.user_id, self.autocomplete_change(instance, -1))
         instance.delete()
+
+    @staticmethod
+    def autocomplete_change(instance, delta):
+        return (instance.description, instance.date, instance.wallet_id, instance.category_id, instance.amount, delta)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        GET /transactions/autocomplete/?q=tien d — các mô tả đã dùng bắt đầu bằng q (không
+        phân biệt dấu), kèm ví/danh mục/số tiền lần gần nhất (?limit=, mặc định 5, tối đa 20).
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 20)
+        except ValueError:
+            limit = 5
+        return Response(suggest(request.user.id, request.query_params.get('q', ''), limit=limit))
+
+    # ------------------------------------------------------------------
+    # Thao tác hàng loạt: chọn giao dịch bằng {"ids": [...]} trong body HOẶC
+    # bằng chính các tham số lọc của danh sách (?category=&wallet=&date__gte=&date__lte=&search=)
+    # ------------------------------------------------------------------
+    def bulk_selection(self):
+        ids = self.request.data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                raise ValidationError({"ids": "Phải là danh sách id giao dịch."})
+            return self.get_queryset().filter(id__in=ids)
+        if not self.bulk_filter_params & set(self.request.query_params):
+            raise ValidationError(
+                "Cần truyền ids hoặc ít nhất một tham số lọc (category, wallet, date__gte, date__lte, search)."
+            )
+        return self.filter_queryset(self.get_queryset())
+
+    def bulk_target(self, model, field, not_found):
+        try:
+            return model.objects.for_user(self.request.user).get(pk=int(self.request.data[field]))
+        except KeyError:
+            raise ValidationError({field: "Trường này là bắt buộc."})
+        except (TypeError, ValueError, model.DoesNotExist):
+            raise NotFound(not_found)
+
+    def run_bulk(self, operation, *args):
+        try:
+            return Response(operation(self.request.user.pk, self.bulk_selection(), *args))
+        except bulk.BulkLimitExceeded as exc:
+            raise ValidationError(str(exc))
+
+    @action(detail=False, methods=['post'], url_path='bulk-recategorize')
+    def bulk_recategorize(self, request):
+        """POST /transactions/bulk-recategorize/ {"category": id, "ids"?: [...]} — đổi danh mục hàng loạt."""
+        category = self.bulk_target(Category, 'category', "Không tìm thấy danh mục.")
+        if category.is_system:
+            raise ValidationError({"category": "Không thể chuyển giao dịch vào danh mục hệ thống."})
+        return self.run_bulk(bulk.bulk_recategorize, category)
+
+    @action(detail=False, methods=['post'], url_path='bulk-move')
+    def bulk_move(self, request):
+        """POST /transactions/bulk-move/ {"wallet": id, "ids"?: [...]} — chuyển giao dịch sang ví khác."""
+        return self.run_bulk(bulk.bulk_move, self.bulk_target(Wallet, 'wallet', "Không tìm thấy ví."))
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """POST /transactions/bulk-delete/ {"ids"?: [...]} — xóa hàng loạt."""
+        return self.run_bulk(bulk.bulk_delete)
+
+    @staticmethod
+    def ensure_not_transfer(instance):
+        if instance.transfer_id:
+            raise ValidationError("Đây là giao dịch chuyển tiền — hãy sửa/xóa qua /transfers/.")
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from rest_framework import generics, permissions
 from ..serializers.user_serializer import UserSerializer
+from ..sharding import assign_new_user
 
 
 class UserCreateView(generics.CreateAPIView):
@@ -12,4 +13,8 @@ class UserCreateView(generics.CreateAPIView):
 
     # QUAN TRỌNG: Ghi đè cài đặt chung, cho phép bất kỳ ai
     # (kể cả chưa đăng nhập) truy cập vào view này.
-    permission_classes = [permissions.AllowAny]
\ No newline at end of file
+    permission_classes = [permissions.AllowAny]
+
+    def perform_create(self, serializer):
+        # User mới được gán shard ngay khi đăng ký (chỉ có tác dụng khi bật DB_SHARDS)
+        assign_new_user(serializer.save())
@@ -1,9 +1,73 @@
+from decimal import Decimal
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from ..models import Wallet
 from ..serializers import WalletSerializer
+from ..services.ledger import InvalidCursor, wallet_statement
 from .base_viewset import BaseViewSet
+from .report_view import parse_date
+
+MAX_STATEMENT_LIMIT = 200
 
 
 class WalletViewSet(BaseViewSet):
     """CRUD cho ví tiền."""
     queryset = Wallet.objects.all()
     serializer_class = WalletSerializer
+
+    def perform_create(self, serializer):
+        """Số dư nhập lúc tạo ví chính là số dư đầu kỳ."""
+        balance = serializer.validated_data.get('balance', Decimal('0.00'))
+        serializer.save(user=self.request.user, opening_balance=balance)
+
+    def perform_update(self, serializer):
+        """Sửa số dư thủ công được ghi nhận như điều chỉnh số dư đầu kỳ."""
+        wallet = serializer.instance
+        new_balance = serializer.validated_data.get('balance', wallet.balance)
+        delta = new_balance - wallet.balance
+        serializer.save(opening_balance=wallet.opening_balance + delta)
+
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """
+        GET /wallets/{id}/statement/ — sao kê kèm số dư sau mỗi giao dịch (mới nhất trước).
+        ?start_date=&end_date=YYYY-MM-DD, ?limit= (mặc định 50, tối đa 200),
+        ?cursor= lấy từ trường `next` của trang trước.
+        """
+        wallet = self.get_object()
+        params = request.query_params
+        try:
+            start_date = parse_date(params['start_date']) if params.get('start_date') else None
+            end_date = parse_date(params['end_date']) if params.get('end_date') else None
+            limit = min(max(int(params.get('limit', 50)), 1), MAX_STATEMENT_LIMIT)
+        except (ValueError, TypeError):
+            raise ValidationError("Tham số không hợp lệ (start_date, end_date, limit).")
+
+        try:
+            rows, next_cursor = wallet_statement(
+                wallet, start_date, end_date, cursor=params.get('cursor'), limit=limit,
+            )
+        except InvalidCursor as exc:
+            raise ValidationError({"cursor": str(exc)})
+
+        return Response({
+            'wallet_id': wallet.id,
+            'wallet_name': wallet.name,
+            'current_balance': wallet.balance,
+            'next': next_cursor,
+            'results': [
+                {
+                    'id': row['id'],
+                    'date': row['date'],
+                    'description': row['description'],
+                    'category_id': row['category_id'],
+                    'category_name': row['category__name'],
+                    'category_type': row['type'],
+                    'transfer_id': row['transfer_id'],
+                    'amount': row['signed_amount'],
+                    'balance': row['balance'],
+                }
+                for row in rows
+            ],
+        })
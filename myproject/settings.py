@@ -7,6 +7,7 @@ Documentation:
     https://docs.djangoproject.com/en/stable/topics/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -60,6 +61,9 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.middleware.ReplicaRoutingMiddleware",
+    "api.middleware.ShardRoutingMiddleware",
+    "api.middleware.RequestProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -97,13 +101,44 @@ TEMPLATES = [
 # 🗄️ CƠ SỞ DỮ LIỆU
 # ======================================================================
 
+# SQLite khóa cả file khi ghi: BEGIN IMMEDIATE giành khóa ghi ngay đầu transaction
+# (không nâng cấp khóa giữa chừng -> không lỗi "database is locked" tức thì) và
+# busy timeout 20s để các request ghi đồng thời xếp hàng thay vì trả 500.
+SQLITE_OPTIONS = {"transaction_mode": "IMMEDIATE", "timeout": 20}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_OPTIONS,
     }
 }
 
+# Replica chỉ đọc cho báo cáo / request GET. Chạy thử local:
+#   USE_READ_REPLICA=1 python manage.py sync_replica   (chép default -> replica)
+if os.environ.get("USE_READ_REPLICA") == "1":
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db_replica.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Phân mảnh theo user: DB_SHARDS=N thêm shard_1..shard_{N-1} (shard 0 là default). Chạy thử local:
+#   DB_SHARDS=3 python manage.py migrate --database shard_1   (lặp lại cho từng shard)
+#   DB_SHARDS=3 python manage.py rebalance_shards
+for index in range(1, int(os.environ.get("DB_SHARDS", "1"))):
+    DATABASES[f"shard_{index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / f"db_shard_{index}.sqlite3",
+        "OPTIONS": SQLITE_OPTIONS,
+    }
+
+DATABASE_ROUTERS = ["api.db_router.ShardRouter", "api.db_router.PrimaryReplicaRouter"]
+
+# Sau khi ghi, user đọc từ primary trong bấy nhiêu giây (read-your-writes).
+# Cần cache dùng chung (Redis/Memcached) khi chạy nhiều worker.
+REPLICA_PIN_SECONDS = 5
+
 
 # ======================================================================
 # 🔒 KIỂM TRA MẬT KHẨU
@@ -160,6 +195,47 @@ REST_FRAMEWORK = {
 }
 
 
+# ======================================================================
+# 📊 NGÂN SÁCH
+# ======================================================================
+
+BUDGET_ALERT_THRESHOLDS = [80, 100]  # % mức chi sẽ ghi nhận BudgetAlert
+
+# Giao dịch cũ hơn số ngày này được archive_transactions chuyển sang bảng lưu trữ
+TRANSACTION_ARCHIVE_DAYS = 730
+
+
+# ======================================================================
+# 💬 CHATBOT
+# ======================================================================
+
+# Token bucket theo user: tối đa 5 tin liên tiếp, hồi 10 tin/phút
+CHATBOT_BUCKET_CAPACITY = 5
+CHATBOT_BUCKET_REFILL_PER_MINUTE = 10
+# Số lời gọi Gemini đồng thời tối đa (toàn hệ thống) và Retry-After khi đầy
+CHATBOT_MAX_IN_FLIGHT = 8
+CHATBOT_BUSY_RETRY_AFTER = 2
+
+# Prompt mỗi tin nhắn: chỉ kèm top-k ví/danh mục liên quan, tối đa ~400 token
+CHATBOT_PROMPT_TOP_WALLETS = 3
+CHATBOT_PROMPT_TOP_CATEGORIES = 6
+CHATBOT_PROMPT_TOKEN_BUDGET = 400
+
+# Load test: CHATBOT_FAKE_LLM_LATENCY=0.8 python manage.py runserver
+# -> chatbot dùng LLM giả lập trả lời sau 0.8s thay vì gọi Gemini
+CHATBOT_FAKE_LLM_LATENCY = (
+    float(os.environ["CHATBOT_FAKE_LLM_LATENCY"]) if os.environ.get("CHATBOT_FAKE_LLM_LATENCY") else None
+)
+
+
+# ======================================================================
+# 🩺 PROFILING THEO REQUEST (chỉ staff, header X-Profile: 1)
+# ======================================================================
+
+REQUEST_PROFILE_INTERVAL = 0.001  # giây giữa 2 lần lấy mẫu call stack
+REQUEST_PROFILE_TTL = 3600        # kết quả giữ trong cache bấy nhiêu giây
+
+
 # ======================================================================
 # 🔐 JSON WEB TOKEN (JWT)
 # ======================================================================